@@ -1,69 +1,100 @@
-from flask import Flask, render_template
-import os
-import shutil 
-import time 
-
-
-from routes_execution import execution_bp, UPLOAD_FOLDER
-from routes_download import download_bp
-from routes_upload import upload_bp
-
-app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-
-
-app.register_blueprint(execution_bp)
-app.register_blueprint(download_bp)
-app.register_blueprint(upload_bp)
-
-
-INPUT_FILES_METADATA = os.path.join(UPLOAD_FOLDER, 'input_files.json')
-
-
-def clean_all_temporary_files():
-    """Elimina todos los archivos en el directorio temporal (temp_files) al inicio de la sesión."""
-    print(">>> Limpiando todos los archivos de entrada/salida temporales...")
-    if os.path.exists(UPLOAD_FOLDER):
-        
-        for filename in os.listdir(UPLOAD_FOLDER):
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-            try:
-                
-                if os.path.isfile(filepath) or os.path.islink(filepath):
-                    os.unlink(filepath)
-            except Exception as e:
-                print(f'Error al eliminar {filepath}: {e}')
-    
-    
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
-    
-    print(">>> Limpieza completada.")
-
-
-
-@app.route('/')
-def index():
-    
-    clean_all_temporary_files()
-    
-    
-    
-    css_path = os.path.join(app.root_path, 'static', 'style.css')
-    
-    if os.path.exists(css_path):
-        cache_buster = int(os.stat(css_path).st_mtime)
-    else:
-        
-        cache_buster = int(time.time())
-    
-    
-    return render_template('index.html', cache_buster=cache_buster)
-
-if __name__ == '__main__':
-    
-    clean_all_temporary_files() 
-    
-    print("\n--- INICIANDO SERVIDOR FLASK ---")
-    print(f"Abriendo http://127.0.0.1:5000/ - Directorio de archivos: {UPLOAD_FOLDER}")
+from flask import Flask, render_template, current_app
+import os
+import shutil 
+import time 
+
+
+from routes_execution import execution_bp, UPLOAD_FOLDER
+from routes_download import download_bp
+from routes_upload import upload_bp
+from routes_metrics import metrics_bp
+from routes_validation import validation_bp
+from core_interpreter.file_registry import FileRegistry
+from core_interpreter.garbage_collector import start_collector
+from core_interpreter.api import preload
+
+
+
+def clean_all_temporary_files():
+    """Elimina todos los archivos en el directorio temporal (temp_files) al inicio de la sesión."""
+    print(">>> Limpiando todos los archivos de entrada/salida temporales...")
+    if os.path.exists(UPLOAD_FOLDER):
+        
+        for filename in os.listdir(UPLOAD_FOLDER):
+            filepath = os.path.join(UPLOAD_FOLDER, filename)
+            try:
+                
+                if os.path.isfile(filepath) or os.path.islink(filepath):
+                    os.unlink(filepath)
+            except Exception as e:
+                print(f'Error al eliminar {filepath}: {e}')
+        
+        FileRegistry.for_workspace(UPLOAD_FOLDER).clear()
+    
+    
+    if not os.path.exists(UPLOAD_FOLDER):
+        os.makedirs(UPLOAD_FOLDER)
+    
+    print(">>> Limpieza completada.")
+
+
+
+def index():
+    
+    
+    
+    css_path = os.path.join(current_app.root_path, 'static', 'style.css')
+    
+    if os.path.exists(css_path):
+        cache_buster = int(os.stat(css_path).st_mtime)
+    else:
+        
+        cache_buster = int(time.time())
+    
+    
+    return render_template('index.html', cache_buster=cache_buster)
+
+
+def start_request_collector():
+    start_collector(UPLOAD_FOLDER)
+
+
+def create_app(preload_interpreter=False, clean_workspace=False):
+    """
+    Crea la aplicación. Con preload_interpreter=True carga ya el intérprete y las librerías
+    de PDF; pensado para los servidores que cargan la aplicación en el proceso maestro y
+    después crean los workers con fork, que así comparten esa memoria (copia en escritura):
+
+        gunicorn --preload -w 4 "app:create_app(preload_interpreter=True, clean_workspace=True)"
+
+    Sin precarga, las librerías de PDF se importan con el primer comando que las usa. El
+    recolector de temporales se arranca en cada proceso que atiende peticiones, ya que sus
+    hilos no sobreviven al fork.
+    """
+    if clean_workspace:
+        clean_all_temporary_files()
+    if preload_interpreter:
+        preload()
+
+    app = Flask(__name__)
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+
+    app.register_blueprint(execution_bp)
+    app.register_blueprint(download_bp)
+    app.register_blueprint(upload_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(validation_bp)
+
+    app.before_request(start_request_collector)
+    app.add_url_rule('/', 'index', index)
+    return app
+
+
+if __name__ == '__main__':
+    
+    app = create_app(clean_workspace=True)
+    start_collector(UPLOAD_FOLDER)
+    
+    print("\n--- INICIANDO SERVIDOR FLASK ---")
+    print(f"Abriendo http://127.0.0.1:5000/ - Directorio de archivos: {UPLOAD_FOLDER}")
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,113 @@
+import json
+import os
+import random
+
+try:
+    from fpdf import FPDF
+except ImportError:
+    FPDF = None
+
+
+# Término que se siembra en el corpus y que buscan los scripts de las pruebas.
+MATCH_TERM = "marcador"
+
+# Tamaño aproximado del TXT y número de páginas del PDF de cada corpus.
+SIZES = {
+    'chico': (16 * 1024, 4),
+    'medio': (1024 * 1024, 40),
+    'grande': (16 * 1024 * 1024, 200),
+}
+
+# Proporción de palabras que son el término buscado.
+DENSITIES = {
+    'baja': 0.001,
+    'media': 0.01,
+    'alta': 0.1,
+}
+
+WORDS_PER_LINE = 12
+LINES_PER_PAGE = 40
+
+VOCABULARY = (
+    "archivo texto página documento línea búsqueda resultado contenido registro sección capítulo "
+    "informe datos proceso sistema versión fecha número valor tabla índice nombre campo lista "
+    "el la los las un una de del en con por para sobre entre desde hasta según durante "
+    "año mes día hora análisis revisión entrega cliente proyecto equipo acción estado "
+    "nuevo antiguo mayor menor primero último general especial público privado técnico"
+).split()
+
+
+def corpus_name(size, density):
+    return f"corpus_{size}_{density}"
+
+
+def _words(rng, count, density):
+    for _ in range(count):
+        yield MATCH_TERM if rng.random() < density else rng.choice(VOCABULARY)
+
+
+def _lines(rng, density):
+    while True:
+        yield " ".join(_words(rng, WORDS_PER_LINE, density))
+
+
+def generate_text(path, target_bytes, density, seed):
+    """Escribe un TXT determinista de unos target_bytes; devuelve las apariciones del término."""
+    rng = random.Random(f"{seed}:txt:{target_bytes}:{density}")
+    written = 0
+    matches = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        for line in _lines(rng, density):
+            if written >= target_bytes:
+                break
+            f.write(line + "\n")
+            written += len(line.encode('utf-8')) + 1
+            matches += line.split().count(MATCH_TERM)
+    return matches
+
+
+def generate_pdf(path, pages, density, seed):
+    """Escribe un PDF determinista de 'pages' páginas de texto; devuelve las apariciones del término."""
+    if FPDF is None:
+        raise RuntimeError("La librería FPDF no está disponible; no se pueden generar los PDF del corpus.")
+    rng = random.Random(f"{seed}:pdf:{pages}:{density}")
+    lines = _lines(rng, density)
+    matches = 0
+    pdf = FPDF()
+    for _ in range(pages):
+        page_lines = [next(lines) for _ in range(LINES_PER_PAGE)]
+        matches += sum(line.split().count(MATCH_TERM) for line in page_lines)
+        pdf.add_page()
+        pdf.set_font("Arial", size=8)
+        pdf.multi_cell(0, 4, "\n".join(page_lines).encode('latin-1', 'replace').decode('latin-1'))
+    pdf.output(path, dest='F')
+    return matches
+
+
+def generate_corpus(out_dir, sizes=tuple(SIZES), densities=tuple(DENSITIES), seed=0):
+    """
+    Genera un TXT y un PDF por cada combinación de tamaño y densidad, cada par en su propio
+    subdirectorio (para que 'buscar ... de todos' solo vea su corpus). El contenido depende
+    solo de la semilla. Escribe y devuelve el manifiesto con las apariciones esperadas.
+    """
+    manifest = {"seed": seed, "term": MATCH_TERM, "corpora": {}}
+    for size in sizes:
+        target_bytes, pages = SIZES[size]
+        for density in densities:
+            name = corpus_name(size, density)
+            corpus_dir = os.path.join(out_dir, name)
+            os.makedirs(corpus_dir, exist_ok=True)
+            txt_matches = generate_text(os.path.join(corpus_dir, "texto.txt"), target_bytes, DENSITIES[density], seed)
+            pdf_matches = generate_pdf(os.path.join(corpus_dir, "documento.pdf"), pages, DENSITIES[density], seed)
+            manifest["corpora"][name] = {
+                "size": size,
+                "density": density,
+                "txt_bytes": os.path.getsize(os.path.join(corpus_dir, "texto.txt")),
+                "txt_matches": txt_matches,
+                "pdf_pages": pages,
+                "pdf_matches": pdf_matches,
+            }
+
+    with open(os.path.join(out_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
@@ -0,0 +1,266 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_interpreter.lexer import Lexer
+from core_interpreter.parser import Parser
+from core_interpreter.evaluator import Evaluator
+from core_interpreter import text_cache
+
+from benchmarks.corpus import MATCH_TERM, SIZES, DENSITIES, generate_corpus
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Un script por comando: (nombre, plantilla, archivo de entrada). 'de todos' va primero para
+# que solo vea el corpus y no las salidas de los demás comandos.
+COMMAND_CASES = (
+    ('buscar_todos', f'buscar repeticiones de "{MATCH_TERM}" de todos', None),
+    ('buscar_txt', f'buscar repeticiones de "{MATCH_TERM}" de "texto.txt"', 'texto.txt'),
+    ('buscar_sensible_txt', f'buscar repeticiones de "{MATCH_TERM}" de "texto.txt" con sensibilidad', 'texto.txt'),
+    ('buscar_patron_txt', 'buscar repeticiones de patron "marca\\w+" de "texto.txt"', 'texto.txt'),
+    ('buscar_posiciones_txt', f'buscar posiciones de "{MATCH_TERM}" de "texto.txt"', 'texto.txt'),
+    ('buscar_pdf', f'buscar repeticiones de "{MATCH_TERM}" de "documento.pdf"', 'documento.pdf'),
+    ('fusionar_txt', 'fusionar "texto.txt" con "texto.txt" separado_por "----" en "fusion.txt"', 'texto.txt'),
+    ('reemplazar_txt', f'reemplazar todo "{MATCH_TERM}" con "sustituto" de "texto.txt" en "reemplazo.txt"', 'texto.txt'),
+    ('reemplazar_cada_txt', f'reemplazar todo "{MATCH_TERM}" con "sustituto" cada 3 de "texto.txt" en "reemplazo3.txt"', 'texto.txt'),
+    ('sobreescribir_txt', f'sobreescribir todo "{MATCH_TERM}" con "XX" de "texto.txt" en "sobre.txt"', 'texto.txt'),
+    ('enumerar_txt', f'enumerar "{MATCH_TERM}" desde 1 hasta 1000000 relleno 7 de "texto.txt" en "enumerado.txt"', 'texto.txt'),
+    ('fragmentar_txt', f'fragmentar de "texto.txt" por "{MATCH_TERM}" en "fragmento.txt"', 'texto.txt'),
+    ('extraer_pdf', 'extraer de "documento.pdf" desde 1 hasta 2 en "extracto.pdf"', 'documento.pdf'),
+    ('invertir_pdf', 'invertir de "documento.pdf" en "invertido.pdf"', 'documento.pdf'),
+)
+
+# Líneas que se repiten para formar los scripts de las pruebas del lexer y el parser.
+SCRIPT_LINES = (
+    'var archivo = "texto.txt",',
+    f'buscar repeticiones de "{MATCH_TERM}" de archivo con sensibilidad,',
+    'reemplazar 20 "a" con "b" cada 2 de archivo en "salida.txt",',
+    'fusionar archivo con "otro.txt" separado_por "--" en "fusion.txt",',
+    'enumerar "X" desde 1 hasta 50 relleno 2 de archivo en "enumerado.txt",',
+    'extraer de "documento.pdf" desde 1 hasta 2 en "extracto.pdf",',
+)
+SCRIPT_SIZES = (1, 100, 1000, 10000, 100000)
+
+MB = 1024 * 1024
+
+# Diferencias absolutas por debajo de las cuales no se considera regresión (ruido de medida).
+MIN_DELTAS = {"seconds": 0.005, "peak_mb": 0.5, "retained_mb": 0.5}
+
+
+def configure_evaluator():
+    """Desactiva cachés e índices entre ejecuciones y los pools de procesos, para medir el comando."""
+    Evaluator.MEMOIZATION_ENABLED = False
+    Evaluator.RESULT_CACHE_ENABLED = False
+    Evaluator.SEARCH_INDEX_ENABLED = False
+    Evaluator.BATCH_WORKERS = 1
+    text_cache.PAGE_WORKERS = 1
+
+
+def measure(function, repeats):
+    """
+    Ejecuta function() 'repeats' veces y una más con tracemalloc. Devuelve la primera
+    duración (en frío), la mediana de las demás y el pico de memoria en MB.
+    """
+    durations = []
+    for _ in range(max(repeats, 1)):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    warm = durations[1:] or durations
+    return {
+        "cold_seconds": round(durations[0], 6),
+        "seconds": round(statistics.median(warm), 6),
+        "peak_mb": round(peak / MB, 3),
+    }
+
+
+def retained(function):
+    """Devuelve (resultado de function(), MB que el resultado sigue ocupando al terminar)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current / MB
+
+
+def run_script(workspace_dir, source):
+    Evaluator.FILE_DIR = workspace_dir
+    ast = Parser(Lexer(source).tokenize()).parse()
+    output = io.StringIO()
+    evaluator = Evaluator()
+    with contextlib.redirect_stdout(output):
+        evaluator.evaluate(ast)
+    if not evaluator.succeeded():
+        raise RuntimeError(f"El script de la prueba falló:\n{source}\n{output.getvalue()}")
+
+
+def bench_commands(corpus_dir, manifest, repeats, progress=print):
+    results = {}
+    for name, info in manifest["corpora"].items():
+        with tempfile.TemporaryDirectory(prefix='arkscript_bench_') as workspace_dir:
+            for file_name in ("texto.txt", "documento.pdf"):
+                shutil.copy(os.path.join(corpus_dir, name, file_name), workspace_dir)
+
+            for case, source, input_name in COMMAND_CASES:
+                key = f"comando/{case}/{info['size']}/{info['density']}"
+                result = measure(lambda: run_script(workspace_dir, source), repeats)
+                input_bytes = (os.path.getsize(os.path.join(workspace_dir, input_name)) if input_name
+                               else info["txt_bytes"] + os.path.getsize(os.path.join(workspace_dir, "documento.pdf")))
+                result["throughput"] = round(input_bytes / MB / result["seconds"], 3) if result["seconds"] else None
+                result["unit"] = "MB/s"
+                results[key] = result
+                progress(f"{key}: {result['seconds'] * 1000:.2f} ms, {result['peak_mb']:.2f} MB")
+    return results
+
+
+def bench_front_end(repeats, max_lines=SCRIPT_SIZES[-1], progress=print):
+    results = {}
+    for lines in (size for size in SCRIPT_SIZES if size <= max_lines):
+        source = "\n".join(SCRIPT_LINES[i % len(SCRIPT_LINES)] for i in range(lines)).rstrip(',')
+        tokens = Lexer(source).tokenize()
+
+        for stage, function in (('lexer', lambda: Lexer(source).tokenize()),
+                                ('parser', lambda: Parser(list(tokens)).parse())):
+            key = f"{stage}/{lines}"
+            result = measure(function, repeats)
+            result["throughput"] = round(lines / result["seconds"], 1) if result["seconds"] else None
+            result["unit"] = "lineas/s"
+            results[key] = result
+            progress(f"{key}: {result['seconds'] * 1000:.2f} ms, {result['peak_mb']:.2f} MB")
+    return results
+
+
+def bench_footprint(max_lines=SCRIPT_SIZES[-1], progress=print):
+    """Memoria que ocupan los tokens y el AST de cada script una vez construidos."""
+    results = {}
+    for lines in (size for size in SCRIPT_SIZES if size <= max_lines):
+        source = "\n".join(SCRIPT_LINES[i % len(SCRIPT_LINES)] for i in range(lines)).rstrip(',')
+        tokens, tokens_mb = retained(lambda: Lexer(source).tokenize())
+        ast, ast_mb = retained(lambda: Parser(tokens).parse())
+
+        for stage, items, size_mb in (('tokens', tokens, tokens_mb), ('ast', ast, ast_mb)):
+            key = f"memoria/{stage}/{lines}"
+            results[key] = {
+                "retained_mb": round(size_mb, 3),
+                "items": len(items),
+                "bytes_per_item": round(size_mb * MB / len(items), 1),
+            }
+            progress(f"{key}: {size_mb:.2f} MB, {results[key]['bytes_per_item']} bytes por elemento")
+    return results
+
+
+def compare(results, baseline, time_threshold=0.25, memory_threshold=0.25):
+    """
+    Compara los resultados con la línea base y devuelve un mensaje por cada prueba cuya
+    mediana, pico de memoria o memoria retenida empeora más que el umbral (proporción;
+    0.25 = un 25 %) y más que MIN_DELTAS. Las pruebas que no están en la línea base se ignoran.
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        reference = baseline.get("results", {}).get(key)
+        if reference is None:
+            continue
+        for field, threshold, unit in (("seconds", time_threshold, "s"), ("peak_mb", memory_threshold, "MB"),
+                                       ("retained_mb", memory_threshold, "MB")):
+            before, after = reference.get(field), result.get(field)
+            if (before and after is not None and after > before * (1 + threshold)
+                    and after - before > MIN_DELTAS[field]):
+                regressions.append(f"{key}: {field} {before:.6g} {unit} -> {after:.6g} {unit} (+{(after / before - 1) * 100:.0f} %)")
+    return regressions
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Pruebas de rendimiento de los comandos, el lexer y el parser de ArkScript.")
+    parser.add_argument('--sizes', nargs='+', choices=tuple(SIZES), default=['chico', 'medio'],
+                        help="Tamaños del corpus (por defecto: chico medio).")
+    parser.add_argument('--densities', nargs='+', choices=tuple(DENSITIES), default=list(DENSITIES),
+                        help="Densidades de apariciones del término (por defecto: todas).")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla del corpus.")
+    parser.add_argument('--repeats', type=int, default=5, help="Repeticiones de cada prueba.")
+    parser.add_argument('--max-lines', type=int, default=SCRIPT_SIZES[-1],
+                        help="Máximo de líneas de los scripts del lexer y el parser.")
+    parser.add_argument('--corpus-dir', help="Directorio del corpus; por defecto uno temporal.")
+    parser.add_argument('--output', metavar='RUTA', help="Escribe los resultados JSON en el archivo indicado.")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Línea base con la que comparar.")
+    parser.add_argument('--update-baseline', action='store_true', help="Guarda los resultados como nueva línea base.")
+    parser.add_argument('--time-threshold', type=float, default=0.25, help="Empeoramiento de tiempo tolerado (0.25 = 25 %%).")
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help="Empeoramiento de memoria tolerado.")
+    parser.add_argument('-q', '--quiet', action='store_true', help="No muestra el progreso.")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    progress = (lambda message: None) if args.quiet else (lambda message: print(message, file=sys.stderr))
+    configure_evaluator()
+
+    with contextlib.ExitStack() as stack:
+        corpus_dir = args.corpus_dir or stack.enter_context(tempfile.TemporaryDirectory(prefix='arkscript_corpus_'))
+        progress(f">>> Generando corpus en {corpus_dir}...")
+        manifest = generate_corpus(corpus_dir, args.sizes, args.densities, args.seed)
+
+        results = bench_front_end(args.repeats, args.max_lines, progress)
+        results.update(bench_footprint(args.max_lines, progress))
+        results.update(bench_commands(corpus_dir, manifest, args.repeats, progress))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "seed": args.seed,
+            "repeats": args.repeats,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(text)
+        progress(f">>> Línea base actualizada en {args.baseline}.")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        progress(">>> No hay línea base con la que comparar; usa --update-baseline para crearla.")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    for regression in regressions:
+        print(f"REGRESIÓN {regression}")
+    if not regressions:
+        progress(">>> Sin regresiones respecto a la línea base.")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import sys
+
+from core_interpreter.batch import expand_inputs, run_batch
+from core_interpreter.storage import DirectoryStorage
+
+
+def parse_variable(text):
+    name, separator, value = text.partition('=')
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"Variable no válida '{text}'; se espera NOMBRE=VALOR.")
+    return name, value
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Ejecuta un script de ArkScript sin interfaz web, una vez por cada archivo de entrada."
+    )
+    parser.add_argument('script', help="Archivo con el código ArkScript.")
+    parser.add_argument('inputs', nargs='+', help="Archivos o patrones glob de entrada (p. ej. 'docs/*.pdf').")
+    parser.add_argument('-b', '--bind', default='entrada',
+                        help="Variable del script que recibe la ruta de cada entrada (por defecto: entrada).")
+    parser.add_argument('-v', '--var', action='append', type=parse_variable, default=[], metavar='NOMBRE=VALOR',
+                        help="Variable fija por entrada; admite {nombre}, {base}, {ext} e {indice}.")
+    parser.add_argument('-o', '--output-dir', default='arkscript_salida',
+                        help="Directorio de trabajo donde se escriben las salidas.")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help="Número de procesos en paralelo (por defecto: núcleos disponibles).")
+    parser.add_argument('--fsync', default=DirectoryStorage.FSYNC_POLICY,
+                        choices=(DirectoryStorage.FSYNC_NONE, DirectoryStorage.FSYNC_FILE, DirectoryStorage.FSYNC_FULL),
+                        help="Sincronización de cada salida con el disco: none, file (contenido, por defecto) "
+                             "o full (contenido y directorio).")
+    parser.add_argument('--summary', metavar='RUTA',
+                        help="Escribe el resumen JSON en el archivo indicado en lugar de la salida estándar.")
+    parser.add_argument('-q', '--quiet', action='store_true', help="No muestra el progreso.")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+
+    with open(args.script, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        print("ERROR: Ningún archivo de entrada coincide con los patrones indicados.", file=sys.stderr)
+        return 2
+
+    def report(done, total, result):
+        if not args.quiet:
+            status = 'ERROR' if result["error"] else 'ok'
+            print(f"[{done}/{total}] {os.path.basename(result['input'])}: {status} ({result['duration']:.2f}s)", file=sys.stderr)
+
+    summary = run_batch(source, inputs, args.output_dir, bind_name=args.bind, templates=dict(args.var),
+                        jobs=max(1, args.jobs or 1), progress=report, fsync=args.fsync)
+
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if not args.quiet:
+        print(f"Completado: {summary['ok']}/{summary['total']} sin errores en {summary['duration']:.2f}s.", file=sys.stderr)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import contextlib
+import io
+import threading
+import time
+
+from .lexer import Lexer
+from .parser import Parser
+from .evaluator import Evaluator, preload_pdf_libraries
+from .validator import ScriptValidator
+from .storage import Storage, DirectoryStorage, MemoryStorage, OverlayStorage
+
+
+__all__ = ['run', 'preload', 'Storage', 'DirectoryStorage', 'MemoryStorage', 'OverlayStorage']
+
+
+# El intérprete informa por sys.stdout, que es global al proceso: las ejecuciones se serializan.
+_run_lock = threading.Lock()
+
+# Script que recorre las reglas del lexer, el parser y el validador durante la precarga.
+WARMUP_SCRIPT = """var entrada = "entrada.txt",
+buscar repeticiones de patron "a+" de entrada con sensibilidad,
+buscar posiciones de "a" de ["entrada.txt", entrada],
+reemplazar todo "a" con "b" cada 2 de entrada en "salida.txt",
+enumerar "a" desde 1 hasta 9 relleno 2 prefijo "n" de entrada en "enumerado.txt",
+fragmentar de entrada por "--" en "fragmento.txt"
+"""
+
+
+def run(source, storage=None, variables=None, validate=True):
+    """
+    Ejecuta un script de ArkScript dentro del proceso sobre el almacenamiento indicado
+    (por defecto, el directorio de trabajo del intérprete) y devuelve un diccionario con:
+    'output' (la consola), 'error', 'problems' (de la validación previa), 'output_files',
+    'commands' (estado, valor y duración de cada comando) y 'variables'.
+
+        storage = MemoryStorage({"entrada.txt": "uno dos uno"})
+        result = run('buscar repeticiones de "uno" de "entrada.txt"', storage=storage)
+        result["commands"][0]["value"]  # 2
+
+    Con un OverlayStorage sobre un DirectoryStorage se leen los archivos del disco y las
+    salidas quedan en memoria. Los errores de sintaxis se devuelven en el resultado.
+    """
+    if storage is None:
+        storage = DirectoryStorage(Evaluator.FILE_DIR)
+    output = io.StringIO()
+    result = {"output": "", "error": False, "problems": [], "output_files": [], "commands": [], "variables": {}}
+    start = time.perf_counter()
+
+    try:
+        ast = Parser(Lexer(source).tokenize()).parse()
+        if validate:
+            result["problems"] = ScriptValidator(storage.root, variables, storage=storage).validate(ast)
+        if result["problems"]:
+            result["error"] = True
+            result["output"] = "Validación previa fallida:\n" + "\n".join(f"    - {p}" for p in result["problems"])
+        else:
+            evaluator = Evaluator(bound_variables=variables, storage=storage)
+            with _run_lock, contextlib.redirect_stdout(output):
+                evaluator.evaluate(ast)
+            result["output"] = output.getvalue()
+            result["error"] = not evaluator.succeeded()
+            result["output_files"] = sorted(evaluator.get_all_output_files())
+            result["commands"] = evaluator.command_results
+            result["variables"] = dict(evaluator.variables)
+    except Exception as e:
+        result["error"] = True
+        result["output"] = f"Error de Compilación/Ejecución: {e}\n\n{output.getvalue()}"
+
+    result["duration"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def preload():
+    """
+    Importa y prepara de antemano lo que el intérprete carga en su primer uso: las
+    librerías de PDF y los módulos del lexer, el parser y el validador. No ejecuta
+    comandos ni toca el disco.
+    """
+    preload_pdf_libraries()
+    ast = Parser(Lexer(WARMUP_SCRIPT).tokenize()).parse()
+    ScriptValidator(None, storage=MemoryStorage({"entrada.txt": b""})).validate(ast)
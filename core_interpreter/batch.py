@@ -0,0 +1,186 @@
+import concurrent.futures
+import contextlib
+import glob
+import io
+import multiprocessing
+import os
+import threading
+import time
+
+from .lexer import Lexer
+from .parser import Parser
+from . import evaluator
+from .validator import ScriptValidator
+from .storage import DirectoryStorage
+
+
+def expand_inputs(patterns):
+    """Expande rutas y patrones glob a una lista ordenada de archivos, sin repetidos."""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        files.extend(path for path in matches if os.path.isfile(path))
+    return list(dict.fromkeys(os.path.abspath(path) for path in files))
+
+
+def input_bindings(input_path, index, bind_name, templates):
+    """
+    Variables de una ejecución: bind_name apunta a la ruta de la entrada y cada plantilla
+    se formatea con {nombre}, {base}, {ext} e {indice}.
+    """
+    file_name = os.path.basename(input_path)
+    base, ext = os.path.splitext(file_name)
+    fields = {"nombre": file_name, "base": base, "ext": ext, "indice": index}
+    variables = {name: template.format(**fields) for name, template in templates.items()}
+    variables[bind_name] = input_path
+    return variables
+
+
+def parse_script(source):
+    return Parser(Lexer(source).tokenize()).parse()
+
+
+_worker_ast = None
+
+
+def _init_worker(ast, workspace_dir, fsync=None):
+    global _worker_ast
+    _worker_ast = ast
+    evaluator.Evaluator.FILE_DIR = workspace_dir
+    if fsync is not None:
+        DirectoryStorage.FSYNC_POLICY = fsync
+    evaluator.Evaluator.BATCH_WORKERS = 1
+
+
+def _run_one(input_path, variables):
+    start = time.perf_counter()
+    output = io.StringIO()
+    run = evaluator.Evaluator(bound_variables=variables)
+    try:
+        with contextlib.redirect_stdout(output):
+            run.evaluate(_worker_ast)
+        log = output.getvalue()
+        error = not run.succeeded()
+    except Exception as e:
+        log = f"Error de Compilación/Ejecución: {e}\n\n{output.getvalue()}"
+        error = True
+    return {
+        "input": input_path,
+        "error": error,
+        "output_files": sorted(run.get_all_output_files()),
+        "duration": round(time.perf_counter() - start, 4),
+        "output": log,
+    }
+
+
+def run_batch(source, inputs, workspace_dir, bind_name='entrada', templates=None, jobs=None, progress=None,
+              fsync=None):
+    """
+    Ejecuta el script una vez por entrada repartiendo las ejecuciones en un pool de
+    procesos. El script se analiza una sola vez; progress(hechas, total, resultado) se
+    llama al terminar cada entrada. fsync fija la política de sincronización de las
+    salidas (ver DirectoryStorage). Devuelve el resumen con los resultados en orden.
+    """
+    ast = parse_script(source)
+    os.makedirs(workspace_dir, exist_ok=True)
+    templates = templates or {}
+    start = time.perf_counter()
+
+    results = [None] * len(inputs)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                                initargs=(ast, workspace_dir, fsync)) as pool:
+        futures = {}
+        done = 0
+        for i, path in enumerate(inputs):
+            variables = input_bindings(path, i + 1, bind_name, templates)
+            problems = ScriptValidator(workspace_dir, variables).validate(ast)
+            if problems:
+                results[i] = {"input": path, "error": True, "output_files": [], "duration": 0.0,
+                              "output": "Validación previa fallida:\n" + "\n".join(f"    - {p}" for p in problems)}
+                done += 1
+                if progress is not None:
+                    progress(done, len(inputs), results[i])
+                continue
+            futures[pool.submit(_run_one, path, variables)] = i
+
+        for done, future in enumerate(concurrent.futures.as_completed(futures), start=done + 1):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                results[index] = {"input": inputs[index], "error": True, "output_files": [],
+                                  "duration": 0.0, "output": f"{type(e).__name__}: {e}"}
+            if progress is not None:
+                progress(done, len(inputs), results[index])
+
+    failed = sum(1 for result in results if result["error"])
+    return {
+        "total": len(results),
+        "ok": len(results) - failed,
+        "errors": failed,
+        "workspace": os.path.abspath(workspace_dir),
+        "duration": round(time.perf_counter() - start, 4),
+        "results": results,
+    }
+
+
+_node_pool = None
+_node_pool_workers = 0
+_node_pool_lock = threading.Lock()
+
+# Ajustes del evaluador que se copian a los procesos del pool: con spawn no heredan los del padre.
+WORKER_SETTINGS = ('SEARCH_INDEX_ENABLED', 'MEMOIZATION_ENABLED', 'RESULT_CACHE_ENABLED', 'RESULT_CACHE_MAX_BYTES',
+                   'BYTES_MODE_ENABLED')
+
+
+def worker_settings(run):
+    """Ajustes de la ejecución que deben valer también en los procesos del lote."""
+    settings = {name: getattr(run, name) for name in WORKER_SETTINGS}
+    settings["fsync"] = getattr(run.storage, 'fsync', None)
+    return settings
+
+
+def _node_pool_for(workers):
+    """
+    Pool de procesos compartido por los lotes del lenguaje; se recrea si cambia su tamaño.
+    Se crea desde hilos de petición con conexiones SQLite y el hilo de escritura activos:
+    con fork los hijos heredarían sus locks tomados, así que se usa spawn.
+    """
+    global _node_pool, _node_pool_workers
+    with _node_pool_lock:
+        if _node_pool is None or _node_pool_workers != workers:
+            if _node_pool is not None:
+                _node_pool.shutdown(wait=False)
+            _node_pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                                mp_context=multiprocessing.get_context('spawn'))
+            _node_pool_workers = workers
+        return _node_pool
+
+
+def _run_node_in_worker(node, workspace_dir, variables, settings):
+    evaluator.Evaluator.FILE_DIR = workspace_dir
+    run = evaluator.Evaluator(bound_variables=variables, storage=DirectoryStorage(workspace_dir, fsync=settings["fsync"]))
+    for name in WORKER_SETTINGS:
+        setattr(run, name, settings[name])
+    run.BATCH_WORKERS = 1
+    # El proceso principal lee las salidas en cuanto recibe el resultado: se escriben ya.
+    run.OUTPUT_WRITE_BEHIND = False
+    return run._run_captured(run.command_handlers[type(node)], node)
+
+
+def run_nodes(nodes, workspace_dir, variables, workers, settings):
+    """
+    Ejecuta los comandos (ya sin fuentes múltiples) en el pool de procesos con los ajustes
+    de worker_settings() y devuelve sus resultados en el mismo orden. Si el pool falla, el
+    elemento se marca como error.
+    """
+    pool = _node_pool_for(workers)
+    futures = [pool.submit(_run_node_in_worker, node, workspace_dir, variables, settings) for node in nodes]
+    results = []
+    for node, future in zip(nodes, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append({"output": f"    ERROR [LOTE]: Fallo al ejecutar {node!r}: {type(e).__name__}: {e}\n",
+                            "output_files": [], "value": None, "error": True})
+    return results
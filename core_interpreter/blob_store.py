@@ -0,0 +1,142 @@
+import hashlib
+import os
+import secrets
+import shutil
+import tempfile
+
+from .file_registry import FileRegistry
+from .storage import DirectoryStorage
+
+
+class BlobStore:
+    """
+    Almacén direccionado por contenido (SHA-256) para los archivos del espacio de trabajo.
+    Cada contenido se guarda una sola vez en '.blobs' y los nombres visibles del
+    espacio de trabajo son enlaces duros a esos blobs; el digest de cada nombre se
+    guarda en el registro de archivos.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    BLOB_DIR_NAME = '.blobs'
+
+    def __init__(self, workspace_dir):
+        self.workspace_dir = workspace_dir
+        self.blob_dir = os.path.join(workspace_dir, self.BLOB_DIR_NAME)
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.file_registry = FileRegistry.for_workspace(workspace_dir)
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def has(self, digest):
+        return is_valid_digest(digest) and os.path.exists(self.blob_path(digest))
+
+    def store_stream(self, stream):
+        """Copia el flujo a un blob calculando el SHA-256 mientras se lee. Devuelve (digest, tamaño)."""
+        hasher = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.blob_dir, prefix='.subida-')
+        try:
+            with os.fdopen(fd, 'wb') as fout:
+                while True:
+                    chunk = stream.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    fout.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            self._commit_blob(temp_path, digest)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return digest, size
+
+    def adopt_file(self, file_path, digest):
+        """Mueve al almacén un archivo cuyo digest ya fue verificado."""
+        self._commit_blob(file_path, digest)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def ingest_file(self, file_path, digest):
+        """
+        Incorpora al almacén un archivo del espacio de trabajo sin copiarlo: el blob pasa a
+        ser un enlace duro del propio archivo.
+        """
+        final_path = self.blob_path(digest)
+        if os.path.exists(final_path):
+            return
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        try:
+            os.link(file_path, final_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            with open(file_path, 'rb') as fin:
+                self.store_stream(fin)
+
+    def _commit_blob(self, temp_path, digest):
+        final_path = self.blob_path(digest)
+        if os.path.exists(final_path):
+            return
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+
+    def link(self, digest, name, origin=FileRegistry.ORIGIN_INPUT):
+        """Hace que el nombre del espacio de trabajo apunte al blob indicado y lo registra."""
+        if not self.has(digest):
+            raise FileNotFoundError(f"Blob '{digest}' no encontrado en el almacén.")
+
+        target_path = os.path.join(self.workspace_dir, name)
+        blob_path = self.blob_path(digest)
+
+        if os.path.exists(target_path) and os.path.samefile(target_path, blob_path):
+            self.file_registry.record(name, origin, sha256=digest)
+            return
+
+        # Se enlaza (o copia) a un temporal y se renombra encima: quien lea el nombre ve el
+        # archivo anterior o el nuevo completo, nunca un hueco ni una copia a medias.
+        temp_path = os.path.join(os.path.dirname(target_path),
+                                 f"{DirectoryStorage.TEMP_PREFIX}{secrets.token_hex(8)}")
+        try:
+            try:
+                os.link(blob_path, temp_path)
+            except OSError:
+                shutil.copyfile(blob_path, temp_path)
+            os.replace(temp_path, target_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.file_registry.record(name, origin, sha256=digest)
+
+    def hash_of(self, name):
+        """Devuelve el digest del nombre si sigue enlazado a su blob, o None."""
+        entry = self.file_registry.get(name)
+        digest = entry["sha256"] if entry else None
+        if not digest or not self.has(digest):
+            return None
+        target_path = os.path.join(self.workspace_dir, name)
+        try:
+            if os.path.samefile(target_path, self.blob_path(digest)):
+                return digest
+        except OSError:
+            return None
+        return None
+
+
+def file_digest(file_path, chunk_size=BlobStore.CHUNK_SIZE):
+    """SHA-256 del archivo leído por bloques."""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def is_valid_digest(digest):
+    return isinstance(digest, str) and len(digest) == 64 and all(c in '0123456789abcdef' for c in digest)
@@ -0,0 +1,273 @@
+import collections
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+
+
+class ChunkedUploadError(Exception):
+    pass
+
+
+class ChunkedUploadStore:
+    """
+    Sesiones de subida por fragmentos. Cada sesión tiene un archivo de datos reservado con
+    el tamaño final (los fragmentos se escriben en su posición con pwrite, en cualquier orden
+    y en paralelo), un mapa de un byte por fragmento recibido y un JSON con los metadatos.
+    """
+
+    DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+    MIN_CHUNK_SIZE = 256 * 1024
+    MAX_CHUNK_SIZE = 64 * 1024 * 1024
+    MAX_FILE_SIZE = 4 * 1024 ** 3
+    # Límites de las sesiones abiertas: cada una reserva en disco su tamaño final al iniciarse.
+    MAX_OPEN_SESSIONS = 32
+    MAX_RESERVED_BYTES = 8 * 1024 ** 3
+    UPLOAD_DIR_NAME = '.uploads'
+    READ_SIZE = 1024 * 1024
+    # Subidas completadas que se recuerdan para responder a un segundo 'complete' de la misma sesión.
+    COMPLETED_REMEMBERED = 256
+
+    def __init__(self, workspace_dir, max_file_size=MAX_FILE_SIZE, max_open_sessions=MAX_OPEN_SESSIONS,
+                 max_reserved_bytes=MAX_RESERVED_BYTES):
+        self.upload_dir = os.path.join(workspace_dir, self.UPLOAD_DIR_NAME)
+        self.max_file_size = max_file_size
+        self.max_open_sessions = max_open_sessions
+        self.max_reserved_bytes = max_reserved_bytes
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self._session_lock = threading.Lock()
+        self._completion_locks = {}
+        self._completed = collections.OrderedDict()
+
+    def _paths(self, upload_id):
+        if not re.fullmatch(r'[0-9a-f]{32}', upload_id or ''):
+            raise ChunkedUploadError(f"Identificador de subida no válido: '{upload_id}'.")
+        base = os.path.join(self.upload_dir, upload_id)
+        return base + '.json', base + '.part', base + '.map'
+
+    def start(self, name, size, chunk_size=None, sha256=None, upload_id=None):
+        """
+        Crea una sesión con un identificador aleatorio emitido por el servidor. Si se indica
+        el 'upload_id' de una sesión existente con los mismos parámetros, la devuelve para
+        reanudarla; si no existe o no coincide, se crea una nueva.
+        """
+        chunk_size = int(chunk_size or self.DEFAULT_CHUNK_SIZE)
+        size = int(size)
+        if size < 0:
+            raise ChunkedUploadError("El tamaño del archivo no puede ser negativo.")
+        if size > self.max_file_size:
+            raise ChunkedUploadError(f"El archivo supera el tamaño máximo permitido ({self.max_file_size} bytes).")
+        if not self.MIN_CHUNK_SIZE <= chunk_size <= self.MAX_CHUNK_SIZE:
+            raise ChunkedUploadError(
+                f"Tamaño de fragmento no válido: {chunk_size} (entre {self.MIN_CHUNK_SIZE} y {self.MAX_CHUNK_SIZE} bytes).")
+
+        if upload_id and self._resumable(upload_id, name, size, chunk_size, sha256):
+            return self.status(upload_id)
+
+        upload_id = secrets.token_hex(16)
+        meta_path, data_path, map_path = self._paths(upload_id)
+        total_chunks = max(1, -(-size // chunk_size))
+
+        with self._session_lock:
+            if not os.path.exists(meta_path):
+                self._check_capacity(size)
+                with open(data_path, 'wb') as f:
+                    _preallocate(f.fileno(), size)
+                with open(map_path, 'wb') as f:
+                    f.truncate(total_chunks)
+                meta = {
+                    "upload_id": upload_id,
+                    "name": name,
+                    "size": size,
+                    "chunk_size": chunk_size,
+                    "total_chunks": total_chunks,
+                    "sha256": sha256,
+                }
+                with open(meta_path, 'w') as f:
+                    json.dump(meta, f)
+
+        return self.status(upload_id)
+
+    def _check_capacity(self, size):
+        """Rechaza la sesión si superaría el número de subidas abiertas o los bytes reservados."""
+        sizes = self._open_session_sizes()
+        if len(sizes) >= self.max_open_sessions:
+            raise ChunkedUploadError("Hay demasiadas subidas en curso. Inténtalo de nuevo más tarde.")
+        if sum(sizes) + size > self.max_reserved_bytes:
+            raise ChunkedUploadError("No queda espacio reservable para más subidas en curso. Inténtalo de nuevo más tarde.")
+
+    def _open_session_sizes(self):
+        """Tamaño reservado por cada sesión abierta, leído de sus metadatos en disco."""
+        sizes = []
+        for filename in os.listdir(self.upload_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.upload_dir, filename), 'r') as f:
+                    sizes.append(int(json.load(f)["size"]))
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        return sizes
+
+    def _resumable(self, upload_id, name, size, chunk_size, sha256):
+        try:
+            meta = self._load_meta(upload_id)
+        except ChunkedUploadError:
+            return False
+        return (meta["name"], meta["size"], meta["chunk_size"], meta["sha256"]) == (name, size, chunk_size, sha256)
+
+    def _load_meta(self, upload_id):
+        meta_path, _, _ = self._paths(upload_id)
+        try:
+            with open(meta_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ChunkedUploadError(f"La subida '{upload_id}' no existe o ya fue completada.")
+
+    def status(self, upload_id):
+        meta = self._load_meta(upload_id)
+        _, _, map_path = self._paths(upload_id)
+        with open(map_path, 'rb') as f:
+            received_map = f.read()
+
+        missing = [i for i, flag in enumerate(received_map) if not flag]
+        acknowledged_chunks = missing[0] if missing else meta["total_chunks"]
+        return {
+            "upload_id": upload_id,
+            "chunk_size": meta["chunk_size"],
+            "total_chunks": meta["total_chunks"],
+            "missing": missing,
+            "offset": min(acknowledged_chunks * meta["chunk_size"], meta["size"]),
+        }
+
+    def write_chunk(self, upload_id, index, stream, expected_sha256=None):
+        """Escribe el fragmento en su posición del archivo reservado y lo marca como recibido."""
+        meta = self._load_meta(upload_id)
+        _, data_path, map_path = self._paths(upload_id)
+
+        if not 0 <= index < meta["total_chunks"]:
+            raise ChunkedUploadError(f"Índice de fragmento fuera de rango: {index}.")
+
+        offset = index * meta["chunk_size"]
+        expected_length = min(meta["chunk_size"], meta["size"] - offset)
+        hasher = hashlib.sha256()
+        written = 0
+
+        fd = os.open(data_path, os.O_WRONLY | _O_BINARY)
+        try:
+            while written <= expected_length:
+                block = stream.read(self.READ_SIZE)
+                if not block:
+                    break
+                if written + len(block) > expected_length:
+                    raise ChunkedUploadError(f"El fragmento {index} excede los {expected_length} bytes esperados.")
+                hasher.update(block)
+                _pwrite_all(fd, block, offset + written)
+                written += len(block)
+        finally:
+            os.close(fd)
+
+        if written != expected_length:
+            raise ChunkedUploadError(f"El fragmento {index} está incompleto: {written} de {expected_length} bytes.")
+        if expected_sha256 and hasher.hexdigest() != expected_sha256.lower():
+            raise ChunkedUploadError(f"El hash del fragmento {index} no coincide.")
+
+        map_fd = os.open(map_path, os.O_WRONLY | _O_BINARY)
+        try:
+            _pwrite_all(map_fd, b'\1', index)
+        finally:
+            os.close(map_fd)
+
+        return written
+
+    def complete(self, upload_id, blob_store):
+        """
+        Verifica que estén todos los fragmentos y el hash final, y mueve el archivo al
+        almacén de blobs. Devuelve (nombre, digest, tamaño, ya_completada): las llamadas
+        de una misma sesión se serializan y las que llegan después de completarla
+        devuelven el mismo resultado con ya_completada=True.
+        """
+        meta_path, _, _ = self._paths(upload_id)
+        with self._session_lock:
+            lock = self._completion_locks.setdefault(upload_id, threading.Lock())
+        try:
+            with lock:
+                completed = self._completed.get(upload_id)
+                if completed is not None:
+                    return completed + (True,)
+                result = self._complete(upload_id, blob_store)
+                with self._session_lock:
+                    self._completed[upload_id] = result
+                    while len(self._completed) > self.COMPLETED_REMEMBERED:
+                        self._completed.popitem(last=False)
+                return result + (False,)
+        finally:
+            # Sin sesión en disco ya no hay nada que serializar (las siguientes usan _completed).
+            if not os.path.exists(meta_path):
+                with self._session_lock:
+                    self._completion_locks.pop(upload_id, None)
+
+    def _complete(self, upload_id, blob_store):
+        meta = self._load_meta(upload_id)
+        status = self.status(upload_id)
+        if status["missing"]:
+            raise ChunkedUploadError(f"Faltan {len(status['missing'])} fragmento(s) por recibir.")
+
+        meta_path, data_path, map_path = self._paths(upload_id)
+        hasher = hashlib.sha256()
+        with open(data_path, 'rb') as f:
+            while True:
+                block = f.read(self.READ_SIZE)
+                if not block:
+                    break
+                hasher.update(block)
+        digest = hasher.hexdigest()
+
+        if meta.get("sha256") and meta["sha256"].lower() != digest:
+            self.abort(upload_id)
+            raise ChunkedUploadError("El hash del archivo recibido no coincide con el declarado. La subida se descartó.")
+
+        blob_store.adopt_file(data_path, digest)
+        self.abort(upload_id)
+        return meta["name"], digest, meta["size"]
+
+    def abort(self, upload_id):
+        for path in self._paths(upload_id):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _preallocate(fd, size):
+    if size == 0:
+        return
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass
+    os.ftruncate(fd, size)
+
+
+# En Windows os.open abre en modo texto salvo que se pida O_BINARY.
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+_seek_lock = threading.Lock()
+
+
+def _pwrite(fd, data, offset):
+    if hasattr(os, 'pwrite'):
+        return os.pwrite(fd, data, offset)
+    # Sin pwrite (Windows): lseek y write bajo un cerrojo para que nadie mueva la posición entre ambos.
+    with _seek_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.write(fd, data)
+
+
+def _pwrite_all(fd, data, offset):
+    view = memoryview(data)
+    while view:
+        written = _pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
@@ -0,0 +1,140 @@
+import fnmatch
+import glob
+import os
+
+from .parser import (VarDeclNode, SearchCommand, SearchAllCommand, FusionCommand, ReplaceOverwriteCommand,
+                     EnumerateCommand, ExtractCommand, InvertCommand, FragmentCommand)
+from .file_registry import FileRegistry
+from .memoization import COMMAND_FIELDS, ROLE_INPUT, ROLE_OUTPUT, batch_fields
+
+
+# Coste de cada comando en segundos estimados: (fijo, por MB de entrada, por página PDF de entrada).
+# Los PDF pagan además la extracción de texto o la copia de páginas; los TXT solo su tamaño.
+COMMAND_COSTS = {
+    SearchCommand: (0.002, 0.010, 0.004),
+    SearchAllCommand: (0.005, 0.010, 0.004),
+    FusionCommand: (0.005, 0.015, 0.006),
+    ReplaceOverwriteCommand: (0.005, 0.030, 0.008),
+    EnumerateCommand: (0.005, 0.030, 0.008),
+    ExtractCommand: (0.010, 0.000, 0.010),
+    InvertCommand: (0.010, 0.000, 0.010),
+    FragmentCommand: (0.005, 0.040, 0.000),
+}
+
+# Páginas por MB que se suponen en un PDF cuyo número de páginas aún no se conoce.
+PAGES_PER_MB = 20
+
+MB = 1024 * 1024
+
+
+class CostEstimator:
+    """
+    Predice el coste de un script ya analizado a partir del tamaño de sus entradas, del
+    número de páginas de los PDF (según el registro del espacio de trabajo) y del tipo de
+    cada comando. Las salidas de un comando se estiman para que los siguientes comandos
+    que las lean también tengan coste. El resultado está en segundos aproximados.
+    """
+
+    def __init__(self, workspace_dir, bound_variables=None):
+        self.workspace_dir = workspace_dir
+        self.bound_variables = dict(bound_variables or {})
+        self._registry = FileRegistry.for_workspace(workspace_dir)
+
+    def estimate(self, ast):
+        return sum(cost for _, cost in self.estimate_commands(ast))
+
+    def estimate_commands(self, ast):
+        """Devuelve [(nodo, coste)] de cada comando del script."""
+        variables = dict(self.bound_variables)
+        produced = {}
+        costs = []
+
+        for node in ast:
+            if isinstance(node, VarDeclNode):
+                if node.name not in self.bound_variables:
+                    variables[node.name] = node.value
+                continue
+            fixed, per_mb, per_page = COMMAND_COSTS.get(type(node), (0.0, 0.0, 0.0))
+
+            if isinstance(node, SearchAllCommand):
+                inputs = self._searchable_documents(produced)
+                output = None
+            elif type(node) in COMMAND_FIELDS:
+                inputs, output = self._command_files(node, variables, produced)
+            else:
+                costs.append((node, fixed))
+                continue
+
+            sizes = [self._size(name, produced) for name in inputs]
+            cost = 0.0
+            for name, (size, pages) in zip(inputs, sizes):
+                cost += fixed + size / MB * per_mb + pages * per_page
+            costs.append((node, cost or fixed))
+
+            if output is not None:
+                self._record_outputs(node, inputs, sizes, output, produced)
+
+        return costs
+
+    def _command_files(self, node, variables, produced):
+        source_attr = batch_fields(node)[0]
+        inputs = []
+        output = None
+        for attr, is_var_attr, role in COMMAND_FIELDS[type(node)]:
+            value = getattr(node, attr)
+            if attr == source_attr and isinstance(value, list):
+                names = [variables.get(item) if is_var else item for item, is_var in value]
+            else:
+                resolved = variables.get(value) if getattr(node, is_var_attr) else value
+                names = [resolved]
+            names = [name for name in names if name is not None]
+            if role == ROLE_OUTPUT:
+                output = names[0] if names else None
+            elif role == ROLE_INPUT:
+                for name in names:
+                    inputs.extend(self._expand(name, produced) if attr == source_attr else [name])
+        return inputs, output
+
+    def _expand(self, name, produced):
+        if not glob.has_magic(name) or name in produced or os.path.isfile(os.path.join(self.workspace_dir, name)):
+            return [name]
+        matches = set(glob.glob(name, root_dir=self.workspace_dir))
+        matches.update(produced_name for produced_name in produced if fnmatch.fnmatchcase(produced_name, name))
+        return sorted(match for match in matches if not os.path.basename(match).startswith('.'))
+
+    def _searchable_documents(self, produced):
+        try:
+            names = set(os.listdir(self.workspace_dir))
+        except OSError:
+            names = set()
+        names.update(produced)
+        return sorted(name for name in names
+                      if not name.startswith('.') and name.lower().endswith(('.txt', '.pdf')))
+
+    def _size(self, name, produced):
+        """Devuelve (bytes, páginas PDF) del archivo, real o estimado si lo genera el script."""
+        if name in produced:
+            return produced[name]
+        try:
+            size = os.path.getsize(os.path.join(self.workspace_dir, name))
+        except OSError:
+            return 0, 0
+        if not name.lower().endswith('.pdf'):
+            return size, 0
+        entry = self._registry.get(name)
+        pages = entry["page_count"] if entry and entry["page_count"] else max(1, round(size / MB * PAGES_PER_MB))
+        return size, pages
+
+    def _record_outputs(self, node, inputs, sizes, output, produced):
+        is_batch = '{}' in output
+        for name, (size, pages) in zip(inputs, sizes):
+            if isinstance(node, ExtractCommand):
+                selected = max(0, int(node.end_page) - int(node.start_page) + 1)
+                if pages:
+                    selected = min(selected, pages)
+                    size = size * selected // pages
+                pages = selected
+            elif isinstance(node, FusionCommand):
+                size, pages = sum(s for s, _ in sizes), sum(p for _, p in sizes)
+            target = output.replace('{}', os.path.splitext(os.path.basename(name))[0]) if is_batch else output
+            produced[target] = (size, pages)
@@ -1,609 +1,1180 @@
-import os
-import re
-
-
-try:
-    from pypdf import PdfReader, PdfWriter 
-except ImportError:
-    PdfReader = None
-    PdfWriter = None
-    print("ADVERTENCIA: La librería PyPDF2 (pypdf) para lectura/escritura de PDF no está disponible.")
-try:
-    from fpdf import FPDF
-except ImportError:
-    FPDF = None    
-    print("ADVERTENCIA: La librería FPDF para escritura de PDF no está disponible.")
-    
-
-
-from .parser import VarDeclNode, SearchCommand, FusionCommand, ReplaceOverwriteCommand, CountCommand, EnumerateCommand, ExtractCommand, InvertCommand, FragmentCommand 
-
-class Evaluator:
-    FILE_DIR = "."  
-    
-    def __init__(self):
-        self.variables = {} 
-        self.generated_files = set()
-        self.protected_files = set() 
-
-        self.command_handlers = {
-            VarDeclNode: self.handle_var_declaration,
-            FusionCommand: self.handle_fusion,
-            SearchCommand: self.handle_search,
-            CountCommand: self.handle_count,
-            ReplaceOverwriteCommand: self.handle_replace_overwrite,
-            EnumerateCommand: self.handle_enumerate,
-            ExtractCommand: self.handle_extract,
-            InvertCommand: self.handle_invert,
-            FragmentCommand: self.handle_fragment, 
-        }
-
-
-    def get_all_output_files(self):
-        return list(self.generated_files)
-
-    def get_protected_files(self):
-        return self.protected_files 
-        
-    def evaluate(self, ast):
-        
-        print("--- INICIANDO EJECUCIÓN ---")
-        for node in ast:
-            try:
-                handler = self.command_handlers.get(type(node))
-                
-                if handler:
-                    handler(node)
-                else:
-                    print(f"    Advertencia: Nodo o Comando no manejado: {type(node).__name__}")
-            except Exception as e:
-                print(f"    Error de Compilación/Ejecución: {e}")
-                
-        print("\n--- EJECUCIÓN FINALIZADA ---")
-
-
-    
-    
-    def handle_var_declaration(self, node: VarDeclNode):
-        """Maneja la declaración de variables."""
-        self.variables[node.name] = node.value
-        print(f"    [VAR]: Variable '{node.name}' declarada con valor '{node.value}'")
-
-    def resolve_file_path(self, file_name):
-        return os.path.join(self.FILE_DIR, file_name)
-
-    def resolve_source(self, source, is_var):
-        if is_var:
-            resolved_value = self.variables.get(source, None)
-            if resolved_value is None:
-                raise Exception(f"Variable '{source}' no definida.")
-            return resolved_value
-        return source
-
-    def _read_content(self, file_name, file_path, allow_pdf_text=True):
-        """Lee el contenido de un archivo, manejando TXT y PDF (solo si allow_pdf_text es True)."""
-        file_extension = file_name.lower().split('.')[-1]
-        content = None
-        
-        try:
-            if file_extension == 'pdf':
-                if not allow_pdf_text:
-                    
-                    return None, True 
-                
-                if PdfReader is None:
-                    print(f"    ERROR de Lectura: No se puede leer PDF '{file_name}'. La librería PyPDF2 no está disponible.")
-                    return None
-                
-                reader = PdfReader(file_path)
-                text_parts = [page.extract_text() for page in reader.pages if page.extract_text()]
-                content = "\n".join(text_parts)
-                print(f"    [LECTURA]: Contenido de texto extraído de PDF '{file_name}'.")
-            else:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            
-            return content
-            
-        except FileNotFoundError:
-            print(f"    ERROR de Archivo: Archivo no encontrado: '{file_name}'.")
-            return None
-        except Exception as e:
-            print(f"    ERROR de Lectura: Fallo al leer '{file_name}': {type(e).__name__}: {e}")
-            return None
-
-
-    def _prepare_modification_command(self, command):
-        """
-        Resuelve variables de entrada para los comandos de modificación (REEMPLAZAR/SOBREESCRIBIR)
-        y lee el contenido del archivo fuente.
-        """
-        try:
-            
-            
-            source_doc_name = self.resolve_source(command.source_doc, command.source_is_var)
-            
-            
-            original_term = self.resolve_source(command.original, command.original_is_var)
-            new_term = self.resolve_source(command.new, command.new_is_var)
-            
-            
-            
-            target_file_name = self.resolve_source(command.target_doc, command.target_is_var)
-
-            source_doc_path = self.resolve_file_path(source_doc_name)
-            target_file_path = self.resolve_file_path(target_file_name)
-
-            
-            
-            content = self._read_content(source_doc_name, source_doc_path)
-
-            if content is None:
-                
-                return None, None, None, None, None
-
-            return (content, original_term, new_term, 
-                    target_file_name, target_file_path)
-
-        except Exception as e:
-            
-            raise Exception(f"Fallo en la resolución de variables del comando de modificación: {e}")
-
-
-
-    def _write_output(self, content, target_file_name, target_file_path, command_name, binary_mode=False):
-        """Maneja la escritura del contenido (texto o binario para PDF)."""
-        
-        mode = 'wb' if binary_mode else 'w'
-        encoding = None if binary_mode else 'utf-8'
-
-        if target_file_name.lower().endswith('.pdf') and not binary_mode:
-            
-            if FPDF is None:
-                print(f"    ERROR [{command_name}]: No se puede generar PDF (texto). La librería FPDF no está disponible.")
-                return
-
-            try:
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", size=12)
-                pdf.multi_cell(0, 8, content.encode('latin-1', 'replace').decode('latin-1'))  
-                pdf.output(target_file_path, dest='F')
-                self.generated_files.add(target_file_name)  
-                print(f"    [{command_name}]: Archivo PDF (texto) '{target_file_name}' generado exitosamente.")
-                return
-            except Exception as e:
-                print(f"    ERROR [{command_name}]: Al generar PDF (texto): {type(e).__name__}: {e}")
-                return
-        
-        
-        try:
-            with open(target_file_path, mode, encoding=encoding) as fout:
-                if binary_mode:
-                    fout.write(content)
-                else:
-                    fout.write(content)
-            
-            self.generated_files.add(target_file_name)  
-            print(f"    [{command_name}]: Archivo '{target_file_name}' creado exitosamente.")
-
-        except Exception as e:
-            print(f"    ERROR [{command_name}]: Al escribir el archivo: {e}")
-
-    
-
-    
-
-    
-
-    
-
-    def handle_fragment(self, command: FragmentCommand):
-        """
-        Fragmenta un archivo de texto en múltiples archivos usando un delimitador.
-        """
-        print(f"    [FRAGMENTAR]: Procesando fragmentación de '{command.source_file}'...")
-
-        
-        try:
-            source_file_name = self.resolve_source(command.source_file, command.source_is_var)
-            delimiter = self.resolve_source(command.delimiter, command.delimiter_is_var)
-            target_base_name = self.resolve_source(command.target_base_name, command.target_is_var)
-            
-        except Exception as e:
-            print(f"    ERROR de Parámetro: {e}")
-            return
-            
-        
-        if source_file_name.lower().endswith('.pdf'):
-            print("    ERROR [FRAGMENTAR]: El archivo fuente debe ser TXT, no PDF.")
-            return
-
-        source_file_path = self.resolve_file_path(source_file_name)
-        content = self._read_content(source_file_name, source_file_path)
-        
-        if content is None:
-            return
-
-        if not delimiter:
-            print("    ERROR [FRAGMENTAR]: El delimitador no puede estar vacío.")
-            return
-
-        
-        
-        fragments = content.split(delimiter)
-        
-        
-        base_name, ext = os.path.splitext(target_base_name)
-        
-        
-        generated_names = [] 
-        
-        
-        fragment_count = 0
-        for i, fragment in enumerate(fragments):
-            
-            
-            
-            
-            
-            
-            
-            if fragment.strip() == "":
-                
-                
-                continue 
-            
-            fragment_count += 1
-            
-            
-            target_file_name = f"{base_name}{fragment_count}{ext}"
-            target_file_path = self.resolve_file_path(target_file_name)
-            
-            
-            
-            final_fragment_content = fragment
-            
-            
-            
-            
-            if i < len(fragments) - 1:
-                
-                
-                final_fragment_content = fragment.strip() + f"\n{delimiter}\n"
-            else:
-                
-                final_fragment_content = fragment.rstrip() 
-            
-            
-            
-            self._write_output(final_fragment_content, target_file_name, target_file_path, "FRAGMENTAR")
-            generated_names.append(target_file_name) 
-
-        if fragment_count > 0:
-            print(f"    [FRAGMENTAR]: '{source_file_name}' fragmentado exitosamente.")
-            
-            
-            print("    [FRAGMENTAR] Archivos generados:")
-            for name in generated_names:
-                print(f"        -> {name}")
-        else:
-            print("    ADVERTENCIA [FRAGMENTAR]: No se generó ningún archivo. El delimitador no fue encontrado o el archivo estaba vacío.")
-
-
-    
-
-
-    
-
-    def handle_invert(self, command: InvertCommand):
-        """Invierte el orden de las páginas de un PDF."""
-        print(f"    [INVERTIR]: Procesando inversión de '{command.source_file}'...")
-        try:
-            source_file_name = self.resolve_source(command.source_file, command.source_is_var)
-            target_file_name = self.resolve_source(command.target_file, command.target_is_var)
-            source_file_path = self.resolve_file_path(source_file_name)
-            target_file_path = self.resolve_file_path(target_file_name)
-        except Exception as e:
-            print(f"    ERROR de Parámetro: {e}")
-            return
-            
-        if not (source_file_name.lower().endswith('.pdf') and target_file_name.lower().endswith('.pdf')):
-            print("    ERROR [INVERTIR]: Los archivos fuente y destino deben ser PDF.")
-            return
-
-        if PdfReader is None or PdfWriter is None:
-            print("    ERROR [INVERTIR]: Las librerías PyPDF2 (pypdf) son necesarias.")
-            return
-
-        try:
-            reader = PdfReader(source_file_path)
-            total_pages = len(reader.pages)
-            if total_pages == 0:
-                print(f"    ADVERTENCIA [INVERTIR]: El archivo '{source_file_name}' está vacío. No se realizó ninguna acción.")
-                return
-
-            writer = PdfWriter()
-            for i in range(total_pages - 1, -1, -1):
-                writer.add_page(reader.pages[i])
-            
-            with open(target_file_path, 'wb') as fout:
-                writer.write(fout)
-            
-            self.generated_files.add(target_file_name) 
-            print(f"    [INVERTIR]: {total_pages} páginas invertidas y guardadas en '{target_file_name}'.")
-                
-        except FileNotFoundError:
-            print(f"    ERROR de Archivo: Archivo fuente no encontrado: '{source_file_name}'.")
-        except Exception as e:
-            print(f"    ERROR de Inversión: Fallo al procesar '{source_file_name}': {type(e).__name__}: {e}")
-
-
-    def handle_extract(self, command: ExtractCommand):
-        
-        print(f"    [EXTRAER]: Procesando extracción de '{command.source_file}'...")
-        try:
-            source_file_name = self.resolve_source(command.source_file, command.source_is_var)
-            target_file_name = self.resolve_source(command.target_file, command.target_is_var)
-            source_file_path = self.resolve_file_path(source_file_name)
-            target_file_path = self.resolve_file_path(target_file_name)
-            start_page = int(command.start_page)
-            end_page = int(command.end_page)
-            start_index = start_page - 1 
-            end_index = end_page - 1
-        except Exception as e:
-            print(f"    ERROR de Parámetro: {e}")
-            return
-            
-        if not source_file_name.lower().endswith('.pdf'):
-            print("    ERROR [EXTRAER]: El archivo fuente debe ser un PDF.")
-            return
-
-        if PdfReader is None or PdfWriter is None:
-            print("    ERROR [EXTRAER]: Las librerías PyPDF2 (pypdf) son necesarias.")
-            return
-
-        try:
-            reader = PdfReader(source_file_path)
-            total_pages = len(reader.pages)
-
-            if start_index < 0 or end_index >= total_pages or start_index > end_index:
-                print(f"    ERROR [EXTRAER]: Rango de páginas no válido ({start_page} a {end_page}). El documento tiene {total_pages} páginas.")
-                return
-
-            if target_file_name.lower().endswith('.pdf'):
-                writer = PdfWriter()
-                for i in range(start_index, end_index + 1):
-                    writer.add_page(reader.pages[i]) 
-                
-                with open(target_file_path, 'wb') as fout:
-                    writer.write(fout)
-                
-                self.generated_files.add(target_file_name) 
-                print(f"    [EXTRAER]: Páginas {start_page}-{end_page} extraídas a '{target_file_name}' (PDF).")
-
-            else:
-                extracted_text = []
-                for i in range(start_index, end_index + 1):
-                    text = reader.pages[i].extract_text()
-                    if text:
-                        extracted_text.append(f"--- Página {i + 1} ---\n{text}\n")
-                
-                final_content = "\n".join(extracted_text)
-                self._write_output(final_content, target_file_name, target_file_path, "EXTRAER")
-                print(f"    [EXTRAER]: Páginas {start_page}-{end_page} extraídas a '{target_file_name}' (TXT).")
-                
-        except FileNotFoundError:
-            print(f"    ERROR de Archivo: Archivo fuente no encontrado: '{source_file_name}'.")
-        except Exception as e:
-            print(f"    ERROR de Extracción: Fallo al procesar '{source_file_name}': {type(e).__name__}: {e}")
-
-    
-
-    def handle_enumerate(self, command: EnumerateCommand):
-        """Enumera las ocurrencias de un término con una secuencia numérica, leyendo de un archivo y escribiendo en otro."""
-        print(f"    [ENUMERAR]: Procesando enumeración...")
-        
-        try:
-            source_term = self.resolve_source(command.source, command.source_is_var)
-            
-            
-            source_file_name = self.resolve_source(command.source_doc, command.source_is_var_doc) 
-            source_file_path = self.resolve_file_path(source_file_name)
-            
-            
-            target_file_name = self.resolve_source(command.target_file, command.target_is_var)
-            target_file_path = self.resolve_file_path(target_file_name)
-            
-            start = int(command.start_num)
-            end = int(command.end_num)
-            
-        except Exception as e:
-            print(f"    ERROR de Parámetro: {e}")
-            return
-            
-        
-        content = self._read_content(source_file_name, source_file_path)
-        if content is None: return
-
-        if start <= end:
-            sequence = [str(i) for i in range(start, end + 1)]
-            step_name = "ascendente"
-        else:
-            sequence = [str(i) for i in range(start, end - 1, -1)]
-            step_name = "descendente"
-            
-        if not sequence:
-            print(f"    ADVERTENCIA: Rango de enumeración vacío ({start} a {end}).")
-            
-            self._write_output(content, target_file_name, target_file_path, "ENUMERAR")
-            return 
-        
-        print(f"    [ENUMERAR]: Secuencia {step_name} de {len(sequence)} números generada.")
-        parts = content.split(source_term)
-        num_replacements = len(parts) - 1
-        
-        if num_replacements == 0:
-            print(f"    [ENUMERAR]: No se encontró el término '{source_term}' en '{source_file_name}'.")
-            
-            self._write_output(content, target_file_name, target_file_path, "ENUMERAR")
-            return
-            
-        new_content_list = [parts[0]]
-        
-        for i, part in enumerate(parts[1:]):
-            sequence_index = i % len(sequence)
-            replacement_number = sequence[sequence_index]
-            new_content_list.append(replacement_number)
-            new_content_list.append(part)
-        
-        new_content = "".join(new_content_list)
-        
-        
-        self._write_output(new_content, target_file_name, target_file_path, "ENUMERAR")
-        
-        if num_replacements > 0:
-            print(f"    [ENUMERAR]: {num_replacements} ocurrencias de '{source_term}' reemplazadas secuencialmente y guardadas en '{target_file_name}'.")
-    
-
-    def handle_fusion(self, command: FusionCommand):
-        
-        doc1_name = self.resolve_source(command.doc1, command.doc1_is_var)
-        doc2_name = self.resolve_source(command.doc2, command.doc2_is_var)
-        separator = self.resolve_source(command.separator, command.separator_is_var)  
-        output_file = self.resolve_source(command.output, command.output_is_var)
-        
-        path1 = self.resolve_file_path(doc1_name)
-        path2 = self.resolve_file_path(doc2_name)
-        output_path = self.resolve_file_path(output_file)
-
-        print(f"    [FUSIONAR]: '{doc1_name}' con '{doc2_name}' separador: '{separator[:20]}...' en '{output_file}'")
-        
-        content1 = self._read_content(doc1_name, path1)
-        content2 = self._read_content(doc2_name, path2)
-
-        if content1 is None or content2 is None:
-              print("    ERROR: La fusión no pudo completarse debido a errores de lectura de archivos.")
-              return
-            
-        fused_content = content1.strip() + "\n\n" + separator + "\n\n" + content2.strip()
-        self._write_output(fused_content, output_file, output_path, "FUSIONAR")
-
-
-    def handle_search(self, command: SearchCommand):
-        
-        search_term = self.resolve_source(command.search_term, command.search_term_is_var) 
-        target_name = self.resolve_source(command.target, command.target_is_var) 
-        file_path = self.resolve_file_path(target_name)
-        sensitive = 'si' if command.sensitivity == 'con' else 'no' 
-
-        content = self._read_content(target_name, file_path)
-        if content is None: return
-            
-        count = 0
-        if sensitive == 'si':
-            count = content.count(search_term)
-        else: 
-            count = content.lower().count(search_term.lower()) 
-
-        print(f"    [BUSCAR]: Se encontraron {count} repeticiones de '{search_term}' en '{target_name}' (Sensible: {sensitive}).")
-
-    def handle_count(self, command: CountCommand):
-        
-        source_name = self.variables.get(command.source_var)
-        file_path = self.resolve_file_path(source_name)
-        
-        print(f"    [CONTAR]: Contando frecuencia en '{source_name}' de {command.range_start} a {command.range_end}...")
-
-        content = self._read_content(source_name, file_path)
-        if content is None: return
-
-        total_chars = len(content)
-        
-        if command.range_start <= total_chars <= command.range_end:
-             print(f"    RESULTADO: El archivo tiene {total_chars} caracteres. Está DENTRO del rango [{command.range_start}:{command.range_end}].")
-        else:
-             print(f"    RESULTADO: El archivo tiene {total_chars} caracteres. Está FUERA del rango [{command.range_start}:{command.range_end}].")
-
-
-    def handle_replace_overwrite(self, command: ReplaceOverwriteCommand):
-        
-        command_type = command.command_type.upper()
-        
-        print(f"    [{command_type}]: Procesando en '{command.source_doc}'...")
-        
-        try:
-            (content, original_term, new_term, 
-             target_file_name, target_file_path) = self._prepare_modification_command(command)
-        except Exception as e:
-            print(f"    ERROR al resolver variables de {command_type}: {e}")
-            return
-            
-        if content is None: return
-        
-        limit = float('inf') if command.replace_range == 'todo' else int(command.replace_range)
-        frequency = int(command.frequency)
-
-        if original_term not in content:
-            print(f"    [{command_type}]: No se encontraron coincidencias de '{original_term}' en '{target_file_name}'.")
-            self._write_output(content, target_file_name, target_file_path, command_type)
-            return
-            
-        replacement_count = 0
-        new_content = content
-        
-        if command_type == 'REEMPLAZAR':
-            parts = content.split(original_term)
-            new_content_list = [parts[0]]
-            match_index = 1
-            
-            for part in parts[1:]:
-                should_replace = (match_index - 1) % frequency == 0
-                
-                if replacement_count < limit and should_replace:
-                    new_content_list.append(new_term)
-                    replacement_count += 1
-                else:
-                    new_content_list.append(original_term) 
-                
-                new_content_list.append(part)
-                match_index += 1
-            
-            new_content = "".join(new_content_list)
-            
-        elif command_type == 'SOBREESCRIBIR':
-            
-            new_term_len = len(new_term)
-            original_term_len = len(original_term) 
-            temp_content = content
-            new_content = ""
-            current_search_index = 0
-            match_index = 0
-            
-            print(f"    [SOBREESCRIBIR]: Aplicando modo 'Sobreescribir' (reemplaza {new_term_len} chars por aparición de '{original_term}').")
-
-            while current_search_index < len(temp_content) and replacement_count < limit:
-                pos = temp_content.find(original_term, current_search_index)
-
-                if pos == -1:
-                    new_content += temp_content[current_search_index:]
-                    break
-
-                match_index += 1
-                should_replace = (match_index - 1) % frequency == 0
-
-                new_content += temp_content[current_search_index:pos]
-
-                if should_replace:
-                    new_content += new_term
-                    current_search_index = pos + new_term_len 
-                    replacement_count += 1
-                else:
-                    new_content += original_term
-                    current_search_index = pos + original_term_len
-
-            
-        self._write_output(new_content, target_file_name, target_file_path, command_type) 
-        
-        if replacement_count > 0:
+import codecs
+import contextlib
+import copy
+import glob
+import hashlib
+import io
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+from .parser import VarDeclNode, SearchCommand, SearchAllCommand, FusionCommand, ReplaceOverwriteCommand, CountCommand, EnumerateCommand, ExtractCommand, InvertCommand, FragmentCommand 
+from .metrics import registry
+from .blob_store import BlobStore, file_digest
+from .text_cache import PdfTextCache, build_entry, joined_text
+from .search_index import search_indexes, enqueue_index_build
+from .file_registry import FileRegistry
+from .result_cache import ResultCache
+from . import memoization
+from . import batch
+from . import patterns
+from .line_index import LineIndex, line_indexes
+from .storage import DirectoryStorage
+from .output_writer import OutputWriter
+
+
+# Las librerías de PDF se importan la primera vez que un comando las necesita: los
+# procesos que solo trabajan con TXT no pagan su carga (preload_pdf_libraries la adelanta).
+_pdf_libraries = {}
+_pdf_libraries_lock = threading.Lock()
+
+
+def _load_pdf_library(name):
+    with _pdf_libraries_lock:
+        if name not in _pdf_libraries:
+            try:
+                if name == 'pypdf':
+                    from pypdf import PdfReader, PdfWriter
+                    _pdf_libraries[name] = (PdfReader, PdfWriter)
+                else:
+                    from fpdf import FPDF
+                    _pdf_libraries[name] = FPDF
+            except ImportError:
+                _pdf_libraries[name] = (None, None) if name == 'pypdf' else None
+                print(f"ADVERTENCIA: La librería {name} para PDF no está disponible.", file=sys.stderr)
+        return _pdf_libraries[name]
+
+
+def pypdf_classes():
+    """Devuelve (PdfReader, PdfWriter), o (None, None) si pypdf no está instalado."""
+    return _load_pdf_library('pypdf')
+
+
+def fpdf_class():
+    """Devuelve la clase FPDF, o None si fpdf no está instalado."""
+    return _load_pdf_library('fpdf')
+
+
+def preload_pdf_libraries():
+    """Importa ya las librerías de PDF (p. ej. en el proceso maestro antes de crear los workers)."""
+    return pypdf_classes(), fpdf_class()
+
+class Evaluator:
+    FILE_DIR = "."  
+    SEARCH_INDEX_ENABLED = True
+    MEMOIZATION_ENABLED = True
+    RESULT_CACHE_ENABLED = True
+    RESULT_CACHE_MAX_BYTES = ResultCache.DEFAULT_MAX_BYTES
+    BATCH_WORKERS = min(os.cpu_count() or 1, 8)
+    SEARCH_ALL_WORKERS = 16
+    SEARCHABLE_EXTENSIONS = ('.txt', '.pdf')
+    MAX_POSITIONS_SHOWN = 200
+    BYTES_MODE_ENABLED = True
+    # Las salidas en disco se escriben en un hilo aparte mientras se ejecutan los comandos siguientes.
+    OUTPUT_WRITE_BEHIND = True
+    
+    def __init__(self, bound_variables=None, storage=None):
+        self.variables = dict(bound_variables or {})
+        self.bound_variables = set(self.variables)
+        self.storage = storage if storage is not None else DirectoryStorage(self.FILE_DIR)
+        self.generated_files = set()
+        self.protected_files = set() 
+        self.command_results = []
+        self._blob_store_instance = None
+        self._node_outputs = []
+        self._node_failed = False
+        self._writer = None
+        self._output_commands = {}
+        self._write_failed = False
+        self._written_messages = []
+
+        self.command_handlers = {
+            VarDeclNode: self.handle_var_declaration,
+            FusionCommand: self.handle_fusion,
+            SearchCommand: self.handle_search,
+            SearchAllCommand: self.handle_search_all,
+            CountCommand: self.handle_count,
+            ReplaceOverwriteCommand: self.handle_replace_overwrite,
+            EnumerateCommand: self.handle_enumerate,
+            ExtractCommand: self.handle_extract,
+            InvertCommand: self.handle_invert,
+            FragmentCommand: self.handle_fragment, 
+        }
+
+
+    def get_all_output_files(self):
+        return list(self.generated_files)
+
+    def succeeded(self):
+        """True si ningún comando falló, incluidas las escrituras diferidas de sus salidas."""
+        return not self._write_failed and all(result["status"] != 'error' for result in self.command_results)
+
+    def get_protected_files(self):
+        return self.protected_files 
+        
+    def evaluate(self, ast):
+        
+        print("--- INICIANDO EJECUCIÓN ---")
+        for node in ast:
+            command_name = type(node).__name__
+            status = 'ok'
+            value = None
+            start = time.perf_counter()
+            try:
+                handler = self.command_handlers.get(type(node))
+                if handler and not isinstance(node, VarDeclNode):
+                    self._wait_for_outputs(node)
+                
+                if handler and self._is_batch(node):
+                    value, succeeded = self._run_batch(handler, node)
+                elif handler:
+                    value, succeeded = self._run_node(handler, node)
+                else:
+                    succeeded = True
+                    status = 'no_manejado'
+                    print(f"    Advertencia: Nodo o Comando no manejado: {command_name}")
+                if not succeeded:
+                    status = 'error'
+            except Exception as e:
+                status = 'error'
+                print(f"    Error de Compilación/Ejecución: {e}")
+            finally:
+                elapsed = time.perf_counter() - start
+                self.command_results.append({"command": command_name, "status": status, "value": value, "seconds": round(elapsed, 6)})
+                registry.inc('arkscript_commands_total', command=command_name, status=status)
+                registry.observe('arkscript_command_duration_seconds', elapsed, command=command_name)
+                
+        self.flush_outputs()
+        print("\n--- EJECUCIÓN FINALIZADA ---")
+
+    def flush_outputs(self):
+        """Barrera de escritura: espera a que todas las salidas estén en disco e informa de los fallos."""
+        if self._writer is None:
+            return True
+        errors = self._writer.flush()
+        # Los avisos de escritura se anotan desde el hilo y se imprimen aquí, con la salida redirigida de la ejecución.
+        messages, self._written_messages = self._written_messages, []
+        for message in messages:
+            print(message)
+        for error in errors:
+            print(f"    ERROR [ESCRITURA]: {error}")
+        # El fallo de escritura se atribuye al comando que generó la salida.
+        for name in self._writer.failed:
+            index = self._output_commands.get(name)
+            if index is not None and index < len(self.command_results):
+                self.command_results[index]["status"] = 'error'
+        if errors:
+            self._write_failed = True
+        return not errors
+
+    def _output_writer(self):
+        if self._writer is None and self.OUTPUT_WRITE_BEHIND and self.storage.root is not None:
+            self._writer = OutputWriter(self.storage)
+        return self._writer
+
+    def _wait_for_outputs(self, node):
+        """
+        Antes de un comando, espera a las escrituras pendientes de los archivos que usa. Si no
+        se pueden saber de antemano (patrones, lotes, fragmentos numerados o comandos que
+        recorren todo el espacio de trabajo) espera a todas.
+        """
+        if self._writer is None or not self._writer.pending():
+            return
+        names = None
+        if memoization.is_memoizable(node) and not isinstance(node, FragmentCommand):
+            try:
+                resolved = memoization.resolve_fields(self, node)
+                names = [value for role, value in resolved.values() if role != memoization.ROLE_PARAM]
+            except Exception:
+                names = None
+        if names is None or any(not isinstance(name, str) or glob.has_magic(name) or '{}' in name for name in names):
+            self._writer.wait_for_all()
+        else:
+            self._writer.wait_for(names)
+
+
+
+    def _run_node(self, handler, node):
+        """
+        Ejecuta el comando reutilizando su resultado anterior si sus parámetros resueltos y el
+        contenido de sus entradas no cambiaron y sus salidas siguen intactas en disco. Si no,
+        intenta enlazar las salidas desde la caché de resultados compartida antes de calcularlas.
+        Devuelve (valor, éxito); el comando falla si informó de algún error con _error().
+        """
+        memo_key, result_key, output_name = self._cache_keys(node)
+        
+        if memo_key is not None:
+            entry = self._file_registry().memo_get(memo_key)
+            hit = entry is not None and self._outputs_intact(entry["outputs"])
+            registry.record_cache('memo', hit)
+            if hit:
+                print(f"    [MEMO]: Sin cambios en {type(node).__name__}; se reutiliza el resultado anterior.")
+                sys.stdout.write(entry["log"])
+                for name, _ in entry["outputs"]:
+                    self.generated_files.add(name)
+                    self._file_registry().touch(name)
+                return entry["value"], True
+
+        self._node_outputs = []
+        self._node_failed = False
+        value = None
+        captured = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(captured):
+                if result_key is None or not self._link_cached_result(node, result_key, output_name):
+                    value = handler(node)
+        finally:
+            log = captured.getvalue()
+            sys.stdout.write(log)
+
+        if self._node_failed:
+            return value, False
+        outputs = list(dict.fromkeys(self._node_outputs))
+        if memo_key is not None or (result_key is not None and outputs):
+            self._after_outputs(lambda: self._remember_result(memo_key, result_key, output_name, log, outputs, value))
+        return value, True
+
+    def _error(self, message):
+        """Informa de un error del comando en curso y lo marca como fallido."""
+        self._node_failed = True
+        print(message)
+
+    def _remember_result(self, memo_key, result_key, output_name, log, outputs, value):
+        """Guarda el resultado en la memoización y en la caché compartida, con las salidas ya en disco."""
+        if self._writer is not None and self._writer.failed.intersection(outputs):
+            return
+        if memo_key is not None:
+            self._file_registry().memo_put(memo_key, log, [(name, self._file_registry().get(name)["sha256"]) for name in outputs], value)
+        if result_key is not None and outputs:
+            self._result_cache().store(result_key, output_name, outputs)
+
+    def _link_cached_result(self, node, result_key, output_name):
+        names = self._result_cache().materialize(result_key, output_name)
+        if names is None:
+            return False
+        for name in names:
+            self.generated_files.add(name)
+            self._node_outputs.append(name)
+        listed = ", ".join(f"'{name}'" for name in names)
+        print(f"    [CACHÉ]: Resultado de {type(node).__name__} ya calculado para el mismo contenido; enlazado en {listed}.")
+        return True
+
+    def _cache_keys(self, node):
+        """Devuelve (clave de memo, clave de resultado compartido, nombre de salida) del comando."""
+        if not (self.MEMOIZATION_ENABLED or self.RESULT_CACHE_ENABLED) or not memoization.is_memoizable(node):
+            return None, None, None
+        if self.storage.root is None:
+            return None, None, None
+        try:
+            resolved = memoization.resolve_fields(self, node)
+        except Exception:
+            return None, None, None
+        digests = [self._content_digest(name) for name in memoization.input_names(resolved)]
+        output_name = memoization.output_name(resolved)
+
+        memo_key = memoization.command_key(node, resolved, digests) if self.MEMOIZATION_ENABLED else None
+        result_key = None
+        if self.RESULT_CACHE_ENABLED and output_name and None not in digests:
+            result_key = memoization.result_key(node, resolved, digests)
+        return memo_key, result_key, output_name
+
+    def _is_batch(self, node):
+        fields = memoization.batch_fields(node)
+        if fields is None:
+            return False
+        source = getattr(node, fields[0])
+        if isinstance(source, list):
+            return True
+        try:
+            source = self.resolve_source(source, getattr(node, fields[1]))
+        except Exception:
+            return False
+        return isinstance(source, list) or (glob.has_magic(source) and not self.storage.exists(source))
+
+    def _expand_sources(self, source, is_var):
+        """Convierte la fuente de un lote (lista, patrón o nombre) en la lista ordenada de archivos."""
+        items = source if isinstance(source, list) else [(source, is_var)]
+        names = []
+        for item, item_is_var in items:
+            name = self.resolve_source(item, item_is_var)
+            if glob.has_magic(name) and not self.storage.exists(name):
+                names.extend(self.storage.glob(name))
+            else:
+                names.append(name)
+        return list(dict.fromkeys(names))
+
+    def _run_batch(self, handler, node):
+        """
+        Ejecuta el comando una vez por cada archivo de la fuente. Cada salida se nombra
+        sustituyendo '{}' en el nombre de salida por el nombre base de la entrada; las
+        ejecuciones se reparten entre procesos y sus resultados se agregan en orden.
+        Devuelve (valor agregado, éxito); el lote falla si falla alguno de sus elementos.
+        """
+        source_attr, source_is_var_attr, output_attr, output_is_var_attr = memoization.batch_fields(node)
+        command_name = type(node).__name__
+        names = self._expand_sources(getattr(node, source_attr), getattr(node, source_is_var_attr))
+        if not names:
+            print(f"    ADVERTENCIA [LOTE]: Ningún archivo coincide con la fuente de {command_name}.")
+            return None, True
+
+        output_template = None
+        if output_attr is not None:
+            output_template = self.resolve_source(getattr(node, output_attr), getattr(node, output_is_var_attr))
+            if '{}' not in output_template:
+                self._error(f"    ERROR [LOTE]: La salida '{output_template}' debe contener '{{}}' para nombrar cada resultado del lote.")
+                return None, False
+
+        nodes = []
+        for name in names:
+            item = copy.copy(node)
+            setattr(item, source_attr, name)
+            setattr(item, source_is_var_attr, False)
+            if output_attr is not None:
+                setattr(item, output_attr, output_template.replace('{}', os.path.splitext(os.path.basename(name))[0]))
+                setattr(item, output_is_var_attr, False)
+            nodes.append(item)
+
+        print(f"    [LOTE]: {command_name} sobre {len(nodes)} archivo(s)...")
+        start = time.perf_counter()
+        # Los procesos del pool solo comparten los archivos si están en un directorio.
+        if self.BATCH_WORKERS > 1 and len(nodes) > 1 and self.storage.root is not None:
+            results = batch.run_nodes(nodes, self.storage.root, self.variables, self.BATCH_WORKERS, batch.worker_settings(self))
+        else:
+            results = [self._run_captured(handler, item) for item in nodes]
+
+        failed = 0
+        values = []
+        for result in results:
+            sys.stdout.write(result["output"])
+            self.generated_files.update(result["output_files"])
+            if result["error"]:
+                failed += 1
+            elif isinstance(result["value"], int):
+                values.append(result["value"])
+
+        summary = f"    [LOTE]: {len(nodes) - failed}/{len(nodes)} archivo(s) procesados en {time.perf_counter() - start:.2f}s"
+        if values and len(values) == len(nodes) - failed and isinstance(node, SearchCommand):
+            summary += f"; total: {sum(values)} repeticiones"
+        print(summary + ".")
+        return (sum(values) if values else None), failed == 0
+
+    def _run_captured(self, handler, node):
+        """Ejecuta un elemento del lote y devuelve su salida por consola, archivos y valor."""
+        captured = io.StringIO()
+        generated_before = set(self.generated_files)
+        with contextlib.redirect_stdout(captured):
+            value, succeeded = self._run_node(handler, node)
+        return {
+            "output": captured.getvalue(),
+            "output_files": sorted(self.generated_files - generated_before),
+            "value": value,
+            "error": not succeeded,
+        }
+
+    def _content_digest(self, file_name):
+        """Hash del contenido actual del archivo, tomado del registro o calculado si falta."""
+        entry = self._file_registry().get(file_name)
+        if entry is not None and entry["sha256"]:
+            return entry["sha256"]
+        file_path = self.resolve_file_path(file_name)
+        if not os.path.isfile(file_path):
+            return None
+        return file_digest(file_path)
+
+    def _outputs_intact(self, outputs):
+        for name, digest in outputs:
+            entry = self._file_registry().get(name)
+            if entry is None or entry["sha256"] != digest or not os.path.exists(self.resolve_file_path(name)):
+                return False
+        return True
+
+    def handle_var_declaration(self, node: VarDeclNode):
+        """Maneja la declaración de variables. Las variables fijadas desde fuera no se redefinen."""
+        if node.name in self.bound_variables:
+            print(f"    [VAR]: Variable '{node.name}' fijada externamente con valor '{self.variables[node.name]}'")
+            return
+        self.variables[node.name] = node.value
+        print(f"    [VAR]: Variable '{node.name}' declarada con valor '{node.value}'")
+
+    def _blob_store(self):
+        if self._blob_store_instance is None or self._blob_store_instance.workspace_dir != self.storage.root:
+            self._blob_store_instance = BlobStore(self.storage.root)
+        return self._blob_store_instance
+
+    def _file_registry(self):
+        return FileRegistry.for_workspace(self.storage.root)
+
+    def _result_cache(self):
+        return ResultCache(self.storage.root, max_bytes=self.RESULT_CACHE_MAX_BYTES)
+
+    def _touch(self, file_name):
+        if self.storage.root is not None:
+            self._file_registry().touch(file_name)
+
+    def _search_index_enabled(self):
+        return self.SEARCH_INDEX_ENABLED and self.storage.root is not None
+
+    def _store_output(self, file_name, data, load_index_content=None, message=None):
+        """
+        Guarda la salida (bytes) y la marca como generada en esta ejecución. En disco se
+        encola en el hilo de escritura; al quedar escrita se anota en el registro de archivos
+        y, si se indica cómo cargar su texto, se indexa para las búsquedas. El mensaje de
+        éxito solo se muestra cuando la escritura ha terminado bien: en el momento si es
+        directa, o en flush_outputs() si es diferida.
+        """
+        self.generated_files.add(file_name)
+        self._node_outputs.append(file_name)
+        self._output_commands[file_name] = len(self.command_results)
+        if self.storage.root is None:
+            self.storage.write_bytes(file_name, data)
+            if message is not None:
+                print(message)
+            return
+
+        file_path = self.resolve_file_path(file_name)
+        if not self._search_index_enabled():
+            load_index_content = None
+
+        def on_written():
+            if message is not None and writer is not None:
+                self._written_messages.append(message)
+            self._file_registry().record(file_name, FileRegistry.ORIGIN_GENERATED, sha256=hashlib.sha256(data).hexdigest())
+            if load_index_content is not None:
+                enqueue_index_build(file_path, load_index_content)
+
+        writer = self._output_writer()
+        if writer is None:
+            self.storage.write_bytes(file_name, data)
+            if message is not None:
+                print(message)
+            on_written()
+        else:
+            writer.write(file_name, data, on_written)
+
+    def _after_outputs(self, task):
+        """Ejecuta la tarea cuando estén escritas las salidas encoladas hasta ahora."""
+        writer = self._output_writer()
+        if writer is None:
+            task()
+        else:
+            writer.after(task)
+
+    def resolve_file_path(self, file_name):
+        """Ruta real del archivo, o None si el almacenamiento no está en disco."""
+        return self.storage.path(file_name)
+
+    def _pdf_reader(self, file_name):
+        # Se lee entero antes de abrirlo, como hace pypdf con una ruta: el destino puede ser el mismo archivo.
+        PdfReader, _ = pypdf_classes()
+        return PdfReader(io.BytesIO(self.storage.read_bytes(file_name)))
+
+    def _pdf_entry(self, file_name, file_path):
+        """Devuelve (entrada de texto del PDF, acierto): de la caché en disco o extraída en el momento."""
+        if self.storage.root is not None:
+            digest = self._blob_store().hash_of(file_name) or file_digest(file_path)
+            return PdfTextCache(self.storage.root).load_or_build(digest, file_path)
+        reader = self._pdf_reader(file_name)
+        pages = [page.extract_text() or "" for page in reader.pages]
+        registry.inc('arkscript_pdf_pages_processed_total', len(pages), command='lectura')
+        return build_entry(pages), False
+
+    def resolve_source(self, source, is_var):
+        if is_var:
+            resolved_value = self.variables.get(source, None)
+            if resolved_value is None:
+                raise Exception(f"Variable '{source}' no definida.")
+            return resolved_value
+        return source
+
+    def _read_content(self, file_name, file_path, allow_pdf_text=True):
+        """Lee el contenido de un archivo, manejando TXT y PDF (solo si allow_pdf_text es True)."""
+        file_extension = file_name.lower().split('.')[-1]
+        content = None
+        
+        try:
+            self._touch(file_name)
+            if file_extension == 'pdf':
+                if not allow_pdf_text:
+                    
+                    return None, True 
+                
+                if pypdf_classes()[0] is None:
+                    self._error(f"    ERROR de Lectura: No se puede leer PDF '{file_name}'. La librería PyPDF2 no está disponible.")
+                    return None
+                
+                digest = self._blob_store().hash_of(file_name) if self.storage.root is not None else None
+                if digest is not None:
+                    entry, hit = PdfTextCache(self.storage.root).load_or_build(digest, file_path)
+                    origin = "obtenido de la caché" if hit else "extraído y cacheado"
+                    print(f"    [LECTURA]: Contenido de texto de PDF '{file_name}' {origin}.")
+                    return joined_text(entry)
+                
+                reader = self._pdf_reader(file_name)
+                text_parts = [text for text in (page.extract_text() for page in reader.pages) if text]
+                content = "\n".join(text_parts)
+                registry.inc('arkscript_pdf_pages_processed_total', len(reader.pages), command='lectura')
+                print(f"    [LECTURA]: Contenido de texto extraído de PDF '{file_name}'.")
+            else:
+                content = self.storage.read_text(file_name)
+            
+            return content
+            
+        except FileNotFoundError:
+            self._error(f"    ERROR de Archivo: Archivo no encontrado: '{file_name}'.")
+            return None
+        except Exception as e:
+            self._error(f"    ERROR de Lectura: Fallo al leer '{file_name}': {type(e).__name__}: {e}")
+            return None
+
+
+    def _read_utf8_bytes(self, file_name, file_path, target_file_name=None):
+        """
+        Lee un TXT como bytes UTF-8 sin decodificarlo, para las operaciones literales que dan
+        el mismo resultado sobre bytes. Devuelve None (y el llamador usa _read_content) si el
+        modo está desactivado, la fuente o el destino es un PDF, el archivo no se puede leer,
+        contiene '\r' (la lectura en modo texto normaliza los finales de línea) o no es UTF-8
+        válido, para que _read_content informe del error como siempre.
+        """
+        if not self.BYTES_MODE_ENABLED or file_name.lower().endswith('.pdf'):
+            return None
+        if target_file_name is not None and target_file_name.lower().endswith('.pdf'):
+            return None
+        try:
+            data = self.storage.read_bytes(file_name)
+        except OSError:
+            return None
+        if b'\r' in data:
+            return None
+        if not data.isascii():
+            try:
+                codecs.utf_8_decode(data, 'strict', True)
+            except UnicodeDecodeError:
+                return None
+        self._touch(file_name)
+        return data
+
+    def _prepare_modification_command(self, command):
+        """
+        Resuelve variables de entrada para los comandos de modificación (REEMPLAZAR/SOBREESCRIBIR)
+        y lee el contenido del archivo fuente.
+        """
+        try:
+            
+            
+            source_doc_name = self.resolve_source(command.source_doc, command.source_is_var)
+            
+            
+            original_term = self.resolve_source(command.original, command.original_is_var)
+            new_term = self.resolve_source(command.new, command.new_is_var)
+            
+            
+            
+            target_file_name = self.resolve_source(command.target_doc, command.target_is_var)
+
+            source_doc_path = self.resolve_file_path(source_doc_name)
+            target_file_path = self.resolve_file_path(target_file_name)
+
+            
+            
+            content = None
+            if command.command_type.upper() == 'REEMPLAZAR' and not command.is_regex:
+                content = self._read_utf8_bytes(source_doc_name, source_doc_path, target_file_name)
+            if content is None:
+                content = self._read_content(source_doc_name, source_doc_path)
+
+            if content is None:
+                
+                return None, None, None, None, None
+
+            return (content, original_term, new_term, 
+                    target_file_name, target_file_path)
+
+        except Exception as e:
+            
+            raise Exception(f"Fallo en la resolución de variables del comando de modificación: {e}")
+
+
+
+    def _write_output(self, content, target_file_name, target_file_path, command_name, binary_mode=False):
+        """Maneja la escritura del contenido (texto, o bytes ya codificados en UTF-8 / binario para PDF)."""
+        
+        if isinstance(content, bytes) and target_file_name.lower().endswith('.pdf') and not binary_mode:
+            content = content.decode('utf-8', errors='replace')
+        encoded_text = isinstance(content, bytes) and not binary_mode
+        binary_mode = binary_mode or encoded_text
+
+        if target_file_name.lower().endswith('.pdf') and not binary_mode:
+            
+            FPDF = fpdf_class()
+            if FPDF is None:
+                self._error(f"    ERROR [{command_name}]: No se puede generar PDF (texto). La librería FPDF no está disponible.")
+                return
+
+            try:
+                pdf = FPDF()
+                pdf.add_page()
+                pdf.set_font("Arial", size=12)
+                pdf.multi_cell(0, 8, content.encode('latin-1', 'replace').decode('latin-1'))  
+                data = pdf.output(dest='S')
+                self._store_output(target_file_name, data.encode('latin-1') if isinstance(data, str) else bytes(data))
+                print(f"    [{command_name}]: Archivo PDF (texto) '{target_file_name}' generado exitosamente.")
+                return
+            except Exception as e:
+                self._error(f"    ERROR [{command_name}]: Al generar PDF (texto): {type(e).__name__}: {e}")
+                return
+        
+        
+        message = f"    [{command_name}]: Archivo '{target_file_name}' creado exitosamente."
+        try:
+            if encoded_text:
+                # Mismo final de línea que el modo texto; la lectura en bytes ya descarta los '\r'.
+                data = content
+                if os.linesep != '\n':
+                    data = data.replace(b'\n', os.linesep.encode('ascii'))
+                self._store_output(target_file_name, data, lambda: content.decode('utf-8', errors='replace'), message)
+            elif binary_mode:
+                self._store_output(target_file_name, content, message=message)
+            else:
+                data = content.encode('utf-8')
+                if os.linesep != '\n':
+                    data = data.replace(b'\n', os.linesep.encode('ascii'))
+                self._store_output(target_file_name, data, lambda: content, message)
+
+        except Exception as e:
+            self._error(f"    ERROR [{command_name}]: Al escribir el archivo: {e}")
+
+    
+
+    
+
+    
+
+    
+
+    def handle_fragment(self, command: FragmentCommand):
+        """
+        Fragmenta un archivo de texto en múltiples archivos usando un delimitador.
+        """
+        print(f"    [FRAGMENTAR]: Procesando fragmentación de '{command.source_file}'...")
+
+        
+        try:
+            source_file_name = self.resolve_source(command.source_file, command.source_is_var)
+            delimiter = self.resolve_source(command.delimiter, command.delimiter_is_var)
+            target_base_name = self.resolve_source(command.target_base_name, command.target_is_var)
+            
+        except Exception as e:
+            self._error(f"    ERROR de Parámetro: {e}")
+            return
+            
+        
+        if source_file_name.lower().endswith('.pdf'):
+            self._error("    ERROR [FRAGMENTAR]: El archivo fuente debe ser TXT, no PDF.")
+            return
+
+        source_file_path = self.resolve_file_path(source_file_name)
+        content = self._read_utf8_bytes(source_file_name, source_file_path, target_base_name)
+        if content is None:
+            content = self._read_content(source_file_name, source_file_path)
+        
+        if content is None:
+            return
+
+        if not delimiter:
+            self._error("    ERROR [FRAGMENTAR]: El delimitador no puede estar vacío.")
+            return
+
+        
+        
+        encoded = isinstance(content, bytes)
+        if encoded:
+            delimiter = delimiter.encode('utf-8')
+        fragments = content.split(delimiter)
+        
+        
+        base_name, ext = os.path.splitext(target_base_name)
+        
+        
+        generated_names = [] 
+        
+        
+        fragment_count = 0
+        for i, fragment in enumerate(fragments):
+            
+            
+            
+            
+            
+            
+            
+            if (patterns.strip_utf8(fragment) if encoded else fragment.strip()) == content[:0]:
+                
+                
+                continue 
+            
+            fragment_count += 1
+            
+            
+            target_file_name = f"{base_name}{fragment_count}{ext}"
+            target_file_path = self.resolve_file_path(target_file_name)
+            
+            
+            
+            final_fragment_content = fragment
+            
+            
+            
+            
+            if i < len(fragments) - 1:
+                
+                
+                if encoded:
+                    final_fragment_content = patterns.strip_utf8(fragment) + b"\n" + delimiter + b"\n"
+                else:
+                    final_fragment_content = fragment.strip() + f"\n{delimiter}\n"
+            else:
+                
+                final_fragment_content = patterns.strip_utf8(fragment, left=False) if encoded else fragment.rstrip() 
+            
+            
+            
+            self._write_output(final_fragment_content, target_file_name, target_file_path, "FRAGMENTAR")
+            generated_names.append(target_file_name) 
+
+        if fragment_count > 0:
+            print(f"    [FRAGMENTAR]: '{source_file_name}' fragmentado exitosamente.")
+            
+            
+            print("    [FRAGMENTAR] Archivos generados:")
+            for name in generated_names:
+                print(f"        -> {name}")
+        else:
+            print("    ADVERTENCIA [FRAGMENTAR]: No se generó ningún archivo. El delimitador no fue encontrado o el archivo estaba vacío.")
+
+
+    
+
+
+    
+
+    def handle_invert(self, command: InvertCommand):
+        """Invierte el orden de las páginas de un PDF."""
+        print(f"    [INVERTIR]: Procesando inversión de '{command.source_file}'...")
+        try:
+            source_file_name = self.resolve_source(command.source_file, command.source_is_var)
+            target_file_name = self.resolve_source(command.target_file, command.target_is_var)
+            source_file_path = self.resolve_file_path(source_file_name)
+            target_file_path = self.resolve_file_path(target_file_name)
+        except Exception as e:
+            self._error(f"    ERROR de Parámetro: {e}")
+            return
+            
+        if not (source_file_name.lower().endswith('.pdf') and target_file_name.lower().endswith('.pdf')):
+            self._error("    ERROR [INVERTIR]: Los archivos fuente y destino deben ser PDF.")
+            return
+
+        PdfReader, PdfWriter = pypdf_classes()
+        if PdfReader is None or PdfWriter is None:
+            self._error("    ERROR [INVERTIR]: Las librerías PyPDF2 (pypdf) son necesarias.")
+            return
+
+        try:
+            reader = self._pdf_reader(source_file_name)
+            total_pages = len(reader.pages)
+            if total_pages == 0:
+                print(f"    ADVERTENCIA [INVERTIR]: El archivo '{source_file_name}' está vacío. No se realizó ninguna acción.")
+                return
+
+            writer = PdfWriter()
+            for i in range(total_pages - 1, -1, -1):
+                writer.add_page(reader.pages[i])
+            registry.inc('arkscript_pdf_pages_processed_total', total_pages, command='invertir')
+            
+            output = io.BytesIO()
+            writer.write(output)
+            self._store_output(target_file_name, output.getvalue())
+            print(f"    [INVERTIR]: {total_pages} páginas invertidas y guardadas en '{target_file_name}'.")
+                
+        except FileNotFoundError:
+            self._error(f"    ERROR de Archivo: Archivo fuente no encontrado: '{source_file_name}'.")
+        except Exception as e:
+            self._error(f"    ERROR de Inversión: Fallo al procesar '{source_file_name}': {type(e).__name__}: {e}")
+
+
+    def handle_extract(self, command: ExtractCommand):
+        
+        print(f"    [EXTRAER]: Procesando extracción de '{command.source_file}'...")
+        try:
+            source_file_name = self.resolve_source(command.source_file, command.source_is_var)
+            target_file_name = self.resolve_source(command.target_file, command.target_is_var)
+            source_file_path = self.resolve_file_path(source_file_name)
+            target_file_path = self.resolve_file_path(target_file_name)
+            start_page = int(command.start_page)
+            end_page = int(command.end_page)
+            start_index = start_page - 1 
+            end_index = end_page - 1
+        except Exception as e:
+            self._error(f"    ERROR de Parámetro: {e}")
+            return
+            
+        if not source_file_name.lower().endswith('.pdf'):
+            self._error("    ERROR [EXTRAER]: El archivo fuente debe ser un PDF.")
+            return
+
+        PdfReader, PdfWriter = pypdf_classes()
+        if PdfReader is None or PdfWriter is None:
+            self._error("    ERROR [EXTRAER]: Las librerías PyPDF2 (pypdf) son necesarias.")
+            return
+
+        try:
+            reader = self._pdf_reader(source_file_name)
+            total_pages = len(reader.pages)
+
+            if start_index < 0 or end_index >= total_pages or start_index > end_index:
+                self._error(f"    ERROR [EXTRAER]: Rango de páginas no válido ({start_page} a {end_page}). El documento tiene {total_pages} páginas.")
+                return
+
+            registry.inc('arkscript_pdf_pages_processed_total', end_index - start_index + 1, command='extraer')
+
+            if target_file_name.lower().endswith('.pdf'):
+                writer = PdfWriter()
+                for i in range(start_index, end_index + 1):
+                    writer.add_page(reader.pages[i]) 
+                
+                output = io.BytesIO()
+                writer.write(output)
+                self._store_output(target_file_name, output.getvalue())
+                print(f"    [EXTRAER]: Páginas {start_page}-{end_page} extraídas a '{target_file_name}' (PDF).")
+
+            else:
+                extracted_text = []
+                for i in range(start_index, end_index + 1):
+                    text = reader.pages[i].extract_text()
+                    if text:
+                        extracted_text.append(f"--- Página {i + 1} ---\n{text}\n")
+                
+                final_content = "\n".join(extracted_text)
+                self._write_output(final_content, target_file_name, target_file_path, "EXTRAER")
+                print(f"    [EXTRAER]: Páginas {start_page}-{end_page} extraídas a '{target_file_name}' (TXT).")
+                
+        except FileNotFoundError:
+            self._error(f"    ERROR de Archivo: Archivo fuente no encontrado: '{source_file_name}'.")
+        except Exception as e:
+            self._error(f"    ERROR de Extracción: Fallo al procesar '{source_file_name}': {type(e).__name__}: {e}")
+
+    
+
+    def handle_enumerate(self, command: EnumerateCommand):
+        """Enumera las ocurrencias de un término con una secuencia numérica, leyendo de un archivo y escribiendo en otro."""
+        print(f"    [ENUMERAR]: Procesando enumeración...")
+        
+        try:
+            source_term = self.resolve_source(command.source, command.source_is_var)
+            
+            
+            source_file_name = self.resolve_source(command.source_doc, command.source_is_var_doc) 
+            source_file_path = self.resolve_file_path(source_file_name)
+            
+            
+            target_file_name = self.resolve_source(command.target_file, command.target_is_var)
+            target_file_path = self.resolve_file_path(target_file_name)
+            
+            start = int(command.start_num)
+            end = int(command.end_num)
+            padding = int(command.padding)
+            prefix = self.resolve_source(command.prefix, command.prefix_is_var)
+            
+        except Exception as e:
+            self._error(f"    ERROR de Parámetro: {e}")
+            return
+            
+        if not source_term:
+            self._error("    ERROR [ENUMERAR]: El término a enumerar no puede estar vacío.")
+            return
+        
+        content = self._read_utf8_bytes(source_file_name, source_file_path, target_file_name)
+        if content is None:
+            content = self._read_content(source_file_name, source_file_path)
+        if content is None: return
+
+        step_name = "ascendente" if start <= end else "descendente"
+        sequence_length = abs(end - start) + 1
+        print(f"    [ENUMERAR]: Secuencia {step_name} de {sequence_length} números generada.")
+        
+        # La secuencia se genera a medida que aparece el término: la memoria no depende del rango.
+        encoding = 'utf-8' if isinstance(content, bytes) else None
+        term = source_term.encode('utf-8') if encoding else source_term
+        numbers = patterns.numbering(start, end, padding, prefix, encoding)
+        new_content, num_replacements = patterns.substitute_sequence(content, term, numbers)
+        
+        if num_replacements == 0:
+            print(f"    [ENUMERAR]: No se encontró el término '{source_term}' en '{source_file_name}'.")
+            
+            self._write_output(content, target_file_name, target_file_path, "ENUMERAR")
+            return
+        
+        
+        self._write_output(new_content, target_file_name, target_file_path, "ENUMERAR")
+        
+        if num_replacements > 0:
+            print(f"    [ENUMERAR]: {num_replacements} ocurrencias de '{source_term}' reemplazadas secuencialmente y guardadas en '{target_file_name}'.")
+    
+
+    def handle_fusion(self, command: FusionCommand):
+        
+        doc1_name = self.resolve_source(command.doc1, command.doc1_is_var)
+        doc2_name = self.resolve_source(command.doc2, command.doc2_is_var)
+        separator = self.resolve_source(command.separator, command.separator_is_var)  
+        output_file = self.resolve_source(command.output, command.output_is_var)
+        
+        path1 = self.resolve_file_path(doc1_name)
+        path2 = self.resolve_file_path(doc2_name)
+        output_path = self.resolve_file_path(output_file)
+
+        print(f"    [FUSIONAR]: '{doc1_name}' con '{doc2_name}' separador: '{separator[:20]}...' en '{output_file}'")
+        
+        content1 = self._read_content(doc1_name, path1)
+        content2 = self._read_content(doc2_name, path2)
+
+        if content1 is None or content2 is None:
+              self._error("    ERROR: La fusión no pudo completarse debido a errores de lectura de archivos.")
+              return
+            
+        fused_content = content1.strip() + "\n\n" + separator + "\n\n" + content2.strip()
+        self._write_output(fused_content, output_file, output_path, "FUSIONAR")
+
+
+    def handle_search(self, command: SearchCommand):
+        
+        search_term = self.resolve_source(command.search_term, command.search_term_is_var) 
+        target_name = self.resolve_source(command.target, command.target_is_var) 
+        file_path = self.resolve_file_path(target_name)
+        sensitive = 'si' if command.sensitivity == 'con' else 'no' 
+
+        if command.with_positions:
+            return self._search_positions(command, search_term, target_name, file_path, sensitive == 'si')
+
+        count = None
+        index = search_indexes.get(file_path) if self._search_index_enabled() else None
+        if index is not None and not command.is_regex:
+            count = index.count(search_term, case_sensitive=(sensitive == 'si'))
+
+        data = None
+        if count is None and search_term and sensitive == 'si' and not command.is_regex:
+            data = self._read_utf8_bytes(target_name, file_path)
+        if data is not None:
+            count = data.count(search_term.encode('utf-8'))
+            if self._search_index_enabled() and index is None:
+                enqueue_index_build(file_path, lambda: data.decode('utf-8', errors='replace'))
+
+        if count is None:
+            content = self._read_content(target_name, file_path)
+            if content is None: return
+            
+            try:
+                count = patterns.count_matches(content, search_term, sensitive == 'si', command.is_regex)
+            except re.error as e:
+                self._error(f"    ERROR de Patrón: Expresión regular no válida '{search_term}': {e}")
+                return
+
+            if self._search_index_enabled() and index is None:
+                enqueue_index_build(file_path, lambda: content)
+
+        print(f"    [BUSCAR]: Se encontraron {count} repeticiones de '{search_term}' en '{target_name}' (Sensible: {sensitive}).")
+        return count
+
+    def _search_positions(self, command, search_term, target_name, file_path, case_sensitive):
+        """
+        Localiza cada aparición y la traduce a línea, columna y página mediante el índice de
+        líneas del documento (el de la caché de texto en los PDF), sin volver a recorrerlo.
+        """
+        content, line_index = self._read_with_line_index(target_name, file_path)
+        if content is None:
+            return None
+
+        try:
+            offsets = list(patterns.match_offsets(content, search_term, case_sensitive, command.is_regex))
+        except re.error as e:
+            self._error(f"    ERROR de Patrón: Expresión regular no válida '{search_term}': {e}")
+            return None
+
+        sensitive = 'si' if case_sensitive else 'no'
+        print(f"    [BUSCAR]: Se encontraron {len(offsets)} repeticiones de '{search_term}' en '{target_name}' (Sensible: {sensitive}).")
+        for offset in offsets[:self.MAX_POSITIONS_SHOWN]:
+            line, column, page = line_index.position(offset)
+            location = f"línea {line}, columna {column}"
+            if page is not None:
+                location += f" (página {page})"
+            print(f"        {location}")
+        if len(offsets) > self.MAX_POSITIONS_SHOWN:
+            print(f"        (y {len(offsets) - self.MAX_POSITIONS_SHOWN} más)")
+        return len(offsets)
+
+    def _read_with_line_index(self, file_name, file_path):
+        """Devuelve (contenido, LineIndex) del documento, o (None, None) si no se pudo leer."""
+        if not file_name.lower().endswith('.pdf'):
+            content = self._read_content(file_name, file_path)
+            if content is None:
+                return None, None
+            if file_path is None:
+                return content, LineIndex.from_text(content)
+            return content, line_indexes.get_or_build(file_path, content)
+
+        if pypdf_classes()[0] is None:
+            self._error(f"    ERROR de Lectura: No se puede leer PDF '{file_name}'. La librería PyPDF2 no está disponible.")
+            return None, None
+        try:
+            self._touch(file_name)
+            entry, hit = self._pdf_entry(file_name, file_path)
+        except FileNotFoundError:
+            self._error(f"    ERROR de Archivo: Archivo no encontrado: '{file_name}'.")
+            return None, None
+        except Exception as e:
+            self._error(f"    ERROR de Lectura: Fallo al leer '{file_name}': {type(e).__name__}: {e}")
+            return None, None
+        origin = "obtenido de la caché" if hit else "extraído y cacheado"
+        print(f"    [LECTURA]: Contenido de texto de PDF '{file_name}' {origin}.")
+        return joined_text(entry), LineIndex.from_pdf_entry(entry)
+
+    def handle_search_all(self, command: SearchAllCommand):
+        """
+        Busca el término en todos los TXT y PDF del espacio de trabajo a la vez y muestra
+        una tabla con las repeticiones por archivo y el total.
+        """
+        search_term = self.resolve_source(command.search_term, command.search_term_is_var)
+        case_sensitive = command.sensitivity == 'con'
+        sensitive = 'si' if case_sensitive else 'no'
+
+        names = [
+            name for name in self.storage.list()
+            if not name.startswith('.') and name.lower().endswith(self.SEARCHABLE_EXTENSIONS)
+        ]
+        if not names:
+            print("    ADVERTENCIA [BUSCAR]: No hay archivos TXT ni PDF en el espacio de trabajo.")
+            return 0
+
+        if command.is_regex:
+            try:
+                patterns.compile_pattern(search_term, case_sensitive)
+            except re.error as e:
+                self._error(f"    ERROR de Patrón: Expresión regular no válida '{search_term}': {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(self.SEARCH_ALL_WORKERS, len(names))) as pool:
+            results = list(pool.map(lambda name: self._count_in_document(name, search_term, case_sensitive, command.is_regex), names))
+
+        matches = sorted(((count, name) for name, count, _ in results if count), key=lambda item: (-item[0], item[1]))
+        failures = [(name, error) for name, _, error in results if error]
+        total = sum(count for count, _ in matches)
+        width = max([len(name) for _, name in matches] + [len('TOTAL')])
+
+        print(f"    [BUSCAR]: '{search_term}' en {len(names)} archivo(s) del espacio de trabajo (Sensible: {sensitive}).")
+        for count, name in matches:
+            print(f"        {name.ljust(width)}  {count}")
+        print(f"        {'TOTAL'.ljust(width)}  {total}")
+        without_matches = len(names) - len(matches) - len(failures)
+        if without_matches:
+            print(f"        ({without_matches} archivo(s) sin repeticiones)")
+        for name, error in failures:
+            self._error(f"    ERROR de Lectura: Fallo al leer '{name}': {error}")
+        return total
+
+    def _count_in_document(self, file_name, search_term, case_sensitive, is_regex=False):
+        """Devuelve (nombre, repeticiones, error) sin escribir en la consola; apto para hilos."""
+        file_path = self.resolve_file_path(file_name)
+        try:
+            index = search_indexes.get(file_path) if self._search_index_enabled() else None
+            if index is not None and not is_regex:
+                count = index.count(search_term, case_sensitive=case_sensitive)
+                if count is not None:
+                    return file_name, count, None
+
+            if file_name.lower().endswith('.pdf'):
+                if pypdf_classes()[0] is None:
+                    return file_name, 0, "la librería pypdf no está disponible"
+                entry, _ = self._pdf_entry(file_name, file_path)
+                content = joined_text(entry)
+            else:
+                content = self.storage.read_text(file_name)
+
+            if self._search_index_enabled() and index is None:
+                enqueue_index_build(file_path, lambda: content)
+        except Exception as e:
+            return file_name, 0, f"{type(e).__name__}: {e}"
+
+        return file_name, patterns.count_matches(content, search_term, case_sensitive, is_regex), None
+
+    def handle_count(self, command: CountCommand):
+        
+        source_name = self.variables.get(command.source_var)
+        file_path = self.resolve_file_path(source_name)
+        
+        print(f"    [CONTAR]: Contando frecuencia en '{source_name}' de {command.range_start} a {command.range_end}...")
+
+        content = self._read_content(source_name, file_path)
+        if content is None: return
+
+        total_chars = len(content)
+        
+        if command.range_start <= total_chars <= command.range_end:
+             print(f"    RESULTADO: El archivo tiene {total_chars} caracteres. Está DENTRO del rango [{command.range_start}:{command.range_end}].")
+        else:
+             print(f"    RESULTADO: El archivo tiene {total_chars} caracteres. Está FUERA del rango [{command.range_start}:{command.range_end}].")
+
+
+    def handle_replace_overwrite(self, command: ReplaceOverwriteCommand):
+        
+        command_type = command.command_type.upper()
+        
+        print(f"    [{command_type}]: Procesando en '{command.source_doc}'...")
+        
+        try:
+            (content, original_term, new_term, 
+             target_file_name, target_file_path) = self._prepare_modification_command(command)
+        except Exception as e:
+            self._error(f"    ERROR al resolver variables de {command_type}: {e}")
+            return
+            
+        if content is None: return
+
+        if not command.is_regex and not original_term:
+            self._error(f"    ERROR [{command_type}]: El término a reemplazar no puede estar vacío.")
+            return
+        
+        limit = float('inf') if command.replace_range == 'todo' else int(command.replace_range)
+        frequency = int(command.frequency)
+
+        try:
+            search_for, replace_with = original_term, new_term
+            if isinstance(content, bytes):
+                search_for, replace_with = original_term.encode('utf-8'), new_term.encode('utf-8')
+            if command.is_regex:
+                find = patterns.regex_finder(content, search_for, replace_with)
+                new_content, replacement_count, match_count = patterns.rewrite(
+                    content, find, limit, frequency, overwrite=(command_type == 'SOBREESCRIBIR')
+                )
+            elif command_type == 'SOBREESCRIBIR':
+                find = patterns.literal_finder(content, search_for, replace_with)
+                new_content, replacement_count, match_count = patterns.rewrite(content, find, limit, frequency, overwrite=True)
+            else:
+                new_content, replacement_count, match_count = patterns.replace_literal(content, search_for, replace_with, limit, frequency)
+        except (re.error, IndexError) as e:
+            self._error(f"    ERROR de Patrón: Expresión regular o reemplazo no válido '{original_term}' -> '{new_term}': {e}")
+            return
+
+        if match_count == 0:
+            print(f"    [{command_type}]: No se encontraron coincidencias de '{original_term}' en '{target_file_name}'.")
+            self._write_output(content, target_file_name, target_file_path, command_type)
+            return
+
+        if command_type == 'SOBREESCRIBIR':
+            print(f"    [SOBREESCRIBIR]: Aplicando modo 'Sobreescribir' (reemplaza {len(new_term)} chars por aparición de '{original_term}').")
+
+        self._write_output(new_content, target_file_name, target_file_path, command_type) 
+        
+        if replacement_count > 0:
             print(f"    [{command_type}]: {replacement_count} modificación(es) realizada(s). Lectura: '{target_file_name}'.")
\ No newline at end of file
@@ -0,0 +1,279 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class FileRegistry:
+    """
+    Registro de metadatos de los archivos del espacio de trabajo sobre SQLite en modo WAL.
+    Cada hilo usa su propia conexión, de modo que es seguro entre hilos y entre procesos
+    que compartan el mismo directorio.
+    """
+
+    REGISTRY_DIR_NAME = '.registry'
+    DB_NAME = 'files.sqlite3'
+    LEGACY_METADATA_NAME = 'input_files.json'
+
+    ORIGIN_INPUT = 'input'
+    ORIGIN_GENERATED = 'generated'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            name TEXT PRIMARY KEY,
+            size INTEGER,
+            sha256 TEXT,
+            type TEXT,
+            page_count INTEGER,
+            origin TEXT NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_files_origin ON files(origin);
+        CREATE INDEX IF NOT EXISTS idx_files_last_access ON files(last_access);
+        CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files(sha256);
+        CREATE TABLE IF NOT EXISTS memo (
+            key TEXT PRIMARY KEY,
+            log TEXT NOT NULL,
+            outputs TEXT NOT NULL,
+            value TEXT,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_memo_created ON memo(created);
+        CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY,
+            outputs TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access);
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_workspace(cls, workspace_dir):
+        """Devuelve la instancia compartida del registro para el directorio indicado."""
+        key = os.path.abspath(workspace_dir)
+        with cls._instances_lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = cls(workspace_dir)
+                cls._instances[key] = instance
+            return instance
+
+    def __init__(self, workspace_dir):
+        self.workspace_dir = workspace_dir
+        registry_dir = os.path.join(workspace_dir, self.REGISTRY_DIR_NAME)
+        os.makedirs(registry_dir, exist_ok=True)
+        self.db_path = os.path.join(registry_dir, self.DB_NAME)
+        self._local = threading.local()
+
+        self._connection().executescript(self.SCHEMA)
+        self._add_missing_columns()
+        self._import_legacy_metadata()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=10000')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _add_missing_columns(self):
+        """Añade a una base de datos anterior las columnas incorporadas después."""
+        conn = self._connection()
+        memo_columns = {row['name'] for row in conn.execute('PRAGMA table_info(memo)')}
+        if 'value' not in memo_columns:
+            conn.execute('ALTER TABLE memo ADD COLUMN value TEXT')
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def _import_legacy_metadata(self):
+        """Importa una única vez la lista de entradas del antiguo input_files.json."""
+        legacy_path = os.path.join(self.workspace_dir, self.LEGACY_METADATA_NAME)
+        if not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, 'r') as f:
+                names = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            names = []
+        for name in names:
+            if isinstance(name, str) and os.path.isfile(os.path.join(self.workspace_dir, name)):
+                self.record(name, self.ORIGIN_INPUT)
+        os.remove(legacy_path)
+
+    def record(self, name, origin, sha256=None, page_count=None):
+        """
+        Crea o actualiza la entrada del archivo con su tamaño y tipo actuales. Un archivo de
+        entrada sobrescrito por un comando sigue contando como entrada.
+        """
+        path = os.path.join(self.workspace_dir, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        file_type = os.path.splitext(name)[1].lstrip('.').lower() or None
+
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO files (name, size, sha256, type, page_count, origin, last_access)
+                VALUES (?, ?, ?, ?, COALESCE(?, (SELECT page_count FROM files WHERE sha256 = ? AND page_count IS NOT NULL LIMIT 1)), ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    size = excluded.size,
+                    sha256 = excluded.sha256,
+                    type = excluded.type,
+                    page_count = excluded.page_count,
+                    origin = CASE WHEN files.origin = 'input' THEN 'input' ELSE excluded.origin END,
+                    last_access = excluded.last_access
+                """,
+                (name, size, sha256, file_type, page_count, sha256, origin, time.time())
+            )
+
+    def get(self, name):
+        row = self._connection().execute('SELECT * FROM files WHERE name = ?', (name,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def touch(self, name):
+        with self._transaction() as conn:
+            conn.execute('UPDATE files SET last_access = ? WHERE name = ?', (time.time(), name))
+
+    def set_page_count(self, sha256, page_count):
+        """Guarda el número de páginas en todas las entradas que comparten el contenido."""
+        with self._transaction() as conn:
+            conn.execute('UPDATE files SET page_count = ? WHERE sha256 = ?', (page_count, sha256))
+
+    def names(self, origin=None):
+        conn = self._connection()
+        if origin is None:
+            rows = conn.execute('SELECT name FROM files').fetchall()
+        else:
+            rows = conn.execute('SELECT name FROM files WHERE origin = ?', (origin,)).fetchall()
+        return [row['name'] for row in rows]
+
+    def input_filenames(self):
+        return set(self.names(self.ORIGIN_INPUT))
+
+    def expired(self, origin, last_access_before):
+        """Nombres del origen indicado cuyo último acceso es anterior al instante dado."""
+        rows = self._connection().execute(
+            'SELECT name FROM files WHERE origin = ? AND last_access < ?', (origin, last_access_before)
+        ).fetchall()
+        return [row['name'] for row in rows]
+
+    def least_recently_used(self):
+        """Entradas (nombre, tamaño, origen, sha256) de la menos a la más recientemente usada."""
+        rows = self._connection().execute(
+            'SELECT name, size, origin, sha256 FROM files ORDER BY last_access ASC'
+        ).fetchall()
+        return [(row['name'], row['size'] or 0, row['origin'], row['sha256']) for row in rows]
+
+    def known_hashes(self):
+        rows = self._connection().execute('SELECT DISTINCT sha256 FROM files WHERE sha256 IS NOT NULL').fetchall()
+        return {row['sha256'] for row in rows}
+
+    def memo_get(self, key):
+        """Devuelve {'log', 'outputs', 'value'} del resultado memorizado para la clave, o None."""
+        row = self._connection().execute('SELECT log, outputs, value FROM memo WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value = json.loads(row['value']) if row['value'] is not None else None
+        return {"log": row['log'], "outputs": json.loads(row['outputs']), "value": value}
+
+    def memo_put(self, key, log, outputs, value=None):
+        """Guarda la salida por consola, las salidas [(nombre, sha256)] y el valor devuelto de un comando."""
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO memo (key, log, outputs, value, created) VALUES (?, ?, ?, ?, ?)',
+                (key, log, json.dumps(outputs), json.dumps(value) if value is not None else None, time.time())
+            )
+
+    def prune_memo(self, created_before):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM memo WHERE created < ?', (created_before,))
+
+    def result_get(self, key):
+        """Devuelve las salidas [(sufijo, sha256, tamaño)] del resultado compartido y lo marca como usado."""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT outputs FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE results SET hits = hits + 1, last_access = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row['outputs'])
+
+    def result_put(self, key, outputs):
+        size = sum(output_size for _, _, output_size in outputs)
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO results (key, outputs, size, last_access) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET outputs = excluded.outputs, size = excluded.size, last_access = excluded.last_access
+                """,
+                (key, json.dumps(outputs), size, time.time())
+            )
+
+    def result_remove(self, key):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM results WHERE key = ?', (key,))
+
+    def evict_results(self, max_bytes):
+        """Descarta los resultados menos usados recientemente hasta que el total quepa en max_bytes."""
+        with self._transaction() as conn:
+            rows = conn.execute('SELECT key, size FROM results ORDER BY last_access DESC').fetchall()
+            total = 0
+            evicted = []
+            for row in rows:
+                total += row['size']
+                if total > max_bytes:
+                    evicted.append((row['key'],))
+            conn.executemany('DELETE FROM results WHERE key = ?', evicted)
+        return len(evicted)
+
+    def least_recently_used_results(self):
+        """Resultados compartidos (clave, salidas) del menos al más recientemente usado."""
+        rows = self._connection().execute('SELECT key, outputs FROM results ORDER BY last_access ASC').fetchall()
+        return [(row['key'], json.loads(row['outputs'])) for row in rows]
+
+    def result_hashes(self):
+        hashes = set()
+        for row in self._connection().execute('SELECT outputs FROM results').fetchall():
+            hashes.update(digest for _, digest, _ in json.loads(row['outputs']))
+        return hashes
+
+    def remove(self, names):
+        names = list(names)
+        if not names:
+            return
+        with self._transaction() as conn:
+            conn.executemany('DELETE FROM files WHERE name = ?', [(name,) for name in names])
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM files')
+            conn.execute('DELETE FROM memo')
+            conn.execute('DELETE FROM results')
+
+
+class _Transaction:
+    """Bloque BEGIN IMMEDIATE / COMMIT sobre la conexión del hilo."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
@@ -0,0 +1,279 @@
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+
+from .blob_store import BlobStore
+from .file_registry import FileRegistry
+from .metrics import registry
+from .storage import DirectoryStorage
+
+
+class TempFilesCollector(threading.Thread):
+    """
+    Recolector en segundo plano del espacio de trabajo. Elimina las salidas y entradas
+    cuyo último acceso supera su TTL, y cuando el uso de disco pasa de la marca alta
+    expulsa archivos por antigüedad de acceso hasta bajar de la marca baja. También
+    retira blobs huérfanos, entradas de caché sin blob y subidas abandonadas.
+    """
+
+    def __init__(self, workspace_dir, interval=60, output_ttl=3600, input_ttl=24 * 3600,
+                 upload_ttl=24 * 3600, high_water_bytes=10 * 1024 ** 3, low_water_ratio=0.8,
+                 disk_high_water_ratio=None):
+        super().__init__(name='recolector-temp-files', daemon=True)
+        self.workspace_dir = workspace_dir
+        self.interval = interval
+        self.output_ttl = output_ttl
+        self.input_ttl = input_ttl
+        self.upload_ttl = upload_ttl
+        self.high_water_bytes = high_water_bytes
+        self.low_water_ratio = low_water_ratio
+        self.disk_high_water_ratio = disk_high_water_ratio
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.collect()
+            except Exception as e:
+                print(f"    ADVERTENCIA [RECOLECTOR]: {type(e).__name__}: {e}", file=sys.stderr)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def collect(self):
+        """Ejecuta una pasada completa de recolección y devuelve el número de archivos eliminados."""
+        file_registry = FileRegistry.for_workspace(self.workspace_dir)
+        now = time.time()
+
+        expired = file_registry.expired(FileRegistry.ORIGIN_GENERATED, now - self.output_ttl)
+        expired += file_registry.expired(FileRegistry.ORIGIN_INPUT, now - self.input_ttl)
+        removed = self._remove_names(file_registry, expired)
+
+        used = self._used_bytes()
+        disk_excess = self._disk_excess_bytes()
+        if used > self.high_water_bytes or disk_excess > 0:
+            removed += self._relieve_pressure(file_registry, used, disk_excess)
+
+        file_registry.prune_memo(now - self.output_ttl)
+        removed += self._remove_orphan_blobs(file_registry, grace=self.output_ttl)
+        self._remove_stale_uploads(now)
+        self._remove_stale_compressed()
+        self._remove_stale_writes(now)
+
+        if removed:
+            registry.inc('arkscript_gc_removed_files_total', removed)
+        return removed
+
+    def _disk_excess_bytes(self):
+        """Bytes de disco usados por encima de la marca alta (0 o negativo si no se supera)."""
+        if self.disk_high_water_ratio is None:
+            return 0
+        usage = shutil.disk_usage(self.workspace_dir)
+        return usage.used - usage.total * self.disk_high_water_ratio if usage.total else 0
+
+    def _used_bytes(self):
+        """
+        Bytes que ocupa de verdad el espacio de trabajo: cada inodo se cuenta una vez, así
+        que los blobs, sus enlaces visibles y la caché de resultados suman lo que ocupan.
+        """
+        seen = set()
+        total = 0
+        for root, _, filenames in os.walk(self.workspace_dir):
+            for filename in filenames:
+                try:
+                    stat = os.lstat(os.path.join(root, filename))
+                except FileNotFoundError:
+                    continue
+                if (stat.st_dev, stat.st_ino) not in seen:
+                    seen.add((stat.st_dev, stat.st_ino))
+                    total += stat.st_size
+        return total
+
+    def _relieve_pressure(self, file_registry, used, disk_excess):
+        """
+        Libera espacio hasta bajar de la marca baja: primero las entradas de la caché de
+        resultados, que se pueden recalcular, y después los archivos por antigüedad de
+        acceso. Los blobs que se quedan sin referencias se borran en el acto, sin periodo
+        de gracia, y solo se descuenta lo que se libera de verdad.
+        """
+        low_water = self.high_water_bytes * self.low_water_ratio
+        blob_store = BlobStore(self.workspace_dir)
+        entries = file_registry.least_recently_used()
+        results = file_registry.least_recently_used_results()
+        references = Counter(digest for _, _, _, digest in entries if digest)
+        for _, outputs in results:
+            references.update(digest for _, digest, _ in outputs)
+
+        removed = 0
+        for key, outputs in results:
+            if used <= low_water and disk_excess <= 0:
+                return removed
+            file_registry.result_remove(key)
+            for _, digest, _ in outputs:
+                freed, blob_removed = self._release_blob(blob_store, references, digest)
+                used -= freed
+                disk_excess -= freed
+                removed += blob_removed
+
+        for name, _, _, digest in entries:
+            if used <= low_water and disk_excess <= 0:
+                break
+            freed, name_removed = self._remove_name(file_registry, name)
+            removed += name_removed
+            if digest and name_removed:
+                blob_freed, blob_removed = self._release_blob(blob_store, references, digest)
+                freed += blob_freed
+                removed += blob_removed
+            used -= freed
+            disk_excess -= freed
+        return removed
+
+    def _release_blob(self, blob_store, references, digest):
+        """
+        Descuenta una referencia al blob y lo borra al soltar la última. Devuelve
+        (bytes liberados, blobs borrados).
+        """
+        references[digest] -= 1
+        if references[digest] > 0:
+            return 0, 0
+        blob_path = blob_store.blob_path(digest)
+        try:
+            stat = os.stat(blob_path)
+            os.remove(blob_path)
+        except FileNotFoundError:
+            return 0, 0
+        cache_entry = os.path.join(self.workspace_dir, '.text_cache', f"{digest}.json")
+        if os.path.exists(cache_entry):
+            os.remove(cache_entry)
+        return (stat.st_size if stat.st_nlink == 1 else 0), 1
+
+    def _remove_name(self, file_registry, name):
+        """Borra un nombre del espacio de trabajo. Devuelve (bytes liberados, archivos borrados)."""
+        path = os.path.join(self.workspace_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            file_registry.remove([name])
+            return 0, 0
+        if not self._remove_names(file_registry, [name]):
+            return 0, 0
+        return (stat.st_size if stat.st_nlink == 1 else 0), 1
+
+    def _remove_names(self, file_registry, names):
+        removed = 0
+        for name in names:
+            path = os.path.join(self.workspace_dir, name)
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"    ADVERTENCIA [RECOLECTOR]: No se pudo borrar '{name}': {e}", file=sys.stderr)
+                continue
+            file_registry.remove([name])
+        return removed
+
+    def _remove_orphan_blobs(self, file_registry, grace):
+        """
+        Borra los blobs sin nombres enlazados ni referencias en el registro o en la caché de
+        resultados, y su texto cacheado.
+        """
+        blob_dir = os.path.join(self.workspace_dir, BlobStore.BLOB_DIR_NAME)
+        text_cache_dir = os.path.join(self.workspace_dir, '.text_cache')
+        if not os.path.isdir(blob_dir):
+            return 0
+
+        referenced = file_registry.known_hashes() | file_registry.result_hashes()
+        cutoff = time.time() - grace
+        removed = 0
+
+        for prefix in os.listdir(blob_dir):
+            prefix_dir = os.path.join(blob_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for digest in os.listdir(prefix_dir):
+                blob_path = os.path.join(prefix_dir, digest)
+                try:
+                    stat = os.stat(blob_path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_nlink > 1 or digest in referenced or stat.st_mtime > cutoff:
+                    continue
+                os.remove(blob_path)
+                removed += 1
+                cache_entry = os.path.join(text_cache_dir, f"{digest}.json")
+                if os.path.exists(cache_entry):
+                    os.remove(cache_entry)
+        return removed
+
+    def _remove_stale_uploads(self, now):
+        """Descarta las subidas por fragmentos sin actividad durante más de su TTL."""
+        upload_dir = os.path.join(self.workspace_dir, '.uploads')
+        if not os.path.isdir(upload_dir):
+            return
+        sessions = {}
+        for filename in os.listdir(upload_dir):
+            upload_id, _ = os.path.splitext(filename)
+            try:
+                mtime = os.path.getmtime(os.path.join(upload_dir, filename))
+            except FileNotFoundError:
+                continue
+            sessions.setdefault(upload_id, []).append((filename, mtime))
+        for files in sessions.values():
+            if now - max(mtime for _, mtime in files) > self.upload_ttl:
+                for filename, _ in files:
+                    try:
+                        os.remove(os.path.join(upload_dir, filename))
+                    except FileNotFoundError:
+                        pass
+
+    def _remove_stale_compressed(self):
+        """Borra las copias gzip de descargas cuyo archivo original ya no existe."""
+        gz_dir = os.path.join(self.workspace_dir, '.gz')
+        if not os.path.isdir(gz_dir):
+            return
+        for filename in os.listdir(gz_dir):
+            if filename.startswith('.'):
+                continue
+            source_name = filename[:-len('.gz')] if filename.endswith('.gz') else None
+            if source_name and os.path.exists(os.path.join(self.workspace_dir, source_name)):
+                continue
+            try:
+                os.remove(os.path.join(gz_dir, filename))
+            except FileNotFoundError:
+                pass
+
+    def _remove_stale_writes(self, now):
+        """Borra los temporales de escrituras atómicas que un proceso interrumpido no llegó a renombrar."""
+        try:
+            filenames = os.listdir(self.workspace_dir)
+        except FileNotFoundError:
+            return
+        for filename in filenames:
+            if not filename.startswith(DirectoryStorage.TEMP_PREFIX):
+                continue
+            file_path = os.path.join(self.workspace_dir, filename)
+            try:
+                if now - os.path.getmtime(file_path) > self.output_ttl:
+                    os.remove(file_path)
+            except FileNotFoundError:
+                pass
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def start_collector(workspace_dir, **options):
+    """Arranca (una sola vez por proceso) el recolector del espacio de trabajo."""
+    global _collector
+    with _collector_lock:
+        if _collector is None or not _collector.is_alive():
+            _collector = TempFilesCollector(workspace_dir, **options)
+            _collector.start()
+        return _collector
@@ -1,136 +1,191 @@
-class Token:
-    def __init__(self, type_, value=None):
-        self.type = type_
-        self.value = value
-    def __repr__(self):
-        return f'{self.type}:{repr(self.value)}'
-
-class Lexer:
-    
-    KEYWORDS = {
-        
-        'var': 'KW_VAR',      
-        
-        
-        'con': 'KW_CON', 
-        'sin': 'KW_SIN',     
-        'de': 'KW_DE',
-        'por': 'KW_POR',
-        'en': 'KW_EN',
-        
-        'desde': 'KW_DESDE',    
-        'hasta': 'KW_HASTA',    
-        
-        
-        'buscar': 'KW_BUSCAR',
-        'fusionar': 'KW_FUSIONAR',
-        'reemplazar': 'KW_REEMPLAZAR',
-        'sobreescribir': 'KW_SOBREESCRIBIR',
-        'enumerar': 'KW_ENUMERAR',
-        'contar': 'KW_CONTAR',
-        'extraer': 'KW_EXTRAER',
-        'invertir': 'KW_INVERTIR',
-        'fragmentar': 'KW_FRAGMENTAR', 
-        
-        
-        'repeticiones': 'KW_REPETICIONES',
-        'sensibilidad': 'KW_SENSIBILIDAD',
-        'separado_por': 'KW_SEP_POR',    
-        'cada': 'KW_CADA',             
-        'todo': 'KW_TODO',             
-    }
-    
-    def __init__(self, text):
-        self.text = text
-        self.pos = 0
-        self.current_char = self.text[0] if text else None
-
-    def error(self, msg="Error léxico"):
-        raise Exception(f'{msg} cerca de la posición {self.pos}. Carácter: {repr(self.current_char)}')
-
-    def advance(self):
-        self.pos += 1
-        self.current_char = self.text[self.pos] if self.pos < len(self.text) else None
-
-    def peek(self):
-        peek_pos = self.pos + 1
-        if peek_pos < len(self.text):
-            return self.text[peek_pos]
-        return None
-
-    def skip_whitespace(self):
-        while self.current_char is not None and self.current_char.isspace():
-            self.advance()
-
-    def skip_comment(self):
-        """Ignora todo el texto hasta el final de la línea si ve '//'."""
-        while self.current_char is not None and self.current_char != '\n':
-            self.advance()
-        self.advance()
-        return Token('COMMENT')
-
-    def _id(self):
-        """Maneja Identificadores y Palabras Clave."""
-        result = ''
-        while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '_'):
-            result += self.current_char
-            self.advance()
-            
-        
-        token_type = self.KEYWORDS.get(result.lower(), 'IDENTIFIER') 
-        return Token(token_type, result)
-
-    def _string(self):
-        """Maneja Literales de Cadena."""
-        self.advance()
-        result = ''
-        while self.current_char is not None and self.current_char != '"':
-            result += self.current_char
-            self.advance()
-        if self.current_char != '"':
-             self.error("Literal de cadena sin cerrar")
-        self.advance()
-        return Token('STRING', result)
-
-    def _number(self):
-        """Maneja números."""
-        result = ''
-        while self.current_char is not None and self.current_char.isdigit():
-            result += self.current_char
-            self.advance()
-        return Token('NUMBER', int(result))
-
-    def tokenize(self):
-        tokens = []
-        while self.current_char is not None:
-            
-            self.skip_whitespace()
-            if self.current_char is None: break
-
-            
-            if self.current_char == '/' and self.peek() == '/':
-                self.advance() 
-                self.advance() 
-                tokens.append(self.skip_comment())
-                continue
-
-            if self.current_char.isalpha():
-                tokens.append(self._id())
-                continue
-
-            if self.current_char.isdigit():
-                tokens.append(self._number())
-                continue
-
-            if self.current_char == '"':
-                tokens.append(self._string())
-                continue
-
-            
-            if self.current_char == ',': tokens.append(Token('COMMA')); self.advance(); continue
-            if self.current_char == '=': tokens.append(Token('EQUALS')); self.advance(); continue
-            
-            self.error(f'Carácter no reconocido: {repr(self.current_char)}')
-            
-        tokens.append(Token('EOF'))
+import sys
+
+
+class Token:
+    # Sin __dict__ por instancia: los scripts generados llegan a millones de tokens.
+    __slots__ = ('type', 'value', 'line', 'column')
+
+    def __init__(self, type_, value=None, line=None, column=None):
+        self.type = type_
+        self.value = value
+        self.line = line
+        self.column = column
+    def __repr__(self):
+        return f'{self.type}:{repr(self.value)}'
+
+
+UNCLOSED_STRING = "Literal de cadena sin cerrar"
+
+
+class LexError(Exception):
+    """Error léxico con su posición: 'detail' es el mensaje sin la ubicación; línea y columna con base 1."""
+
+    def __init__(self, message, detail, line, column):
+        super().__init__(message)
+        self.detail = detail
+        self.line = line
+        self.column = column
+
+
+class Lexer:
+    
+    KEYWORDS = {
+        
+        'var': 'KW_VAR',      
+        
+        
+        'con': 'KW_CON', 
+        'sin': 'KW_SIN',     
+        'de': 'KW_DE',
+        'por': 'KW_POR',
+        'en': 'KW_EN',
+        
+        'desde': 'KW_DESDE',    
+        'hasta': 'KW_HASTA',    
+        
+        
+        'buscar': 'KW_BUSCAR',
+        'fusionar': 'KW_FUSIONAR',
+        'reemplazar': 'KW_REEMPLAZAR',
+        'sobreescribir': 'KW_SOBREESCRIBIR',
+        'enumerar': 'KW_ENUMERAR',
+        'contar': 'KW_CONTAR',
+        'extraer': 'KW_EXTRAER',
+        'invertir': 'KW_INVERTIR',
+        'fragmentar': 'KW_FRAGMENTAR', 
+        
+        
+        'repeticiones': 'KW_REPETICIONES',
+        'posiciones': 'KW_POSICIONES',
+        'sensibilidad': 'KW_SENSIBILIDAD',
+        'separado_por': 'KW_SEP_POR',    
+        'cada': 'KW_CADA',             
+        'todo': 'KW_TODO',             
+        'relleno': 'KW_RELLENO',
+        'prefijo': 'KW_PREFIJO',
+        'todos': 'KW_TODOS',
+        'patron': 'KW_PATRON',
+        'patrón': 'KW_PATRON',
+    }
+    
+    SYMBOLS = {',': 'COMMA', '=': 'EQUALS', '[': 'LBRACKET', ']': 'RBRACKET'}
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+        self.current_char = self.text[0] if text else None
+        self._line = 1
+        self._line_start = 0
+        self._located = 0
+
+    def error(self, msg="Error léxico", offset=None):
+        offset = self.pos if offset is None else offset
+        line, column = self.locate(offset)
+        raise LexError(f'{msg} cerca de la posición {offset} (línea {line}, columna {column}). Carácter: {repr(self.current_char)}',
+                       msg, line, column)
+
+    def locate(self, offset):
+        """Línea y columna (base 1) del desplazamiento; avanza de forma incremental desde la última consulta."""
+        if offset < self._located:
+            self._line, self._line_start, self._located = 1, 0, 0
+        newlines = self.text.count('\n', self._located, offset)
+        if newlines:
+            self._line += newlines
+            self._line_start = self.text.rfind('\n', self._located, offset) + 1
+        self._located = offset
+        return self._line, offset - self._line_start + 1
+
+    def advance(self):
+        self.pos += 1
+        self.current_char = self.text[self.pos] if self.pos < len(self.text) else None
+
+    def peek(self):
+        peek_pos = self.pos + 1
+        if peek_pos < len(self.text):
+            return self.text[peek_pos]
+        return None
+
+    def skip_whitespace(self):
+        while self.current_char is not None and self.current_char.isspace():
+            self.advance()
+
+    def skip_comment(self):
+        """Ignora todo el texto hasta el final de la línea si ve '//'."""
+        while self.current_char is not None and self.current_char != '\n':
+            self.advance()
+        self.advance()
+        return Token('COMMENT')
+
+    def _id(self):
+        """Maneja Identificadores y Palabras Clave."""
+        result = ''
+        while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '_'):
+            result += self.current_char
+            self.advance()
+            
+        
+        # Las palabras clave y los nombres de variable se repiten en todo el script: se
+        # internan para que todos los tokens compartan la misma cadena.
+        token_type = self.KEYWORDS.get(result.lower(), 'IDENTIFIER') 
+        return Token(token_type, sys.intern(result))
+
+    def _string(self):
+        """Maneja Literales de Cadena."""
+        start = self.pos
+        self.advance()
+        result = ''
+        while self.current_char is not None and self.current_char != '"':
+            result += self.current_char
+            self.advance()
+        if self.current_char != '"':
+             self.error(UNCLOSED_STRING, start)
+        self.advance()
+        return Token('STRING', result)
+
+    def _number(self):
+        """Maneja números."""
+        result = ''
+        while self.current_char is not None and self.current_char.isdigit():
+            result += self.current_char
+            self.advance()
+        return Token('NUMBER', int(result))
+
+    def _next_token(self):
+        """Lee el token que empieza en la posición actual (sin espacios delante)."""
+        if self.current_char == '/' and self.peek() == '/':
+            self.advance() 
+            self.advance() 
+            return self.skip_comment()
+
+        if self.current_char.isalpha():
+            return self._id()
+
+        if self.current_char.isdigit():
+            return self._number()
+
+        if self.current_char == '"':
+            return self._string()
+
+        
+        symbol = self.SYMBOLS.get(self.current_char)
+        if symbol is not None:
+            self.advance()
+            return Token(symbol)
+        
+        self.error(f'Carácter no reconocido: {repr(self.current_char)}')
+
+    def tokenize(self):
+        tokens = []
+        while self.current_char is not None:
+            
+            self.skip_whitespace()
+            if self.current_char is None: break
+
+            start = self.pos
+            token = self._next_token()
+            token.line, token.column = self.locate(start)
+            tokens.append(token)
+            
+        line, column = self.locate(self.pos)
+        tokens.append(Token('EOF', line=line, column=column))
         return [t for t in tokens if t.type != 'COMMENT']
\ No newline at end of file
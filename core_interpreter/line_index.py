@@ -0,0 +1,78 @@
+import bisect
+import os
+import threading
+from collections import OrderedDict
+
+from .metrics import registry
+from .text_cache import build_offsets
+
+
+class LineIndex:
+    """
+    Tabla de desplazamientos de inicio de línea (y de página en los PDFs) de un texto.
+    Convierte un desplazamiento en (línea, columna, página) con una búsqueda binaria.
+    """
+
+    def __init__(self, line_offsets, page_offsets=None):
+        self.line_offsets = line_offsets
+        self._pages = [(offset, number) for number, offset in enumerate(page_offsets or (), start=1) if offset is not None]
+        self._page_starts = [offset for offset, _ in self._pages]
+
+    @classmethod
+    def from_text(cls, content):
+        return cls(build_offsets([content])["line_offsets"])
+
+    @classmethod
+    def from_pdf_entry(cls, entry):
+        return cls(entry["line_offsets"], entry["page_offsets"])
+
+    def position(self, offset):
+        """Devuelve (línea, columna, página) con base 1; la página es None fuera de un PDF."""
+        line = bisect.bisect_right(self.line_offsets, offset)
+        column = offset - self.line_offsets[line - 1] + 1
+        page = None
+        if self._pages:
+            page = self._pages[max(bisect.bisect_right(self._page_starts, offset) - 1, 0)][1]
+        return line, column, page
+
+
+class LineIndexRegistry:
+    """Índices de líneas de archivos de texto, invalidados por el estado del archivo (inodo, mtime, tamaño)."""
+
+    MAX_DOCUMENTS = 64
+
+    def __init__(self, max_documents=MAX_DOCUMENTS):
+        self.max_documents = max_documents
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, file_path, content):
+        signature = _signature(file_path)
+        key = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and signature is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                registry.record_cache('indice_lineas', True)
+                return entry[1]
+
+        registry.record_cache('indice_lineas', False)
+        index = LineIndex.from_text(content)
+        if signature is not None:
+            with self._lock:
+                self._entries[key] = (signature, index)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_documents:
+                    self._entries.popitem(last=False)
+        return index
+
+
+def _signature(file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+line_indexes = LineIndexRegistry()
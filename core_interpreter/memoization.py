@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+
+from .parser import (SearchCommand, FusionCommand, ReplaceOverwriteCommand, EnumerateCommand, ExtractCommand, InvertCommand,
+                     FragmentCommand, node_fields)
+
+
+ROLE_PARAM = 'param'
+ROLE_INPUT = 'input'
+ROLE_OUTPUT = 'output'
+
+
+# Campos de cada comando que pueden venir de una variable: (atributo, atributo *_is_var, rol).
+COMMAND_FIELDS = {
+    SearchCommand: (
+        ('search_term', 'search_term_is_var', ROLE_PARAM),
+        ('target', 'target_is_var', ROLE_INPUT),
+    ),
+    FusionCommand: (
+        ('doc1', 'doc1_is_var', ROLE_INPUT),
+        ('doc2', 'doc2_is_var', ROLE_INPUT),
+        ('separator', 'separator_is_var', ROLE_PARAM),
+        ('output', 'output_is_var', ROLE_OUTPUT),
+    ),
+    ReplaceOverwriteCommand: (
+        ('original', 'original_is_var', ROLE_PARAM),
+        ('new', 'new_is_var', ROLE_PARAM),
+        ('source_doc', 'source_is_var', ROLE_INPUT),
+        ('target_doc', 'target_is_var', ROLE_OUTPUT),
+    ),
+    EnumerateCommand: (
+        ('source', 'source_is_var', ROLE_PARAM),
+        ('source_doc', 'source_is_var_doc', ROLE_INPUT),
+        ('prefix', 'prefix_is_var', ROLE_PARAM),
+        ('target_file', 'target_is_var', ROLE_OUTPUT),
+    ),
+    ExtractCommand: (
+        ('source_file', 'source_is_var', ROLE_INPUT),
+        ('target_file', 'target_is_var', ROLE_OUTPUT),
+    ),
+    InvertCommand: (
+        ('source_file', 'source_is_var', ROLE_INPUT),
+        ('target_file', 'target_is_var', ROLE_OUTPUT),
+    ),
+    FragmentCommand: (
+        ('source_file', 'source_is_var', ROLE_INPUT),
+        ('delimiter', 'delimiter_is_var', ROLE_PARAM),
+        ('target_base_name', 'target_is_var', ROLE_OUTPUT),
+    ),
+}
+
+
+def batch_fields(node):
+    """
+    Campos que intervienen al ejecutar el comando como lote: (fuente, *_is_var de la fuente,
+    salida, *_is_var de la salida). La fuente es la primera entrada del comando; la salida
+    es None en los comandos que no escriben archivos.
+    """
+    fields = COMMAND_FIELDS.get(type(node), ())
+    inputs = [(attr, is_var_attr) for attr, is_var_attr, role in fields if role == ROLE_INPUT]
+    outputs = [(attr, is_var_attr) for attr, is_var_attr, role in fields if role == ROLE_OUTPUT]
+    if not inputs:
+        return None
+    output_attr, output_is_var_attr = outputs[0] if outputs else (None, None)
+    return inputs[0][0], inputs[0][1], output_attr, output_is_var_attr
+
+
+def is_memoizable(node):
+    return type(node) in COMMAND_FIELDS
+
+
+def resolve_fields(evaluator, node):
+    """Devuelve {atributo: (rol, valor resuelto)} de los campos del comando; falla si falta una variable."""
+    resolved = {}
+    for attr, is_var_attr, role in COMMAND_FIELDS[type(node)]:
+        resolved[attr] = (role, evaluator.resolve_source(getattr(node, attr), getattr(node, is_var_attr)))
+    return resolved
+
+
+def input_names(resolved):
+    return [value for role, value in resolved.values() if role == ROLE_INPUT]
+
+
+def command_key(node, resolved, input_digests):
+    """
+    Clave estable del comando: tipo, todos sus atributos literales, los valores resueltos
+    de sus campos y el hash del contenido de cada entrada.
+    """
+    literals = sorted((attr, repr(value)) for attr, value in node_fields(node).items() if attr not in resolved)
+    fields = sorted((attr, value) for attr, (_, value) in resolved.items())
+    payload = json.dumps([type(node).__name__, literals, fields, input_digests], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def output_name(resolved):
+    """Nombre de salida resuelto del comando (base de los fragmentos en FRAGMENTAR), o None."""
+    for role, value in resolved.values():
+        if role == ROLE_OUTPUT:
+            return value
+    return None
+
+
+def result_key(node, resolved, input_digests):
+    """
+    Clave del resultado compartido entre ejecuciones: no depende de los nombres de los
+    archivos, solo de los parámetros, el contenido de las entradas y la extensión de salida.
+    """
+    literals = sorted((attr, repr(value)) for attr, value in node_fields(node).items() if attr not in resolved)
+    params = sorted((attr, value) for attr, (role, value) in resolved.items() if role == ROLE_PARAM)
+    extensions = sorted((attr, os.path.splitext(value)[1].lower()) for attr, (role, value) in resolved.items() if role == ROLE_OUTPUT)
+    payload = json.dumps(['resultado', type(node).__name__, literals, params, extensions, input_digests], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
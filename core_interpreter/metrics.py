@@ -0,0 +1,151 @@
+import threading
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas en memoria del proceso (contadores, gauges e histogramas)
+    que se exporta en el formato de texto de Prometheus.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._cache_stats = {}
+
+    def describe(self, name, metric_type, help_text):
+        self._types[name] = metric_type
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def add_gauge(self, name, delta, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = [[0] * len(self.buckets), 0.0, 0]
+                self._histograms[key] = histogram
+            bucket_counts = histogram[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bucket_counts[i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def record_cache(self, cache_name, hit):
+        """Registra un acierto o fallo de la caché indicada."""
+        with self._lock:
+            stats = self._cache_stats.setdefault(cache_name, [0, 0])
+            stats[0 if hit else 1] += 1
+
+    def render(self):
+        """Genera el texto de exposición de todas las métricas registradas."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: ([*h[0]], h[1], h[2]) for key, h in self._histograms.items()}
+            cache_stats = {name: tuple(stats) for name, stats in self._cache_stats.items()}
+
+        lines = []
+        described = set()
+
+        def header(name, default_type):
+            if name in described:
+                return
+            described.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {self._types.get(name, default_type)}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, 'gauge')
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (('le', _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for cache_name, (hits, misses) in sorted(cache_stats.items()):
+            labels = (('cache', cache_name),)
+            header('arkscript_cache_requests_total', 'counter')
+            lines.append(f"arkscript_cache_requests_total{_format_labels(labels + (('result', 'hit'),))} {hits}")
+            lines.append(f"arkscript_cache_requests_total{_format_labels(labels + (('result', 'miss'),))} {misses}")
+        for cache_name, (hits, misses) in sorted(cache_stats.items()):
+            total = hits + misses
+            header('arkscript_cache_hit_ratio', 'gauge')
+            ratio = hits / total if total else 0.0
+            lines.append(f"arkscript_cache_hit_ratio{_format_labels((('cache', cache_name),))} {_format_value(ratio)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else f"{value:.1f}"
+    return str(value)
+
+
+registry = MetricsRegistry()
+
+registry.describe('arkscript_http_requests_total', 'counter', 'Peticiones HTTP atendidas por ruta, método y estado.')
+registry.describe('arkscript_http_request_duration_seconds', 'histogram', 'Latencia de las peticiones HTTP por ruta.')
+registry.describe('arkscript_commands_total', 'counter', 'Comandos ArkScript ejecutados por tipo y resultado.')
+registry.describe('arkscript_command_duration_seconds', 'histogram', 'Latencia de cada tipo de comando ArkScript.')
+registry.describe('arkscript_execution_queue_depth', 'gauge', 'Ejecuciones de /execute en espera o en curso.')
+registry.describe('arkscript_execution_wait_seconds', 'histogram', 'Espera en cola de cada ejecución de /execute hasta tener turno.')
+registry.describe('arkscript_execution_estimated_cost_seconds', 'histogram', 'Coste estimado de los scripts enviados a /execute.')
+registry.describe('arkscript_executions_rejected_total', 'counter', 'Ejecuciones rechazadas por superar el presupuesto de coste.')
+registry.describe('arkscript_uploaded_bytes_total', 'counter', 'Bytes recibidos en /upload.')
+registry.describe('arkscript_downloaded_bytes_total', 'counter', 'Bytes servidos por /download.')
+registry.describe('arkscript_pdf_pages_processed_total', 'counter', 'Páginas PDF procesadas por comando.')
+registry.describe('arkscript_gc_removed_files_total', 'counter', 'Archivos eliminados por el recolector de temp_files.')
+registry.describe('arkscript_cache_requests_total', 'counter', 'Consultas a cachés internas por resultado.')
+registry.describe('arkscript_cache_hit_ratio', 'gauge', 'Proporción de aciertos de cada caché interna.')
+registry.describe('arkscript_output_write_seconds', 'histogram', 'Duración de cada escritura diferida de una salida.')
+registry.describe('arkscript_output_written_bytes_total', 'counter', 'Bytes de salidas escritos por el hilo de escritura diferida.')
+registry.describe('arkscript_output_flush_wait_seconds', 'histogram', 'Espera en la barrera de escritura al final de cada ejecución.')
+
+registry.set_gauge('arkscript_execution_queue_depth', 0)
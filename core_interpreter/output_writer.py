@@ -0,0 +1,119 @@
+import collections
+import threading
+import time
+
+from .metrics import registry
+
+
+class OutputWriter:
+    """
+    Escritura diferida de las salidas de una ejecución: los comandos encolan el contenido
+    ya generado y siguen calculando mientras un hilo de E/S lo escribe en el almacenamiento,
+    en el orden de llegada. Las tareas encoladas con after() se ejecutan en ese mismo hilo
+    cuando han terminado todas las escrituras anteriores.
+
+    flush() es la barrera: espera a que se vacíe la cola y devuelve los errores ocurridos,
+    que no se imprimen desde el hilo para que aparezcan en la salida de la ejecución.
+    """
+
+    # Memoria máxima retenida en escrituras pendientes; al superarla, quien encola espera.
+    MAX_PENDING_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, storage, max_pending_bytes=MAX_PENDING_BYTES):
+        self.storage = storage
+        self.max_pending_bytes = max_pending_bytes
+        self.failed = set()
+        self._condition = threading.Condition()
+        self._jobs = collections.deque()
+        self._pending_names = collections.Counter()
+        self._pending_bytes = 0
+        self._outstanding = 0
+        self._running = False
+        self._errors = []
+
+    def write(self, name, data, on_written=None):
+        """Encola la escritura de 'data' (bytes) en 'name'; on_written se llama tras escribirlo."""
+        with self._condition:
+            while self._pending_bytes and self._pending_bytes + len(data) > self.max_pending_bytes:
+                self._condition.wait()
+            self._pending_bytes += len(data)
+            self._pending_names[name] += 1
+            self.failed.discard(name)
+            self._enqueue((name, data, on_written))
+
+    def after(self, task):
+        """Encola una tarea que se ejecuta cuando terminan las escrituras encoladas antes."""
+        with self._condition:
+            self._enqueue((None, None, task))
+
+    def wait_for(self, names):
+        """Espera a que estén escritos los archivos indicados que tengan escrituras pendientes."""
+        with self._condition:
+            while any(self._pending_names[name] for name in names):
+                self._condition.wait()
+
+    def wait_for_all(self):
+        """Espera a que terminen todas las escrituras y tareas encoladas, sin recoger sus errores."""
+        with self._condition:
+            while self._outstanding:
+                self._condition.wait()
+
+    def pending(self):
+        with self._condition:
+            return self._outstanding
+
+    def flush(self):
+        """Espera a que terminen todas las escrituras y tareas; devuelve (y olvida) los errores."""
+        start = time.perf_counter()
+        with self._condition:
+            while self._outstanding:
+                self._condition.wait()
+            errors, self._errors = self._errors, []
+        registry.observe('arkscript_output_flush_wait_seconds', time.perf_counter() - start)
+        return errors
+
+    def _enqueue(self, job):
+        self._jobs.append(job)
+        self._outstanding += 1
+        if not self._running:
+            # El hilo termina cuando la cola queda vacía y se vuelve a crear con la siguiente escritura.
+            self._running = True
+            threading.Thread(target=self._drain, name='escritura-salidas', daemon=True).start()
+
+    def _drain(self):
+        while True:
+            with self._condition:
+                if not self._jobs:
+                    self._running = False
+                    return
+                name, data, task = self._jobs.popleft()
+
+            error = None
+            written = True
+            if name is not None:
+                start = time.perf_counter()
+                try:
+                    self.storage.write_bytes(name, data)
+                    registry.observe('arkscript_output_write_seconds', time.perf_counter() - start)
+                    registry.inc('arkscript_output_written_bytes_total', len(data))
+                except Exception as e:
+                    written = False
+                    error = f"No se pudo escribir '{name}': {type(e).__name__}: {e}"
+            if written and task is not None:
+                try:
+                    task()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+
+            with self._condition:
+                if name is not None:
+                    self._pending_bytes -= len(data)
+                    self._pending_names[name] -= 1
+                    if not self._pending_names[name]:
+                        del self._pending_names[name]
+                    if not written:
+                        self.failed.add(name)
+                if error:
+                    self._errors.append(error)
+                self._outstanding -= 1
+                self._condition.notify_all()
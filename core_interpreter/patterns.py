@@ -0,0 +1,204 @@
+import io
+import re
+import threading
+from collections import OrderedDict
+
+from .metrics import registry
+
+
+MAX_COMPILED_PATTERNS = 256
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compile_pattern(pattern, case_sensitive=True):
+    """
+    Compila la expresión regular reutilizando la versión cacheada entre comandos y
+    peticiones del proceso. Lanza re.error si el patrón no es válido.
+    """
+    key = (pattern, case_sensitive)
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+    registry.record_cache('patrones', compiled is not None)
+    if compiled is not None:
+        return compiled
+
+    compiled = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+    with _compiled_lock:
+        _compiled[key] = compiled
+        while len(_compiled) > MAX_COMPILED_PATTERNS:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def count_matches(content, term, case_sensitive=True, is_regex=False):
+    """
+    Cuenta las apariciones sin solapamiento del literal o de la expresión regular. Sin
+    sensibilidad se usa re.IGNORECASE, igual que match_offsets(), para que las posiciones
+    y las repeticiones coincidan también cuando lower() cambia la longitud del texto.
+    """
+    if is_regex or not case_sensitive:
+        compiled = compile_pattern(term if is_regex else re.escape(term), case_sensitive)
+        return sum(1 for _ in compiled.finditer(content))
+    return content.count(term)
+
+
+def match_offsets(content, term, case_sensitive=True, is_regex=False):
+    """Genera el desplazamiento de inicio de cada aparición sin solapamiento."""
+    if is_regex or not case_sensitive:
+        compiled = compile_pattern(term if is_regex else re.escape(term), case_sensitive)
+        for match in compiled.finditer(content):
+            yield match.start()
+        return
+    if not term:
+        return
+    position = content.find(term)
+    while position != -1:
+        yield position
+        position = content.find(term, position + len(term))
+
+
+def literal_finder(content, term, replacement):
+    """Buscador para rewrite(): devuelve (inicio, fin, reemplazo) de la siguiente aparición literal."""
+    if not term:
+        raise ValueError("el término literal no puede estar vacío")
+    term_len = len(term)
+
+    def find(position):
+        start = content.find(term, position)
+        if start == -1:
+            return None
+        return start, start + term_len, replacement
+    return find
+
+
+def substitute_sequence(content, term, values):
+    """
+    Sustituye cada aparición literal de 'term' por el siguiente valor del iterador 'values'
+    en una sola pasada, escribiendo el resultado en un búfer sin acumular los trozos.
+    Devuelve (contenido nuevo, sustituciones).
+    """
+    output = io.BytesIO() if isinstance(content, bytes) else io.StringIO()
+    write = output.write
+    find = content.find
+    term_len = len(term)
+    position = 0
+    replacements = 0
+
+    start = find(term)
+    while start != -1:
+        write(content[position:start])
+        write(next(values))
+        replacements += 1
+        position = start + term_len
+        start = find(term, position)
+
+    if not replacements:
+        return content, 0
+    write(content[position:])
+    return output.getvalue(), replacements
+
+
+def numbering(start, end, width=0, prefix='', encoding=None):
+    """
+    Genera sin fin la secuencia start..end (ascendente o descendente) y vuelve a empezar al
+    terminarla. Cada número se rellena con ceros hasta 'width' cifras y lleva 'prefix'
+    delante; con 'encoding' se devuelven bytes. No guarda la secuencia en memoria.
+    """
+    step = 1 if start <= end else -1
+    numbers = range(start, end + step, step)
+    while True:
+        for number in numbers:
+            text = prefix + str(number).zfill(width)
+            yield text.encode(encoding) if encoding else text
+
+
+def regex_finder(content, pattern, template):
+    """Buscador para rewrite() con grupos de captura (\\1, \\g<nombre>) expandidos en el reemplazo."""
+    compiled = compile_pattern(pattern)
+
+    def find(position):
+        match = compiled.search(content, position)
+        if match is None:
+            return None
+        return match.start(), match.end(), match.expand(template)
+    return find
+
+
+def rewrite(content, find, limit=float('inf'), frequency=1, overwrite=False):
+    """
+    Motor de una sola pasada para REEMPLAZAR y SOBREESCRIBIR. Recorre las coincidencias
+    de izquierda a derecha y sustituye una de cada 'frequency' hasta 'limit' sustituciones.
+    En modo overwrite el reemplazo pisa tantos caracteres como mide, desde el inicio de la
+    coincidencia. Devuelve (contenido nuevo, sustituciones, coincidencias vistas).
+    """
+    parts = []
+    position = 0
+    replacements = 0
+    match_index = 0
+
+    while position <= len(content) and replacements < limit:
+        found = find(position)
+        if found is None:
+            break
+        start, end, replacement = found
+        match_index += 1
+        parts.append(content[position:start])
+
+        if (match_index - 1) % frequency == 0:
+            parts.append(replacement)
+            replacements += 1
+            position = start + len(replacement) if overwrite else end
+        else:
+            parts.append(content[start:end])
+            position = end
+
+        if position <= start:
+            # Coincidencia vacía: se copia un carácter para seguir avanzando.
+            parts.append(content[start:start + 1])
+            position = start + 1
+
+    parts.append(content[position:])
+    return content[:0].join(parts), replacements, match_index
+
+
+def replace_literal(content, term, replacement, limit=float('inf'), frequency=1):
+    """
+    REEMPLAZAR literal sobre str o bytes. Con frecuencia 1 delega en replace() (una pasada
+    en C); en otro caso usa el motor general. Devuelve lo mismo que rewrite().
+    """
+    if not term:
+        raise ValueError("el término literal no puede estar vacío")
+    if frequency != 1:
+        return rewrite(content, literal_finder(content, term, replacement), limit, frequency)
+    matches = content.count(term)
+    replacements = matches if limit == float('inf') else min(matches, int(limit))
+    return content.replace(term, replacement, replacements), replacements, matches
+
+
+# Caracteres que str.strip() considera espacio, codificados en UTF-8.
+_ASCII_WHITESPACE = bytes(code for code in range(128) if chr(code).isspace())
+_UTF8_WHITESPACE = tuple(chr(code).encode('utf-8') for code in range(128, 0x3001) if chr(code).isspace())
+
+
+def strip_utf8(data, left=True, right=True):
+    """Equivalente de str.strip()/rstrip() sobre bytes UTF-8, sin decodificarlos."""
+    while True:
+        length = len(data)
+        if left:
+            data = data.lstrip(_ASCII_WHITESPACE)
+            for space in _UTF8_WHITESPACE:
+                if data.startswith(space):
+                    data = data[len(space):]
+                    break
+        if right:
+            data = data.rstrip(_ASCII_WHITESPACE)
+            for space in _UTF8_WHITESPACE:
+                if data.endswith(space):
+                    data = data[:-len(space)]
+                    break
+        if len(data) == length:
+            return data
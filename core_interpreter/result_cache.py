@@ -0,0 +1,59 @@
+import os
+
+from .blob_store import BlobStore
+from .file_registry import FileRegistry
+from .metrics import registry
+
+
+class ResultCache:
+    """
+    Caché de resultados compartida entre ejecuciones y usuarios. Cada entrada asocia la
+    clave de un comando (tipo, parámetros resueltos y hash de sus entradas) con los blobs
+    de sus salidas; un acierto materializa las salidas enlazando esos blobs con el nombre
+    pedido en lugar de recalcularlas. El tamaño total se acota expulsando por LRU.
+    """
+
+    DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+    def __init__(self, workspace_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.workspace_dir = workspace_dir
+        self.max_bytes = max_bytes
+        self.file_registry = FileRegistry.for_workspace(workspace_dir)
+        self.blob_store = BlobStore(workspace_dir)
+
+    def materialize(self, key, output_name):
+        """
+        Enlaza las salidas cacheadas usando la base del nombre de salida pedido. Devuelve la
+        lista de nombres creados, o None si no hay resultado utilizable.
+        """
+        outputs = self.file_registry.result_get(key)
+        if outputs is not None and not all(self.blob_store.has(digest) for _, digest, _ in outputs):
+            self.file_registry.result_remove(key)
+            outputs = None
+        registry.record_cache('resultados', outputs is not None)
+        if outputs is None:
+            return None
+
+        stem = os.path.splitext(output_name)[0]
+        names = []
+        for suffix, digest, _ in outputs:
+            name = stem + suffix
+            self.blob_store.link(digest, name, origin=FileRegistry.ORIGIN_GENERATED)
+            names.append(name)
+        return names
+
+    def store(self, key, output_name, names):
+        """Guarda las salidas recién generadas de un comando como resultado compartido."""
+        stem = os.path.splitext(output_name)[0]
+        outputs = []
+        for name in names:
+            entry = self.file_registry.get(name)
+            if not name.startswith(stem) or entry is None or not entry["sha256"]:
+                return
+            self.blob_store.ingest_file(os.path.join(self.workspace_dir, name), entry["sha256"])
+            outputs.append((name[len(stem):], entry["sha256"], entry["size"] or 0))
+
+        if sum(size for _, _, size in outputs) > self.max_bytes:
+            return
+        self.file_registry.result_put(key, outputs)
+        self.file_registry.evict_results(self.max_bytes)
@@ -0,0 +1,96 @@
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+
+from .metrics import registry
+
+
+# Coste mínimo que se carga a cada ejecución, para que los scripts vacíos no sean gratis.
+MIN_COST = 0.001
+
+
+class BudgetExceededError(Exception):
+    """El coste estimado del script supera el presupuesto máximo configurado."""
+
+    def __init__(self, cost, max_cost):
+        self.cost = cost
+        self.max_cost = max_cost
+        super().__init__(f"El coste estimado del script ({cost:.2f} s) supera el límite de {max_cost:.2f} s; "
+                         f"divídelo en scripts más pequeños.")
+
+
+class _Ticket:
+    __slots__ = ('client', 'cost', 'start_tag', 'finish_tag', 'granted')
+
+    def __init__(self, client, cost, start_tag):
+        self.client = client
+        self.cost = cost
+        self.start_tag = start_tag
+        self.finish_tag = start_tag + cost
+        self.granted = False
+
+
+class FairShareScheduler:
+    """
+    Planificador de ejecuciones por coste estimado con reparto justo entre clientes
+    (encolado justo por tiempo virtual). Cada ejecución recibe la etiqueta
+    max(tiempo virtual, última etiqueta de su cliente) + coste y se atiende la de menor
+    etiqueta: los scripts baratos adelantan a los caros y un cliente que envía muchos
+    trabajos solo consume su parte mientras haya otros esperando. Las ejecuciones cuyo
+    coste supera max_cost se rechazan antes de empezar.
+    """
+
+    def __init__(self, slots=1, max_cost=None):
+        self.slots = slots
+        self.max_cost = max_cost
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._running = 0
+        self._virtual_time = 0.0
+        self._client_tags = {}
+
+    @contextlib.contextmanager
+    def admit(self, client, cost):
+        """Bloquea hasta que la ejecución tenga turno; lanza BudgetExceededError si no cabe en el presupuesto."""
+        if self.max_cost is not None and cost > self.max_cost:
+            registry.inc('arkscript_executions_rejected_total')
+            raise BudgetExceededError(cost, self.max_cost)
+
+        queued_at = time.perf_counter()
+        with self._condition:
+            ticket = self._enqueue(client, max(cost, MIN_COST))
+            self._dispatch()
+            while not ticket.granted:
+                self._condition.wait()
+        registry.observe('arkscript_execution_wait_seconds', time.perf_counter() - queued_at)
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._dispatch()
+
+    def _enqueue(self, client, cost):
+        start_tag = max(self._virtual_time, self._client_tags.get(client, 0.0))
+        ticket = _Ticket(client, cost, start_tag)
+        self._client_tags[client] = ticket.finish_tag
+        heapq.heappush(self._waiting, (ticket.finish_tag, next(self._sequence), ticket))
+        return ticket
+
+    def _dispatch(self):
+        while self._waiting and self._running < self.slots:
+            _, _, ticket = heapq.heappop(self._waiting)
+            ticket.granted = True
+            self._running += 1
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            self._forget_idle_clients()
+            self._condition.notify_all()
+
+    def _forget_idle_clients(self):
+        """Olvida a los clientes cuya última etiqueta ya quedó atrás del tiempo virtual."""
+        for client in [c for c, tag in self._client_tags.items() if tag <= self._virtual_time]:
+            del self._client_tags[client]
@@ -0,0 +1,405 @@
+import bisect
+import itertools
+import threading
+from collections import OrderedDict
+
+from .lexer import Lexer, LexError, Token, UNCLOSED_STRING
+from .parser import Parser, ParseError, VarDeclNode, STATEMENT_KEYWORDS
+from .metrics import registry
+
+
+# Líneas que puede ocupar una cadena literal antes de darla por no cerrada en el editor.
+MAX_STRING_LINES = 20
+
+
+class _LruCache:
+    """Caché LRU compartida entre documentos, indexada por contenido."""
+
+    def __init__(self, name, max_entries):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        registry.record_cache(self.name, value is not None)
+        if value is not None:
+            return value
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+_lex_cache = _LruCache('lexico_lineas', 50000)
+_statement_cache = _LruCache('sentencias', 20000)
+
+
+def _lex_text(text):
+    """Tokens de un trozo de script como (tipo, valor, línea relativa, columna) y el error léxico, si lo hay."""
+    def compute():
+        try:
+            tokens = Lexer(text).tokenize()
+        except LexError as e:
+            return (), (e.detail, e.line - 1, e.column)
+        return tuple((t.type, t.value, t.line - 1, t.column) for t in tokens if t.type != 'EOF'), None
+    return _lex_cache.get_or_compute(text, compute)
+
+
+def _parse_tokens(key):
+    """Analiza una sentencia; devuelve (nodos, None) o (None, (detalle, índice del token del error))."""
+    def compute():
+        kinds, lookahead = key
+        tokens = [Token(type_, value) for type_, value in kinds] + [Token(*lookahead)]
+        if lookahead[0] != 'EOF':
+            tokens.append(Token('EOF'))
+        parser = Parser(tokens)
+        try:
+            nodes = parser.parse_statement()
+            if parser.token_index < len(kinds):
+                parser.error(['KW_VAR', 'Comando'])
+        except ParseError as e:
+            return None, (e.detail, parser.token_index)
+        return nodes, None
+    return _statement_cache.get_or_compute(key, compute)
+
+
+class _Statement:
+    """
+    Sentencia del documento: tokens con la línea relativa a su primer token y, si no es
+    válida, la posición relativa del error (en el token siguiente si falta algo al final).
+    """
+
+    __slots__ = ('first_line', 'first_column', 'tokens', 'nodes', 'error', 'declared', 'references')
+
+    def __init__(self, first_line, first_column, tokens, lookahead, lookahead_position):
+        self.first_line = first_line
+        self.first_column = first_column
+        self.tokens = tokens
+        self.nodes, error = _parse_tokens((tuple((t[0], t[1]) for t in tokens), lookahead))
+        self.error = None
+        if error is not None:
+            detail, token_index = error
+            if token_index < len(tokens):
+                _, _, dline, column = tokens[token_index]
+            else:
+                dline, column = lookahead_position[0] - first_line, lookahead_position[1]
+            self.error = (detail, dline, column)
+
+        is_declaration = tokens[0][0] == 'KW_VAR'
+        self.declared = []
+        self.references = []
+        if self.nodes and is_declaration:
+            _, _, dline, column = tokens[1]
+            self.declared = [(node.name, node.value, dline, column) for node in self.nodes if isinstance(node, VarDeclNode)]
+        elif not is_declaration:
+            self.references = [(t[1], t[2], t[3]) for t in tokens if t[0] == 'IDENTIFIER']
+
+    def position(self):
+        return self.first_line, self.first_column
+
+
+class _Occurrences:
+    """Sentencias que declaran o usan cada nombre, con la primera y la última por posición."""
+
+    def __init__(self):
+        self._statements = {}
+        self._bounds = {}
+
+    def add(self, name, statement):
+        self._statements.setdefault(name, set()).add(statement)
+        bounds = self._bounds.get(name)
+        if bounds is not None:
+            first, last = bounds
+            self._bounds[name] = (min(first, statement, key=_Statement.position),
+                                  max(last, statement, key=_Statement.position))
+
+    def remove(self, name, statement):
+        statements = self._statements[name]
+        statements.discard(statement)
+        if not statements:
+            del self._statements[name]
+        # Los extremos se recalculan al consultarlos (las posiciones relativas no cambian al desplazar líneas).
+        bounds = self._bounds.get(name)
+        if bounds is not None and statement in bounds:
+            del self._bounds[name]
+
+    def names(self):
+        return self._statements.keys()
+
+    def statements(self, name):
+        return self._statements.get(name, ())
+
+    def bounds(self, name):
+        """(primera, última) sentencia con el nombre, o None."""
+        if name not in self._statements:
+            return None
+        bounds = self._bounds.get(name)
+        if bounds is None:
+            statements = self._statements[name]
+            bounds = (min(statements, key=_Statement.position), max(statements, key=_Statement.position))
+            self._bounds[name] = bounds
+        return bounds
+
+
+class ScriptDocument:
+    """
+    Script abierto en el editor. Guarda los tokens de cada línea y las sentencias ya
+    analizadas; al aplicar un cambio solo vuelve a tokenizar las líneas tocadas (con la
+    caché por contenido de línea) y a analizar las sentencias que las rodean.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.lines = ['']
+        self.line_tokens = [()]
+        self.line_errors = [None]
+        self.chunk_start = [True]
+        self.statements = []
+        self.invalid_statements = set()
+        self.declarations = _Occurrences()
+        self.references = _Occurrences()
+        self.lock = threading.Lock()
+
+    def set_text(self, text):
+        self.apply_change(0, len(self.lines), text)
+
+    def apply_change(self, from_line, to_line, text):
+        """Sustituye las líneas [from_line, to_line) por el texto (que puede tener varias líneas)."""
+        if not 0 <= from_line <= to_line <= len(self.lines):
+            raise ValueError(f"Rango de líneas no válido: {from_line}-{to_line} (el documento tiene {len(self.lines)}).")
+        new_lines = text.split('\n')
+        delta = len(new_lines) - (to_line - from_line)
+
+        self.lines[from_line:to_line] = new_lines
+        self.line_tokens[from_line:to_line] = [()] * len(new_lines)
+        self.line_errors[from_line:to_line] = [None] * len(new_lines)
+        self.chunk_start[from_line:to_line] = [None] * len(new_lines)
+
+        relex_start, relex_end = self._relex(from_line, from_line + len(new_lines))
+        self._reparse(relex_start, relex_end, relex_end - delta, delta)
+        self.version += 1
+
+    def _relex(self, start, edit_end):
+        """
+        Vuelve a tokenizar desde el trozo anterior al cambio (que podía continuar dentro de
+        las líneas sustituidas) hasta volver a coincidir con los límites de trozo anteriores.
+        """
+        # Una cadena sin cerrar en las líneas anteriores buscaba su cierre en las siguientes: puede cambiar.
+        for line in range(max(start - MAX_STRING_LINES, 0), start):
+            error = self.line_errors[line]
+            if error is not None and error[0] == UNCLOSED_STRING:
+                start = line
+                break
+        start = max(start - 1, 0)
+        while start > 0 and self.chunk_start[start] is False:
+            start -= 1
+        line = start
+        while line < len(self.lines):
+            end = self._lex_chunk(line)
+            line = end
+            if line >= edit_end and (line >= len(self.lines) or self.chunk_start[line] is True):
+                break
+        return start, line
+
+    def _lex_chunk(self, line):
+        """Tokeniza la línea (unida a las siguientes si abre una cadena multilínea); devuelve la línea siguiente."""
+        end = line + 1
+        tokens, error = _lex_text(self.lines[line])
+        while error is not None and error[0] == UNCLOSED_STRING:
+            closing = next((i for i in range(end, min(len(self.lines), line + MAX_STRING_LINES))
+                            if '"' in self.lines[i]), None)
+            if closing is None:
+                break
+            merged_tokens, merged_error = _lex_text('\n'.join(self.lines[line:closing + 1]))
+            if merged_error is not None and merged_error[0] == UNCLOSED_STRING and merged_error[1] == 0:
+                break
+            tokens, error, end = merged_tokens, merged_error, closing + 1
+
+        if error is not None and error[0] == UNCLOSED_STRING and end > line + 1:
+            # La última cadena tampoco se cierra: se informa en la propia línea, como una cadena sin cerrar.
+            tokens, error = _lex_text(self.lines[line])
+            end = line + 1
+        self.line_tokens[line] = tokens
+        self.line_errors[line] = error
+        self.chunk_start[line] = True
+        for continuation in range(line + 1, end):
+            self.line_tokens[continuation] = ()
+            self.line_errors[continuation] = None
+            self.chunk_start[continuation] = False
+        return end
+
+    def _reparse(self, relex_start, relex_end, relex_end_old, delta):
+        statements = self.statements
+        before = bisect.bisect_left(statements, relex_start, key=_first_line)
+        # La última sentencia anterior al cambio se vuelve a analizar: puede absorber los tokens nuevos.
+        first = max(before - 1, 0)
+        after = max(bisect.bisect_left(statements, relex_end_old, key=_first_line), first)
+        # Una sentencia que no empieza por palabra clave solo puede ir al principio: deja de serlo.
+        while after < len(statements) and statements[after].tokens[0][0] not in STATEMENT_KEYWORDS:
+            after += 1
+        if delta:
+            for statement in statements[after:]:
+                statement.first_line += delta
+
+        if before > 0:
+            start = (statements[first].first_line, statements[first].first_column)
+        else:
+            start = (0, 0)
+        if after < len(statements):
+            stop = (statements[after].first_line, statements[after].first_column)
+            lookahead = statements[after].tokens[0][:2]
+        else:
+            stop = (len(self.lines), 0)
+            lookahead = ('EOF', None)
+
+        region = []
+        first_chunk = start[0]
+        while first_chunk > 0 and self.chunk_start[first_chunk] is False:
+            first_chunk -= 1
+        for line in range(first_chunk, min(stop[0] + 1, len(self.lines))):
+            for type_, value, dline, column in self.line_tokens[line]:
+                position = (line + dline, column)
+                if start <= position < stop:
+                    region.append((type_, value, position[0], column))
+
+        for statement in statements[first:after]:
+            self._unindex(statement)
+        new_statements = self._split(region, lookahead, stop)
+        for statement in new_statements:
+            self._index(statement)
+        statements[first:after] = new_statements
+
+    def _index(self, statement):
+        if statement.error is not None:
+            self.invalid_statements.add(statement)
+        for name in {declared[0] for declared in statement.declared}:
+            self.declarations.add(name, statement)
+        for name in {reference[0] for reference in statement.references}:
+            self.references.add(name, statement)
+
+    def _unindex(self, statement):
+        self.invalid_statements.discard(statement)
+        for name in {declared[0] for declared in statement.declared}:
+            self.declarations.remove(name, statement)
+        for name in {reference[0] for reference in statement.references}:
+            self.references.remove(name, statement)
+
+    def _split(self, region, lookahead, stop):
+        groups = []
+        for token in region:
+            if not groups or token[0] in STATEMENT_KEYWORDS:
+                groups.append([])
+            groups[-1].append(token)
+
+        result = []
+        for index, group in enumerate(groups):
+            first_line, first_column = group[0][2], group[0][3]
+            relative = [(type_, value, line - first_line, column) for type_, value, line, column in group]
+            if index + 1 < len(groups):
+                following, following_position = groups[index + 1][0][:2], groups[index + 1][0][2:]
+            elif lookahead[0] != 'EOF':
+                following, following_position = lookahead, stop
+            else:
+                _, _, last_line, last_column = group[-1]
+                following, following_position = lookahead, (last_line, last_column + 1)
+            result.append(_Statement(first_line, first_column, relative, following, following_position))
+        return result
+
+    def analysis(self, token_lines=None):
+        """
+        Devuelve tokens (de las líneas pedidas, base 0 y fin exclusivo), diagnósticos y
+        variables. Solo recorre las sentencias con errores y los nombres usados, no todo el documento.
+        """
+        diagnostics = []
+        for line in itertools.compress(range(len(self.line_errors)), self.line_errors):
+            detail, dline, column = self.line_errors[line]
+            diagnostics.append(_diagnostic(line + dline, column, 'error', detail))
+
+        for statement in self.invalid_statements:
+            detail, dline, column = statement.error
+            diagnostics.append(_diagnostic(statement.first_line + dline, column, 'error', detail))
+
+        for name in self.references.names():
+            declaration = self.declarations.bounds(name)
+            first_use = self.references.bounds(name)[0]
+            if declaration is not None and first_use.position() > declaration[0].position():
+                continue
+            limit = declaration[0].position() if declaration is not None else None
+            for statement in self.references.statements(name):
+                if limit is not None and statement.position() > limit:
+                    continue
+                for reference, dline, column in statement.references:
+                    if reference == name:
+                        diagnostics.append(_diagnostic(statement.first_line + dline, column, 'error',
+                                                       f"La variable '{name}' no está definida."))
+
+        variables = []
+        for name in self.declarations.names():
+            statement = self.declarations.bounds(name)[1]
+            for declared, value, dline, column in statement.declared:
+                if declared == name:
+                    variables.append({"name": name, "value": value, "line": statement.first_line + dline + 1, "column": column})
+
+        first, last = token_lines if token_lines else (0, len(self.lines))
+        tokens = []
+        for line in range(max(first, 0), min(last, len(self.lines))):
+            for type_, value, dline, column in self.line_tokens[line]:
+                tokens.append({"line": line + dline + 1, "column": column, "type": type_, "value": value})
+
+        diagnostics.sort(key=lambda d: (d["line"], d["column"]))
+        variables.sort(key=lambda v: (v["line"], v["column"]))
+        return {
+            "version": self.version,
+            "tokens": tokens,
+            "diagnostics": diagnostics,
+            "variables": variables,
+        }
+
+
+def _first_line(statement):
+    return statement.first_line
+
+
+def _diagnostic(line, column, severity, message):
+    return {"line": line + 1, "column": column, "severity": severity, "message": message}
+
+
+class DocumentStore:
+    """Documentos abiertos por los editores, con expulsión LRU."""
+
+    MAX_DOCUMENTS = 64
+
+    def __init__(self, max_documents=MAX_DOCUMENTS):
+        self.max_documents = max_documents
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, document_id):
+        with self._lock:
+            document = self._documents.get(document_id)
+            if document is not None:
+                self._documents.move_to_end(document_id)
+            return document
+
+    def open(self, document_id):
+        """Devuelve el documento (vacío si es nuevo) y lo marca como el más reciente."""
+        with self._lock:
+            document = self._documents.get(document_id)
+            if document is None:
+                document = ScriptDocument()
+                self._documents[document_id] = document
+                while len(self._documents) > self.max_documents:
+                    self._documents.popitem(last=False)
+            self._documents.move_to_end(document_id)
+            return document
+
+
+documents = DocumentStore()
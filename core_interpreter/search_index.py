@@ -0,0 +1,162 @@
+import os
+import re
+import sys
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import registry
+
+
+WORD_RE = re.compile(r'\w+')
+MAX_GRAM = 3
+
+
+def _simple_case(text):
+    """
+    True si en 'text' comparar con lower() equivale a re.IGNORECASE: ningún carácter cambia
+    de longitud al pasarlo a minúsculas (como 'İ') ni tiene variantes que lower() no une
+    (como 'ſ' y 's', o 'ς' y 'σ').
+    """
+    if text.isascii():
+        return True
+    for char in set(text):
+        lowered = char.lower()
+        if len(lowered) != 1 or lowered != char.upper().lower():
+            return False
+    return True
+
+
+class DocumentIndex:
+    """
+    Índice invertido de un documento: frecuencia de cada palabra (original y en minúsculas)
+    más un índice de n-gramas sobre el vocabulario para localizar las palabras que
+    contienen un término sin recorrer el texto.
+    """
+
+    def __init__(self, content):
+        self.terms = Counter(WORD_RE.findall(content))
+        self.terms_lower = Counter(WORD_RE.findall(content.lower()))
+        self.simple_case = _simple_case(content)
+        self._grams = {}
+        self._grams_lock = threading.Lock()
+
+    def count(self, term, case_sensitive=True):
+        """
+        Devuelve el número de apariciones (no solapadas) del término, igual que
+        patterns.count_matches(), o None si el término no se puede responder de forma exacta desde el índice.
+        """
+        if not case_sensitive:
+            if not (self.simple_case and _simple_case(term)):
+                return None
+            term = term.lower()
+        if not term or not WORD_RE.fullmatch(term):
+            return None
+
+        vocabulary = self.terms if case_sensitive else self.terms_lower
+        total = 0
+        for token in self._candidates(term, case_sensitive):
+            total += vocabulary[token] * token.count(term)
+        return total
+
+    def _candidates(self, term, case_sensitive):
+        grams = self._gram_postings(case_sensitive)
+        if len(term) <= MAX_GRAM:
+            return grams.get(term, ())
+
+        postings = [grams.get(term[i:i + MAX_GRAM], ()) for i in range(len(term) - MAX_GRAM + 1)]
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return candidates
+
+    def _gram_postings(self, case_sensitive):
+        with self._grams_lock:
+            grams = self._grams.get(case_sensitive)
+            if grams is None:
+                grams = {}
+                vocabulary = self.terms if case_sensitive else self.terms_lower
+                for token in vocabulary:
+                    seen = set()
+                    for size in range(1, MAX_GRAM + 1):
+                        for i in range(len(token) - size + 1):
+                            seen.add(token[i:i + size])
+                    for gram in seen:
+                        grams.setdefault(gram, []).append(token)
+                self._grams[case_sensitive] = grams
+            return grams
+
+
+class SearchIndexRegistry:
+    """Índices en memoria por ruta de archivo, invalidados por el estado del archivo (inodo, mtime, tamaño)."""
+
+    MAX_DOCUMENTS = 64
+
+    def __init__(self, max_documents=MAX_DOCUMENTS):
+        self.max_documents = max_documents
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        signature = _signature(file_path)
+        key = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or signature is None or entry[0] != signature:
+                registry.record_cache('indice_busqueda', False)
+                return None
+            self._entries.move_to_end(key)
+        registry.record_cache('indice_busqueda', True)
+        return entry[1]
+
+    def update(self, file_path, content, signature=None):
+        """Construye (o reconstruye) el índice del archivo a partir de su contenido actual."""
+        if signature is None:
+            signature = _signature(file_path)
+        if signature is None:
+            return None
+        index = DocumentIndex(content)
+        key = os.path.abspath(file_path)
+        with self._lock:
+            self._entries[key] = (signature, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_documents:
+                self._entries.popitem(last=False)
+        return index
+
+
+def _signature(file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+search_indexes = SearchIndexRegistry()
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='indice')
+
+
+def enqueue_index_build(file_path, load_content):
+    """
+    Construye en segundo plano el índice del archivo usando la función de carga indicada.
+    El estado del archivo se toma al encolar, de modo que una reescritura posterior deja
+    el índice obsoleto en lugar de asociarlo a un contenido distinto.
+    """
+    signature = _signature(file_path)
+    if signature is None:
+        return None
+
+    def task():
+        try:
+            content = load_content()
+            if content is not None:
+                search_indexes.update(file_path, content, signature)
+        except Exception as e:
+            print(f"    ADVERTENCIA [INDICE]: Fallo al indexar '{os.path.basename(file_path)}': {type(e).__name__}: {e}", file=sys.stderr)
+
+    return _executor.submit(task)
@@ -0,0 +1,283 @@
+import abc
+import fnmatch
+import glob
+import io
+import os
+import tempfile
+import threading
+
+
+# Permisos de los archivos nuevos según la máscara del proceso (mkstemp los crea como 0600).
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class Storage(abc.ABC):
+    """
+    Almacenamiento de los archivos que lee y escribe un script. Los nombres son relativos
+    al espacio de trabajo. 'root' es el directorio real cuando lo hay: solo entonces el
+    intérprete usa las cachés del espacio de trabajo (registro, blobs, texto de PDF,
+    índices y memoización), que viven en disco junto a los archivos. Un almacenamiento
+    nuevo implementa open_read, open_write, exists y list.
+    """
+
+    root = None
+
+    @abc.abstractmethod
+    def open_read(self, name):
+        """Flujo binario de lectura; lanza FileNotFoundError si el archivo no existe."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def open_write(self, name):
+        """Flujo binario de escritura; el contenido queda visible al cerrarlo."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def exists(self, name):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list(self):
+        """Nombres de todos los archivos, ordenados."""
+        raise NotImplementedError
+
+    def path(self, name):
+        """Ruta real del archivo, o None si el almacenamiento no está en disco."""
+        return None
+
+    def glob(self, pattern):
+        """Archivos que coinciden con el patrón, ordenados y sin los ocultos."""
+        return [name for name in self.list()
+                if fnmatch.fnmatchcase(name, pattern) and not os.path.basename(name).startswith('.')]
+
+    def read_bytes(self, name):
+        with self.open_read(name) as f:
+            return f.read()
+
+    def read_text(self, name):
+        """Lee el archivo como UTF-8 con los finales de línea normalizados, como open(..., 'r')."""
+        with io.TextIOWrapper(self.open_read(name), encoding='utf-8') as f:
+            return f.read()
+
+    def write_bytes(self, name, data):
+        with self.open_write(name) as f:
+            f.write(data)
+
+    def write_text(self, name, text):
+        self.write_bytes(name, text.encode('utf-8'))
+
+
+class _AtomicFile:
+    """
+    Archivo temporal junto al destino que, al cerrarse sin errores, se renombra sobre él:
+    quien lea el destino (p. ej. una descarga) ve el archivo anterior o el nuevo completo,
+    nunca uno a medias. Un enlace duro a un blob compartido se sustituye sin modificarlo.
+    """
+
+    def __init__(self, file_path, fsync, mode='wb', encoding=None):
+        self.file_path = file_path
+        self.fsync = fsync
+        self.directory = os.path.dirname(file_path) or '.'
+        fd, self.temp_path = tempfile.mkstemp(dir=self.directory, prefix=DirectoryStorage.TEMP_PREFIX)
+        try:
+            os.chmod(self.temp_path, 0o666 & ~_UMASK)
+            self.file = os.fdopen(fd, mode, encoding=encoding)
+        except BaseException:
+            os.close(fd)
+            os.remove(self.temp_path)
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    @property
+    def closed(self):
+        return self.file.closed
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            self.file.flush()
+            if self.fsync != DirectoryStorage.FSYNC_NONE:
+                os.fsync(self.file.fileno())
+            self.file.close()
+            os.replace(self.temp_path, self.file_path)
+        except BaseException:
+            self.discard()
+            raise
+        if self.fsync == DirectoryStorage.FSYNC_FULL:
+            _fsync_directory(self.directory)
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+def _fsync_directory(directory):
+    # En Windows no se puede abrir un directorio con os.open; allí el renombrado basta.
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DirectoryStorage(Storage):
+    """
+    Archivos de un directorio del disco; es el almacenamiento del servidor web y de la CLI.
+    Las escrituras son atómicas (archivo temporal y renombrado). La política de fsync
+    decide cuánto se espera a que lleguen al disco: FSYNC_NONE no sincroniza, FSYNC_FILE
+    sincroniza el contenido antes de renombrar y FSYNC_FULL también el directorio después.
+    """
+
+    FSYNC_NONE = 'none'
+    FSYNC_FILE = 'file'
+    FSYNC_FULL = 'full'
+    FSYNC_POLICY = FSYNC_FILE
+
+    # Prefijo de los temporales de escritura; ocultos para listados, patrones y búsquedas.
+    TEMP_PREFIX = '.escritura-'
+
+    def __init__(self, root, fsync=None):
+        self.root = root
+        self.fsync = fsync or self.FSYNC_POLICY
+        if self.fsync not in (self.FSYNC_NONE, self.FSYNC_FILE, self.FSYNC_FULL):
+            raise ValueError(f"Política de fsync no válida: '{self.fsync}'.")
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def open_read(self, name):
+        return open(self.path(name), 'rb')
+
+    def open_write(self, name):
+        return _AtomicFile(self.path(name), self.fsync)
+
+    def exists(self, name):
+        return os.path.isfile(self.path(name))
+
+    def list(self):
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        return sorted(name for name in names if os.path.isfile(self.path(name)))
+
+    def glob(self, pattern):
+        matches = glob.glob(pattern, root_dir=self.root)
+        return sorted(name for name in matches if not os.path.basename(name).startswith('.') and self.exists(name))
+
+    def read_text(self, name):
+        with open(self.path(name), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def write_text(self, name, text):
+        with _AtomicFile(self.path(name), self.fsync, mode='w', encoding='utf-8') as f:
+            f.write(text)
+
+
+class _MemoryWriter(io.BytesIO):
+    """Búfer de escritura que guarda su contenido en el almacenamiento al cerrarse."""
+
+    def __init__(self, storage, name):
+        super().__init__()
+        self._storage = storage
+        self._name = name
+
+    def close(self):
+        if not self.closed:
+            self._storage._commit(self._name, self.getvalue())
+        super().close()
+
+
+class MemoryStorage(Storage):
+    """
+    Archivos en memoria, como {nombre: bytes}. Permite procesar documentos sin tocar el
+    disco; las salidas se leen después con read_bytes() o files().
+    """
+
+    def __init__(self, files=None):
+        self._files = {}
+        self._lock = threading.Lock()
+        for name, data in (files or {}).items():
+            self._files[name] = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+
+    def open_read(self, name):
+        with self._lock:
+            data = self._files.get(name)
+        if data is None:
+            raise FileNotFoundError(f"No existe el archivo '{name}' en memoria.")
+        return io.BytesIO(data)
+
+    def open_write(self, name):
+        return _MemoryWriter(self, name)
+
+    def _commit(self, name, data):
+        with self._lock:
+            self._files[name] = data
+
+    def exists(self, name):
+        with self._lock:
+            return name in self._files
+
+    def list(self):
+        with self._lock:
+            return sorted(self._files)
+
+    def files(self):
+        """Copia de todos los archivos como {nombre: bytes}."""
+        with self._lock:
+            return dict(self._files)
+
+
+class OverlayStorage(Storage):
+    """
+    Capa de escritura sobre un almacenamiento de solo lectura: las lecturas buscan primero
+    en la capa superior y después en la base, y todas las escrituras van a la capa
+    superior (en memoria si no se indica otra), de modo que la base nunca se modifica.
+    """
+
+    def __init__(self, base, upper=None):
+        self.base = base
+        self.upper = upper if upper is not None else MemoryStorage()
+
+    def open_read(self, name):
+        if self.upper.exists(name):
+            return self.upper.open_read(name)
+        return self.base.open_read(name)
+
+    def open_write(self, name):
+        return self.upper.open_write(name)
+
+    def exists(self, name):
+        return self.upper.exists(name) or self.base.exists(name)
+
+    def list(self):
+        return sorted(set(self.base.list()) | set(self.upper.list()))
+
+    def glob(self, pattern):
+        return sorted(set(self.base.glob(pattern)) | set(self.upper.glob(pattern)))
+
+    def read_text(self, name):
+        if self.upper.exists(name):
+            return self.upper.read_text(name)
+        return self.base.read_text(name)
+
+    def write_text(self, name, text):
+        self.upper.write_text(name, text)
@@ -0,0 +1,193 @@
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .metrics import registry
+from .file_registry import FileRegistry
+
+
+class PdfTextCache:
+    """
+    Caché persistente del texto extraído de PDFs, indexada por el SHA-256 del contenido.
+    Cada entrada guarda el número de páginas, el texto por página, el desplazamiento
+    de inicio de cada página y de cada línea dentro del texto unido.
+    """
+
+    CACHE_DIR_NAME = '.text_cache'
+    MEMORY_ENTRIES = 16
+
+    _memory = OrderedDict()
+    _memory_lock = threading.Lock()
+
+    def __init__(self, workspace_dir):
+        self.workspace_dir = workspace_dir
+        self.cache_dir = os.path.join(workspace_dir, self.CACHE_DIR_NAME)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def load(self, digest):
+        """Devuelve la entrada cacheada para el digest o None si no existe."""
+        with self._memory_lock:
+            entry = self._memory.get(digest)
+            if entry is not None:
+                self._memory.move_to_end(digest)
+                return entry
+
+        try:
+            with open(self.entry_path(digest), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        self._remember(digest, entry)
+        return entry
+
+    def build(self, digest, pdf_path):
+        """Extrae el texto de cada página del PDF y guarda la entrada en disco."""
+        pages = extract_pages(pdf_path)
+        registry.inc('arkscript_pdf_pages_processed_total', len(pages), command='preextraccion')
+
+        entry = build_entry(pages)
+
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.entrada-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, self.entry_path(digest))
+        FileRegistry.for_workspace(self.workspace_dir).set_page_count(digest, len(pages))
+
+        self._remember(digest, entry)
+        return entry
+
+    def load_or_build(self, digest, pdf_path):
+        """Devuelve (entrada, acierto); extrae el PDF en el momento si no estaba cacheado."""
+        entry = self.load(digest)
+        hit = entry is not None
+        registry.record_cache('texto_pdf', hit)
+        if not hit:
+            entry = self.build(digest, pdf_path)
+        return entry, hit
+
+    def _remember(self, digest, entry):
+        with self._memory_lock:
+            self._memory[digest] = entry
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+
+PARALLEL_MIN_PAGES = 16
+PAGE_WORKERS = min(os.cpu_count() or 1, 8)
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+
+def _extract_page_range(pdf_path, start, end):
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def extract_pages(pdf_path):
+    """
+    Extrae el texto de cada página del PDF. Los documentos largos se reparten por rangos
+    de páginas entre procesos, ya que la extracción de pypdf está limitada por la CPU.
+    """
+    from pypdf import PdfReader
+
+    global _page_pool
+    page_count = len(PdfReader(pdf_path).pages)
+    if PAGE_WORKERS <= 1 or page_count < PARALLEL_MIN_PAGES:
+        return _extract_page_range(pdf_path, 0, page_count)
+
+    with _page_pool_lock:
+        if _page_pool is None:
+            # Se crea desde hilos de petición con conexiones SQLite y otros hilos activos:
+            # con fork los hijos heredarían sus locks tomados, así que se usa spawn.
+            _page_pool = ProcessPoolExecutor(max_workers=PAGE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    step = -(-page_count // PAGE_WORKERS)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    futures = [_page_pool.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges]
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+
+def build_entry(pages):
+    """Entrada de la caché para el texto de cada página: páginas y desplazamientos."""
+    entry = {
+        "page_count": len(pages),
+        "pages": pages,
+    }
+    entry.update(build_offsets(pages))
+    return entry
+
+
+def joined_text(entry):
+    """Reconstruye el texto del documento tal como lo devuelve _read_content."""
+    return "\n".join(page for page in entry["pages"] if page)
+
+
+def build_offsets(pages):
+    """Calcula los desplazamientos de inicio de página y de línea sobre el texto unido."""
+    page_offsets = []
+    line_offsets = [0]
+    position = 0
+    first = True
+
+    for page in pages:
+        if not page:
+            page_offsets.append(None)
+            continue
+        if not first:
+            line_offsets.append(position + 1)
+            position += 1
+        first = False
+        page_offsets.append(position)
+        start = 0
+        while True:
+            newline = page.find("\n", start)
+            if newline == -1:
+                break
+            line_offsets.append(position + newline + 1)
+            start = newline + 1
+        position += len(page)
+
+    return {"page_offsets": page_offsets, "line_offsets": line_offsets}
+
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='preextraccion')
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def enqueue_pre_extraction(workspace_dir, digest, pdf_path):
+    """Programa en segundo plano la extracción del PDF si aún no está cacheada."""
+    cache = PdfTextCache(workspace_dir)
+    if os.path.exists(cache.entry_path(digest)):
+        return None
+
+    with _pending_lock:
+        if digest in _pending:
+            return None
+        _pending.add(digest)
+
+    def task():
+        try:
+            cache.build(digest, pdf_path)
+        except Exception as e:
+            print(f"    ADVERTENCIA [PREEXTRACCION]: Fallo al procesar '{os.path.basename(pdf_path)}': {type(e).__name__}: {e}", file=sys.stderr)
+        finally:
+            with _pending_lock:
+                _pending.discard(digest)
+
+    return _executor.submit(task)
@@ -0,0 +1,214 @@
+import fnmatch
+import glob
+import os
+
+from .parser import (VarDeclNode, SearchCommand, SearchAllCommand, ReplaceOverwriteCommand, EnumerateCommand, ExtractCommand,
+                     InvertCommand, FragmentCommand)
+from .file_registry import FileRegistry
+from .storage import DirectoryStorage
+from .memoization import COMMAND_FIELDS, ROLE_INPUT, ROLE_OUTPUT, batch_fields
+
+
+COMMAND_LABELS = {
+    'SearchCommand': 'BUSCAR',
+    'SearchAllCommand': 'BUSCAR',
+    'FusionCommand': 'FUSIONAR',
+    'ReplaceOverwriteCommand': 'REEMPLAZAR',
+    'EnumerateCommand': 'ENUMERAR',
+    'ExtractCommand': 'EXTRAER',
+    'InvertCommand': 'INVERTIR',
+    'FragmentCommand': 'FRAGMENTAR',
+}
+
+
+# Términos que no pueden quedar vacíos: coincidirían en cada posición del texto.
+REQUIRED_TERMS = {
+    SearchCommand: {'search_term': 'el término de búsqueda'},
+    SearchAllCommand: {'search_term': 'el término de búsqueda'},
+    ReplaceOverwriteCommand: {'original': 'el término a reemplazar'},
+    EnumerateCommand: {'source': 'el término a enumerar'},
+    FragmentCommand: {'delimiter': 'el delimitador'},
+}
+
+
+class ScriptValidationError(Exception):
+    """Errores detectados antes de ejecutar el script; 'problems' contiene un mensaje por error."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("Validación previa fallida:\n" + "\n".join(f"    - {problem}" for problem in problems))
+
+
+class ScriptValidator:
+    """
+    Recorre el AST sin ejecutarlo y comprueba que cada variable esté definida antes de
+    usarse, que cada archivo de entrada exista en el espacio de trabajo o lo genere un
+    comando anterior, que las extensiones sean las que exige cada comando y que los
+    rangos de EXTRAER quepan en el número de páginas conocido del PDF.
+    """
+
+    def __init__(self, workspace_dir, bound_variables=None, storage=None):
+        self.workspace_dir = workspace_dir
+        self.bound_variables = dict(bound_variables or {})
+        self.storage = storage if storage is not None else DirectoryStorage(workspace_dir)
+
+    def validate(self, ast):
+        """Devuelve la lista de problemas encontrados (vacía si el script es válido)."""
+        variables = dict(self.bound_variables)
+        produced = set()
+        produced_patterns = set()
+        problems = []
+
+        for position, node in enumerate(ast, start=1):
+            if isinstance(node, VarDeclNode):
+                if node.name not in self.bound_variables:
+                    variables[node.name] = node.value
+                continue
+
+            label = f"Comando {position} ({COMMAND_LABELS.get(type(node).__name__, type(node).__name__)})"
+            context = _NodeContext(self, node, variables, produced, produced_patterns)
+            for problem in context.check():
+                problems.append(f"{label}: {problem}")
+            produced.update(context.outputs)
+            produced_patterns.update(context.output_patterns)
+
+        return problems
+
+    def check(self, ast):
+        """Lanza ScriptValidationError si el script tiene algún problema."""
+        problems = self.validate(ast)
+        if problems:
+            raise ScriptValidationError(problems)
+
+    def exists(self, name):
+        return self.storage.exists(name)
+
+    def workspace_matches(self, pattern):
+        return self.storage.glob(pattern)
+
+    def page_count(self, name):
+        if self.storage.root is None:
+            return None
+        entry = FileRegistry.for_workspace(self.storage.root).get(name)
+        return entry["page_count"] if entry else None
+
+
+class _NodeContext:
+    """Estado de la validación de un comando: sus problemas y las salidas que producirá."""
+
+    def __init__(self, validator, node, variables, produced, produced_patterns):
+        self.validator = validator
+        self.node = node
+        self.variables = variables
+        self.produced = produced
+        self.produced_patterns = produced_patterns
+        self.problems = []
+        self.outputs = set()
+        self.output_patterns = set()
+
+    def resolve(self, value, is_var):
+        if not is_var:
+            return value
+        if value not in self.variables:
+            self.problems.append(f"la variable '{value}' no está definida.")
+            return None
+        return self.variables[value]
+
+    def check(self):
+        node = self.node
+        if isinstance(node, SearchAllCommand):
+            self.check_term('search_term', self.resolve(node.search_term, node.search_term_is_var))
+            return self.problems
+        if type(node) not in COMMAND_FIELDS:
+            return self.problems
+
+        source_attr, _, output_attr, _ = batch_fields(node)
+        sources = []
+        output = None
+        for attr, is_var_attr, role in COMMAND_FIELDS[type(node)]:
+            value = getattr(node, attr)
+            is_var = getattr(node, is_var_attr)
+            if attr == source_attr and isinstance(value, list):
+                resolved = [self.resolve(item, item_is_var) for item, item_is_var in value]
+                sources = [name for name in resolved if name is not None]
+                continue
+            resolved = self.resolve(value, is_var)
+            if resolved is None:
+                continue
+            self.check_term(attr, resolved)
+            if attr == source_attr:
+                sources = [resolved]
+            elif role == ROLE_INPUT:
+                self.check_input(resolved)
+            elif role == ROLE_OUTPUT:
+                output = resolved
+
+        inputs = []
+        for source in sources:
+            inputs.extend(self.expand_source(source))
+        is_batch = isinstance(getattr(node, source_attr), list) or len(inputs) > 1 or any(
+            glob.has_magic(source) and not self.validator.exists(source) for source in sources)
+
+        if output is not None and is_batch and '{}' not in output:
+            self.problems.append(f"la salida '{output}' debe contener '{{}}' para nombrar cada resultado del lote.")
+
+        if isinstance(node, ReplaceOverwriteCommand) and int(node.frequency) < 1:
+            self.problems.append(f"la frecuencia 'cada {node.frequency}' debe ser al menos 1.")
+        if isinstance(node, InvertCommand) and output is not None and not output.lower().endswith('.pdf'):
+            self.problems.append(f"el archivo destino '{output}' debe ser un PDF.")
+        for name in inputs:
+            self.check_command_rules(name)
+
+        if output is not None and output_attr is not None:
+            stems = [os.path.splitext(os.path.basename(name))[0] for name in inputs] if is_batch else [None]
+            for stem in stems:
+                name = output.replace('{}', stem) if stem is not None else output
+                if isinstance(node, FragmentCommand):
+                    base, ext = os.path.splitext(name)
+                    self.output_patterns.add(f"{glob.escape(base)}*{glob.escape(ext)}")
+                else:
+                    self.outputs.add(name)
+        return self.problems
+
+    def is_available(self, name):
+        return (self.validator.exists(name) or name in self.produced
+                or any(fnmatch.fnmatchcase(name, pattern) for pattern in self.produced_patterns))
+
+    def check_input(self, name):
+        if not self.is_available(name):
+            self.problems.append(f"el archivo '{name}' no existe ni lo genera un comando anterior.")
+            return False
+        return True
+
+    def expand_source(self, source):
+        if not glob.has_magic(source) or self.validator.exists(source):
+            return [source] if self.check_input(source) else []
+        matches = self.validator.workspace_matches(source)
+        matches += [name for name in self.produced if fnmatch.fnmatchcase(name, source)]
+        if not matches and not self.produced_patterns:
+            # Las salidas de FRAGMENTAR solo se conocen al ejecutar; no se puede descartar el patrón.
+            self.problems.append(f"ningún archivo coincide con el patrón '{source}'.")
+        return sorted(set(matches))
+
+    def check_term(self, attr, value):
+        description = REQUIRED_TERMS.get(type(self.node), {}).get(attr)
+        if description is not None and value == '':
+            self.problems.append(f"{description} no puede estar vacío.")
+
+    def check_command_rules(self, source):
+        node = self.node
+        is_pdf = source.lower().endswith('.pdf')
+
+        if isinstance(node, (ExtractCommand, InvertCommand)) and not is_pdf:
+            self.problems.append(f"el archivo fuente '{source}' debe ser un PDF.")
+        if isinstance(node, FragmentCommand) and is_pdf:
+            self.problems.append(f"el archivo fuente '{source}' debe ser TXT, no PDF.")
+
+        if isinstance(node, ExtractCommand) and is_pdf:
+            start, end = int(node.start_page), int(node.end_page)
+            if start < 1 or start > end:
+                self.problems.append(f"rango de páginas no válido ({start} a {end}).")
+            else:
+                page_count = self.validator.page_count(source)
+                if page_count is not None and end > page_count:
+                    self.problems.append(f"el rango {start} a {end} excede las {page_count} páginas de '{source}'.")
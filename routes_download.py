@@ -1,18 +1,159 @@
-from flask import Blueprint, send_from_directory
-import os
-
-
-UPLOAD_FOLDER = 'temp_files'
-
-
-download_bp = Blueprint('download', __name__)
-
-
-@download_bp.route('/download/<filename>', methods=['GET'])
-def download_file(filename):
-    """Ruta para servir el archivo generado para su descarga."""
-    try:
-        
-        return send_from_directory(UPLOAD_FOLDER, filename, as_attachment=True)
-    except FileNotFoundError:
-        return "Archivo no encontrado para descarga.", 404
\ No newline at end of file
+from flask import Blueprint, Response, request, send_from_directory, send_file, stream_with_context
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+import gzip
+import os
+import shutil
+import tempfile
+import zipfile
+
+
+from core_interpreter.metrics import registry
+
+
+UPLOAD_FOLDER = 'temp_files'
+GZIP_CACHE_DIR = os.path.join(UPLOAD_FOLDER, '.gz')
+GZIP_MIN_SIZE = 1024
+STREAM_CHUNK_SIZE = 256 * 1024
+PRECOMPRESSED_EXTENSIONS = ('.txt',)
+
+
+download_bp = Blueprint('download', __name__)
+
+
+class _ZipStreamBuffer:
+    """Destino de escritura no posicionable para zipfile: acumula los bytes hasta que se drenan."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _client_accepts_gzip():
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+
+def _precompressed_path(filename, source_path):
+    """
+    Devuelve la versión gzip cacheada del archivo, creándola si no existe o si el
+    original cambió (la copia comprimida conserva el mtime del original).
+    """
+    source_stat = os.stat(source_path)
+    if source_stat.st_size < GZIP_MIN_SIZE:
+        return None
+
+    os.makedirs(GZIP_CACHE_DIR, exist_ok=True)
+    gz_path = os.path.join(GZIP_CACHE_DIR, filename + '.gz')
+
+    try:
+        if os.stat(gz_path).st_mtime_ns == source_stat.st_mtime_ns:
+            return gz_path
+    except FileNotFoundError:
+        pass
+
+    fd, temp_path = tempfile.mkstemp(dir=GZIP_CACHE_DIR, prefix='.gz-')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(filename=filename, mode='wb', fileobj=raw, mtime=0) as gz, open(source_path, 'rb') as fin:
+            shutil.copyfileobj(fin, gz, STREAM_CHUNK_SIZE)
+        os.utime(temp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(temp_path, gz_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return gz_path
+
+
+@download_bp.route('/download/<filename>', methods=['GET'])
+def download_file(filename):
+    """
+    Ruta para servir el archivo generado para su descarga. Admite peticiones
+    condicionales (ETag / If-None-Match) y por rangos; los TXT se sirven comprimidos
+    con gzip cuando el cliente lo acepta y no pide un rango.
+    """
+    try:
+        source_path = safe_join(os.path.abspath(UPLOAD_FOLDER), filename)
+        if source_path is None or not os.path.isfile(source_path):
+            raise FileNotFoundError(filename)
+
+        gz_path = None
+        if filename.lower().endswith(PRECOMPRESSED_EXTENSIONS) and _client_accepts_gzip() and 'Range' not in request.headers:
+            gz_path = _precompressed_path(filename, source_path)
+
+        if gz_path is not None:
+            response = send_file(os.path.abspath(gz_path), mimetype='text/plain', as_attachment=True,
+                                 download_name=filename, conditional=True, etag=True)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = send_from_directory(os.path.abspath(UPLOAD_FOLDER), filename, as_attachment=True,
+                                           conditional=True, etag=True)
+
+        response.headers.add('Vary', 'Accept-Encoding')
+        if response.content_length and response.status_code in (200, 206):
+            registry.inc('arkscript_downloaded_bytes_total', response.content_length)
+        return response
+    except FileNotFoundError:
+        return "Archivo no encontrado para descarga.", 404
+
+
+@download_bp.route('/download/bundle', methods=['GET', 'POST'])
+def download_bundle():
+    """
+    Genera al vuelo un ZIP con los archivos indicados (parámetro 'files' repetido) y lo
+    transmite por partes sin crear copias temporales en disco.
+    """
+    requested = request.values.getlist('files')
+    folder = os.path.abspath(UPLOAD_FOLDER)
+
+    entries = []
+    for name in dict.fromkeys(requested):
+        filename = secure_filename(name)
+        path = safe_join(folder, filename) if filename else None
+        if path is None or not os.path.isfile(path):
+            return f"Archivo no encontrado para descarga: '{name}'.", 404
+        entries.append((filename, path))
+
+    if not entries:
+        return "No se indicó ningún archivo para el paquete de descarga.", 400
+
+    def generate():
+        buffer = _ZipStreamBuffer()
+        sent = 0
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for filename, path in entries:
+                info = zipfile.ZipInfo.from_file(path, filename)
+                info.compress_type = zipfile.ZIP_STORED if filename.lower().endswith('.pdf') else zipfile.ZIP_DEFLATED
+                with archive.open(info, 'w') as dest, open(path, 'rb') as src:
+                    while True:
+                        block = src.read(STREAM_CHUNK_SIZE)
+                        if not block:
+                            break
+                        dest.write(block)
+                        data = buffer.drain()
+                        if data:
+                            sent += len(data)
+                            yield data
+                data = buffer.drain()
+                if data:
+                    sent += len(data)
+                    yield data
+        data = buffer.drain()
+        sent += len(data)
+        registry.inc('arkscript_downloaded_bytes_total', sent)
+        yield data
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=arkscript_resultados.zip'}
+    )
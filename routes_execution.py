@@ -1,105 +1,92 @@
-from flask import Blueprint, request, jsonify
-from io import StringIO
-import sys
-import os
-import json 
-import contextlib 
-import io 
-
-
-from core_interpreter.lexer import Lexer
-from core_interpreter.parser import Parser
-from core_interpreter.evaluator import Evaluator
-
-
-UPLOAD_FOLDER = 'temp_files'
-INPUT_FILES_METADATA = os.path.join(UPLOAD_FOLDER, 'input_files.json') 
-Evaluator.FILE_DIR = UPLOAD_FOLDER
-
-
-execution_bp = Blueprint('execution', __name__)
-
-
-
-def load_input_filenames():
-    """Carga la lista de nombres de archivos de entrada desde JSON."""
-    if os.path.exists(INPUT_FILES_METADATA):
-        with open(INPUT_FILES_METADATA, 'r') as f:
-            try:
-                
-                return set(json.load(f))
-            except json.JSONDecodeError:
-                return set()
-    return set()
-
-def clean_output_files():
-    """Borra todos los archivos que NO sean archivos de entrada o el metadata JSON."""
-    
-    persistent_files = load_input_filenames()
-    persistent_files.add(os.path.basename(INPUT_FILES_METADATA))
-    
-    deleted_count = 0
-    
-    if os.path.exists(UPLOAD_FOLDER):
-        for filename in os.listdir(UPLOAD_FOLDER):
-            if filename not in persistent_files:
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                try:
-                    os.remove(filepath)
-                    deleted_count += 1
-                except Exception as e:
-                    print(f"Error al borrar archivo '{filename}': {e}")
-    
-    print(f"Archivos de salida antiguos eliminados: {deleted_count}")
-
-
-def compile_and_run(code_source):
-    
-    redirected_output = io.StringIO()
-    
-    try:
-        with contextlib.redirect_stdout(redirected_output):
-            
-            lexer = Lexer(code_source)
-            tokens = lexer.tokenize() 
-            
-            
-            parser = Parser(tokens) 
-            
-            evaluator = Evaluator()
-            
-            
-            evaluator.evaluate(parser.parse())
-            
-        
-        output_files = evaluator.get_all_output_files()
-
-        return {
-            "output": redirected_output.getvalue(),
-            "error": False,
-            "output_files": output_files
-        }
-        
-    except Exception as e:
-        
-        return {
-            "output": f"Error de Compilación/Ejecución: {e}\n\n{redirected_output.getvalue()}",
-            "error": True,
-            "output_files": []
-        }
-
-
-
-@execution_bp.route('/execute', methods=['POST'])
-def execute_code():
-    code = request.form.get('code', '')
-    if not code:
-        return jsonify({"output": "Error: No se proporcionó código fuente.", "error": True, "output_files": []})
-
-    
-    clean_output_files()
-
-    
-    result = compile_and_run(code)
-
+from flask import Blueprint, request, jsonify
+from io import StringIO
+import sys
+import contextlib 
+import io 
+
+
+from core_interpreter.lexer import Lexer
+from core_interpreter.parser import Parser
+from core_interpreter.evaluator import Evaluator
+from core_interpreter.validator import ScriptValidator
+from core_interpreter.cost_estimator import CostEstimator
+from core_interpreter.scheduler import FairShareScheduler
+from core_interpreter.metrics import registry
+
+
+UPLOAD_FOLDER = 'temp_files'
+Evaluator.FILE_DIR = UPLOAD_FOLDER
+
+# Ejecuciones simultáneas y coste máximo estimado (en segundos) que se admite por script.
+EXECUTION_SLOTS = 1
+MAX_EXECUTION_COST = 300.0
+scheduler = FairShareScheduler(slots=EXECUTION_SLOTS, max_cost=MAX_EXECUTION_COST)
+
+
+execution_bp = Blueprint('execution', __name__)
+
+
+
+def compile_and_run(code_source, client='local'):
+    """
+    Analiza y valida el script, estima su coste y lo ejecuta cuando el planificador le
+    da turno. Los scripts que superan el presupuesto se rechazan sin ejecutarse.
+    """
+    redirected_output = io.StringIO()
+    
+    try:
+        lexer = Lexer(code_source)
+        tokens = lexer.tokenize() 
+        
+        
+        parser = Parser(tokens) 
+        ast = parser.parse()
+        
+        ScriptValidator(Evaluator.FILE_DIR).check(ast)
+        
+        cost = CostEstimator(Evaluator.FILE_DIR).estimate(ast)
+        registry.observe('arkscript_execution_estimated_cost_seconds', cost)
+        
+        # La salida se redirige solo con el turno concedido: sys.stdout es global al proceso.
+        with scheduler.admit(client, cost), contextlib.redirect_stdout(redirected_output):
+            
+            evaluator = Evaluator()
+            
+            
+            evaluator.evaluate(ast)
+            
+        
+        output_files = evaluator.get_all_output_files()
+
+        return {
+            "output": redirected_output.getvalue(),
+            "error": False,
+            "output_files": output_files
+        }
+        
+    except Exception as e:
+        
+        return {
+            "output": f"Error de Compilación/Ejecución: {e}\n\n{redirected_output.getvalue()}",
+            "error": True,
+            "output_files": []
+        }
+
+
+
+@execution_bp.route('/execute', methods=['POST'])
+def execute_code():
+    code = request.form.get('code', '')
+    if not code:
+        return jsonify({"output": "Error: No se proporcionó código fuente.", "error": True, "output_files": []})
+
+    # El reparto justo es por dirección de origen: una cabecera libre la podría cambiar cada petición.
+    client = request.remote_addr or 'local'
+    
+    registry.add_gauge('arkscript_execution_queue_depth', 1)
+    try:
+        result = compile_and_run(code, client)
+    finally:
+        registry.add_gauge('arkscript_execution_queue_depth', -1)
+
     return jsonify(result)
\ No newline at end of file
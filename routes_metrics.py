@@ -0,0 +1,35 @@
+from flask import Blueprint, Response, request, g
+import time
+
+
+from core_interpreter.metrics import registry
+
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.before_app_request
+def start_request_timer():
+    g.metrics_start = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def record_request_metrics(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+
+    route = request.url_rule.rule if request.url_rule is not None else 'sin_ruta'
+    if route == '/metrics':
+        return response
+
+    elapsed = time.perf_counter() - start
+    registry.inc('arkscript_http_requests_total', route=route, method=request.method, status=response.status_code)
+    registry.observe('arkscript_http_request_duration_seconds', elapsed, route=route)
+    return response
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Expone las métricas del proceso en el formato de texto de Prometheus."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
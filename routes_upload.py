@@ -1,83 +1,197 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
-import os
-import json 
-import time
-
-
-
-UPLOAD_FOLDER = 'temp_files'
-INPUT_FILES_METADATA = os.path.join(UPLOAD_FOLDER, 'input_files.json')
-
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-upload_bp = Blueprint('upload', __name__)
-
-
-ALLOWED_EXTENSIONS = ('.txt', '.pdf')
-
-def is_allowed_file(filename):
-    """Verifica si la extensión del archivo está permitida."""
-    return filename.lower().endswith(ALLOWED_EXTENSIONS)
-
-def load_input_filenames():
-    """Carga la lista de nombres de archivos de entrada (ahora incluyendo .pdf) desde JSON."""
-    if os.path.exists(INPUT_FILES_METADATA):
-        with open(INPUT_FILES_METADATA, 'r') as f:
-            try:
-                all_files = json.load(f)
-                
-                return set(f for f in all_files if isinstance(f, str) and is_allowed_file(f))
-            except json.JSONDecodeError:
-                return set()
-    return set()
-
-def save_input_filenames(filenames_set):
-    """Guarda la lista de nombres de archivos de entrada en JSON."""
-    
-    clean_list = [f for f in filenames_set if is_allowed_file(f)]
-    with open(INPUT_FILES_METADATA, 'w') as f:
-        json.dump(clean_list, f)
-
-@upload_bp.route('/upload', methods=['POST'])
-def upload_files():
-    files = request.files.getlist('files')
-    uploaded_filenames = []
-    
-    current_input_files = load_input_filenames()
-    
-    if not files or files[0].filename == '':
-        return jsonify({"output": "Error: No se seleccionó ningún archivo para subir.", "error": True})
-
-    try:
-        for file in files:
-            if file and is_allowed_file(file.filename):  
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                
-                file.save(filepath)
-                uploaded_filenames.append(filename)
-                
-                
-                current_input_files.add(filename)
-                
-            elif file and file.filename:
-                
-                return jsonify({"output": f"Error de Archivo: El archivo '{file.filename}' debe ser .txt o .pdf.", "error": True})
-        
-        save_input_filenames(current_input_files)
-
-        return jsonify({
-            "output": f"{len(uploaded_filenames)} archivo(s) subido(s) o actualizado(s) con éxito.", 
-            "error": False, 
-            "current_files": list(current_input_files) 
-        })
-
-    except Exception as e:
-        return jsonify({"output": f"Error al guardar archivos en el servidor: {e}", "error": True})
-
-@upload_bp.route('/get_input_files', methods=['GET'])
-def get_input_files():
-    """Devuelve la lista actual de archivos de entrada al frontend."""
-    return jsonify({"current_files": list(load_input_filenames())})
\ No newline at end of file
+from flask import Blueprint, request, jsonify
+from werkzeug.utils import secure_filename
+import os
+import time
+
+
+from core_interpreter.metrics import registry
+from core_interpreter.blob_store import BlobStore, is_valid_digest
+from core_interpreter.text_cache import PdfTextCache, enqueue_pre_extraction, joined_text
+from core_interpreter.search_index import enqueue_index_build
+from core_interpreter.chunked_upload import ChunkedUploadStore, ChunkedUploadError
+from core_interpreter.file_registry import FileRegistry
+
+
+
+UPLOAD_FOLDER = 'temp_files'
+
+if not os.path.exists(UPLOAD_FOLDER):
+    os.makedirs(UPLOAD_FOLDER)
+
+upload_bp = Blueprint('upload', __name__)
+file_registry = FileRegistry.for_workspace(UPLOAD_FOLDER)
+blob_store = BlobStore(UPLOAD_FOLDER)
+chunked_uploads = ChunkedUploadStore(UPLOAD_FOLDER)
+
+
+ALLOWED_EXTENSIONS = ('.txt', '.pdf')
+
+def is_allowed_file(filename):
+    """Verifica si la extensión del archivo está permitida."""
+    return filename.lower().endswith(ALLOWED_EXTENSIONS)
+
+def schedule_background_processing(filename, digest):
+    """
+    Encola la extracción de texto de los PDF subidos y la construcción del índice de
+    búsqueda de cada archivo para que las ejecuciones los reutilicen.
+    """
+    blob_path = blob_store.blob_path(digest)
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    
+    if filename.lower().endswith('.pdf'):
+        enqueue_pre_extraction(UPLOAD_FOLDER, digest, blob_path)
+        load_content = lambda: joined_text(PdfTextCache(UPLOAD_FOLDER).load_or_build(digest, blob_path)[0])
+    else:
+        def load_content():
+            with open(blob_path, 'r', encoding='utf-8') as f:
+                return f.read()
+    
+    enqueue_index_build(filepath, load_content)
+
+@upload_bp.route('/upload', methods=['POST'])
+def upload_files():
+    files = request.files.getlist('files')
+    uploaded_filenames = []
+    
+    if not files or files[0].filename == '':
+        return jsonify({"output": "Error: No se seleccionó ningún archivo para subir.", "error": True})
+
+    try:
+        for file in files:
+            if file and is_allowed_file(file.filename):  
+                filename = secure_filename(file.filename)
+                
+                digest, size = blob_store.store_stream(file.stream)
+                blob_store.link(digest, filename)
+                registry.inc('arkscript_uploaded_bytes_total', size)
+                schedule_background_processing(filename, digest)
+ 
+                uploaded_filenames.append(filename)
+                
+            elif file and file.filename:
+                
+                return jsonify({"output": f"Error de Archivo: El archivo '{file.filename}' debe ser .txt o .pdf.", "error": True})
+        
+        return jsonify({
+            "output": f"{len(uploaded_filenames)} archivo(s) subido(s) o actualizado(s) con éxito.", 
+            "error": False, 
+            "current_files": list(file_registry.input_filenames()) 
+        })
+
+    except Exception as e:
+        return jsonify({"output": f"Error al guardar archivos en el servidor: {e}", "error": True})
+
+@upload_bp.route('/upload/check', methods=['POST'])
+def check_uploads():
+    """
+    Recibe una lista de {name, sha256}. Los archivos cuyo contenido ya está en el almacén
+    se enlazan sin transferencia; el resto se devuelve en 'missing' para subirlo.
+    """
+    payload = request.get_json(silent=True) or {}
+    entries = payload.get('files', [])
+    
+    linked, missing = [], []
+
+    try:
+        for entry in entries:
+            name = entry.get('name', '') if isinstance(entry, dict) else ''
+            digest = str(entry.get('sha256', '')).lower() if isinstance(entry, dict) else ''
+            
+            if not is_allowed_file(name):
+                return jsonify({"output": f"Error de Archivo: El archivo '{name}' debe ser .txt o .pdf.", "error": True})
+            
+            filename = secure_filename(name)
+            if is_valid_digest(digest) and blob_store.has(digest):
+                blob_store.link(digest, filename)
+                schedule_background_processing(filename, digest)
+                linked.append(filename)
+            else:
+                missing.append(name)
+        
+        return jsonify({
+            "output": f"{len(linked)} archivo(s) ya presente(s) en el servidor.",
+            "error": False,
+            "linked": linked,
+            "missing": missing,
+            "current_files": list(file_registry.input_filenames())
+        })
+
+    except Exception as e:
+        return jsonify({"output": f"Error al verificar archivos en el servidor: {e}", "error": True})
+
+@upload_bp.route('/upload/chunked', methods=['POST'])
+def start_chunked_upload():
+    """
+    Inicia (o reanuda) una subida por fragmentos. Recibe {name, size, chunk_size, sha256} y,
+    para reanudar, el 'upload_id' que emitió el servidor; devuelve el identificador, los
+    fragmentos pendientes y el desplazamiento confirmado.
+    """
+    payload = request.get_json(silent=True) or {}
+    name = payload.get('name', '')
+    
+    if not is_allowed_file(name):
+        return jsonify({"output": f"Error de Archivo: El archivo '{name}' debe ser .txt o .pdf.", "error": True})
+
+    sha256 = payload.get('sha256')
+    if sha256 and not is_valid_digest(str(sha256).lower()):
+        return jsonify({"output": "Error: El hash SHA-256 declarado no es válido.", "error": True})
+
+    try:
+        status = chunked_uploads.start(
+            secure_filename(name), payload.get('size', 0), payload.get('chunk_size'),
+            sha256, str(payload.get('upload_id') or '')
+        )
+        return jsonify(dict(status, error=False))
+    except (ChunkedUploadError, ValueError, TypeError) as e:
+        return jsonify({"output": f"Error al iniciar la subida: {e}", "error": True})
+
+
+@upload_bp.route('/upload/chunked/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    """Devuelve los fragmentos pendientes de una subida para poder reanudarla."""
+    try:
+        return jsonify(dict(chunked_uploads.status(upload_id), error=False))
+    except ChunkedUploadError as e:
+        return jsonify({"output": str(e), "error": True}), 404
+
+
+@upload_bp.route('/upload/chunked/<upload_id>/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, index):
+    """Escribe un fragmento (cuerpo binario) en su posición; admite la cabecera X-Chunk-SHA256."""
+    try:
+        written = chunked_uploads.write_chunk(upload_id, index, request.stream, request.headers.get('X-Chunk-SHA256'))
+        registry.inc('arkscript_uploaded_bytes_total', written)
+        status = chunked_uploads.status(upload_id)
+        return jsonify({"error": False, "index": index, "offset": status["offset"], "missing_count": len(status["missing"])})
+    except ChunkedUploadError as e:
+        return jsonify({"output": str(e), "error": True}), 400
+
+
+@upload_bp.route('/upload/chunked/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    """Verifica el archivo completo contra su hash y lo registra como archivo de entrada."""
+    try:
+        filename, digest, size, already_completed = chunked_uploads.complete(upload_id, blob_store)
+        if already_completed:
+            return jsonify({
+                "output": f"La subida de '{filename}' ya se había completado.",
+                "error": False,
+                "sha256": digest,
+                "current_files": list(file_registry.input_filenames())
+            })
+        blob_store.link(digest, filename)
+        schedule_background_processing(filename, digest)
+
+        return jsonify({
+            "output": f"Archivo '{filename}' ({size} bytes) subido por fragmentos y verificado con éxito.",
+            "error": False,
+            "sha256": digest,
+            "current_files": list(file_registry.input_filenames())
+        })
+    except ChunkedUploadError as e:
+        return jsonify({"output": f"Error al completar la subida: {e}", "error": True}), 400
+
+@upload_bp.route('/get_input_files', methods=['GET'])
+def get_input_files():
+    """Devuelve la lista actual de archivos de entrada al frontend."""
+    return jsonify({"current_files": list(file_registry.input_filenames())})
\ No newline at end of file
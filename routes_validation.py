@@ -0,0 +1,58 @@
+from flask import Blueprint, request, jsonify
+import uuid
+
+
+from core_interpreter.script_analysis import documents
+
+
+
+validation_bp = Blueprint('validation', __name__)
+
+
+def _token_lines(data):
+    lines = data.get('token_lines')
+    if isinstance(lines, (list, tuple)) and len(lines) == 2:
+        try:
+            return int(lines[0]), int(lines[1])
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+@validation_bp.route('/validate', methods=['POST'])
+def validate_code():
+    """
+    Analiza el script del editor sin ejecutarlo: tokens con línea y columna, diagnósticos
+    y variables declaradas. La primera petición envía el texto completo ('code'); las
+    siguientes solo los cambios por rango de líneas sobre la versión anterior ('base_version'
+    y 'changes'), de modo que solo se vuelven a analizar las líneas y sentencias afectadas.
+    Si el servidor no tiene esa versión del documento responde 'resync' para que el
+    editor vuelva a enviar el texto completo.
+    """
+    data = request.get_json(silent=True) or request.form.to_dict()
+    document_id = str(data.get('document') or uuid.uuid4().hex)
+    token_lines = _token_lines(data)
+
+    if 'code' in data:
+        document = documents.open(document_id)
+        with document.lock:
+            document.set_text(str(data['code']))
+            result = document.analysis(token_lines)
+    else:
+        document = documents.get(document_id)
+        if document is None:
+            return jsonify({"document": document_id, "resync": True})
+        with document.lock:
+            if document.version != data.get('base_version'):
+                return jsonify({"document": document_id, "resync": True})
+            try:
+                for change in data.get('changes') or []:
+                    document.apply_change(int(change['from_line']), int(change['to_line']), str(change.get('text', '')))
+            except (KeyError, TypeError, ValueError):
+                # El documento pudo quedar a medio actualizar: se obliga a reenviarlo entero.
+                document.set_text('')
+                return jsonify({"document": document_id, "resync": True})
+            result = document.analysis(token_lines)
+
+    result["document"] = document_id
+    return jsonify(result)
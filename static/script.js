@@ -1,381 +1,679 @@
-
-let editor; 
-const dropZone = document.getElementById('drop-zone');
-const fileInput = document.getElementById('files');
-const inputFileList = document.getElementById('input-file-list');
-const outputFileList = document.getElementById('output-file-list');
-const outputElement = document.getElementById('output');
-
-let selectedFiles = []; 
-let currentView = 'icon'; 
-
-
-
-
-
-
-if (typeof CodeMirror !== 'undefined') {
-    CodeMirror.defineMode("arkscript", function() {
-        console.log("¡Tokenizador de modo arkscript cargado con éxito! (Usando bucle manual de compatibilidad)"); 
-        
-        
-        const tokenMap = {
-            
-            "var": "keyword",
-            "buscar": "keyword",
-            "fusionar": "keyword",
-            "reemplazar": "keyword",
-            "sobreescribir": "keyword",
-            "enumerar": "keyword",
-            "extraer": "keyword",
-            "invertir": "keyword",
-            "fragmentar": "keyword",
-            
-            
-            "separado_por": "builtin",
-            "todo": "builtin",
-            "con": "builtin",
-            "sin": "builtin",
-            "desde": "builtin",
-            "hasta": "builtin",
-            "de": "builtin",
-            "en": "builtin",
-            "por": "builtin"
-        };
-
-        
-        const wordRegex = /^[a-zA-Z_][a-zA-Z0-9_]*/;
-
-
-        return {
-            startState: function() {return {inString: false};},
-            
-            token: function(stream, state) {
-                
-                
-                while (stream.peek() && /\s/.test(stream.peek())) {
-                    stream.next();
-                }
-                if (!stream.peek()) return null; 
-
-
-                
-                if (stream.match("//")) {
-                    stream.skipToEnd();
-                    return "comment";
-                }
-                
-                
-                if (stream.peek() === '"') {
-                    stream.next(); 
-                    
-                    stream.skipTo('"') || stream.skipToEnd();
-                    stream.next(); 
-                    return "string";
-                }
-
-                
-                if (stream.match(/^[0-9]+/)) {
-                    return "number";
-                }
-                
-                
-                if (stream.match(wordRegex)) {
-                    const word = stream.current();
-                    const tokenType = tokenMap[word];
-                    
-                    if (tokenType) {
-                        return tokenType; 
-                    }
-                    
-                    return "variable"; 
-                }
-                
-                
-                stream.next();
-                return null;
-            }
-        };
-    });
-}
-
-
-
-
-
-
-
-function getFileIcon(filename) {
-    const extension = filename.split('.').pop().toLowerCase(); 
-    if (extension === 'pdf') {
-        return 'fas fa-file-pdf'; 
-    }
-    return 'fas fa-file-alt'; 
-}
-
-
-function showTab(tabName) {
-    document.querySelectorAll('.tab-content').forEach(content => {
-        content.style.display = 'none';
-    });
-    document.querySelectorAll('.tab-button').forEach(button => {
-        button.classList.remove('active');
-    });
-    
-    document.getElementById(`content-${tabName}`).style.display = 'block';
-    document.getElementById(`tab-${tabName}`).classList.add('active');
-    
-    updateInputFileList(selectedFiles);
-    
-    updateOutputFileList(outputFileList.dataset.filenames ? JSON.parse(outputFileList.dataset.filenames) : [], true); 
-}
-
-function toggleView(viewName) {
-    currentView = viewName;
-    document.querySelectorAll('.view-button').forEach(btn => btn.classList.remove('active'));
-    document.getElementById(`view-${viewName}-btn`).classList.add('active');
-
-    const lists = [inputFileList, outputFileList];
-    lists.forEach(list => {
-        list.classList.remove('icon-view', 'list-view');
-        list.classList.add(`${viewName}-view`);
-    });
-    
-    
-    updateInputFileList(selectedFiles);
-    updateOutputFileList(outputFileList.dataset.filenames ? JSON.parse(outputFileList.dataset.filenames) : [], true); 
-}
-
-function updateInputFileList(filenames) {
-    inputFileList.innerHTML = '';
-    inputFileList.classList.remove('icon-view', 'list-view');
-    inputFileList.classList.add(`${currentView}-view`);
-
-    if (filenames.length === 0) {
-        inputFileList.innerHTML = '<li style="padding: 10px; color: #888;">No hay archivos cargados.</li>';
-        return;
-    }
-
-    filenames.forEach(name => {
-        const li = document.createElement('li');
-        li.className = 'file-item';
-        
-        const iconClass = currentView === 'icon' ? 'file-icon-large' : 'file-icon-small';
-        const fileIcon = getFileIcon(name); 
-        li.innerHTML = `
-            <i class="${fileIcon} ${iconClass}"></i>
-            <span class="file-name">${name}</span>
-        `;
-        inputFileList.appendChild(li);
-    });
-}
-
-function updateOutputFileList(filenames, isRerender = false) {
-    if (!isRerender) {
-        
-        outputFileList.dataset.filenames = JSON.stringify(filenames); 
-    }
-    
-    outputFileList.innerHTML = '';
-    outputFileList.classList.remove('icon-view', 'list-view');
-    outputFileList.classList.add(`${currentView}-view`);
-    
-    if (filenames.length === 0) {
-        outputFileList.innerHTML = '<li style="padding: 10px; color: #888;">No hay archivos generados.</li>';
-        return;
-    }
-
-    filenames.forEach(filename => {
-        const li = document.createElement('li');
-        li.className = 'file-item output'; 
-
-        const iconClass = currentView === 'icon' ? 'file-icon-large' : 'file-icon-small';
-        const fileIcon = getFileIcon(filename); 
-        li.innerHTML = `
-            <i class="${fileIcon} ${iconClass}"></i>
-            <span class="file-name">${filename}</span>
-            <a href="/download/${filename}" class="file-download-link" title="Descargar"><i class="fas fa-download"></i></a>
-        `;
-        outputFileList.appendChild(li);
-    });
-    
-    
-    if (!isRerender && filenames.length > 0) {
-        showTab('output');
-    }
-}
-
-
-async function uploadFiles(files) {
-    const formData = new FormData();
-
-    for (const file of files) {
-        formData.append('files', file); 
-    }
-    
-    outputElement.textContent = `Subiendo ${files.length} archivo(s) al servidor...`;
-    outputElement.className = '';
-
-    try {
-        const response = await fetch('/upload', {
-            method: 'POST',
-            body: formData 
-        });
-        const data = await response.json();
-
-        if (data.error) {
-            outputElement.textContent = data.output;
-            outputElement.className = 'error';
-        } else {
-            
-            selectedFiles = data.current_files || [];
-
-            outputElement.textContent = data.output;
-            outputElement.className = 'success';
-            
-            updateInputFileList(selectedFiles);
-            showTab('input');
-        }
-
-    } catch (error) {
-        outputElement.textContent = `Error de conexión al subir archivos: ${error}`;
-        outputElement.className = 'error';
-        console.error('Error:', error);
-    }
-}
-
-
-function runCode() {
-    
-    const code = editor.getValue(); 
-    const formData = new FormData();
-    formData.append('code', code); 
-    
-    if (selectedFiles.length === 0) {
-        outputElement.textContent = 'Error: No se han subido archivos de entrada en el servidor.';
-        outputElement.className = 'error';
-        return;
-    }
-    
-    outputElement.textContent = 'Ejecutando intérprete...';
-    outputElement.className = '';
-
-    fetch('/execute', {
-        method: 'POST',
-        body: formData 
-    })
-    .then(response => response.json())
-    .then(data => {
-        outputElement.textContent = data.output;
-        outputElement.className = data.error ? 'error' : 'success';
-
-        const newOutputFiles = data.output_files || [];
-        
-        
-        const oldOutputFiles = outputFileList.dataset.filenames 
-            ? JSON.parse(outputFileList.dataset.filenames) 
-            : [];
-        
-        
-        const combinedFiles = Array.from(new Set([...oldOutputFiles, ...newOutputFiles]));
-        
-        
-        updateOutputFileList(combinedFiles, false); 
-        
-        if (!data.error && newOutputFiles.length > 0) {
-            outputElement.textContent += `\n\n¡${newOutputFiles.length} archivo(s) de resultado gestionados!`;
-        }
-    })
-    .catch(error => {
-        outputElement.textContent = `Error de conexión con el servidor: ${error}`;
-        outputElement.className = 'error';
-        console.error('Error:', error);
-    });
-}
-
-
-function preventDefaults (e) {
-    e.preventDefault();
-    e.stopPropagation();
-}
-
-dropZone.addEventListener('dragenter', highlight, false);
-dropZone.addEventListener('dragover', highlight, false);
-dropZone.addEventListener('dragleave', unhighlight, false);
-dropZone.addEventListener('drop', handleDrop, false);
-
-function highlight() {
-    dropZone.classList.add('drag-over');
-}
-
-function unhighlight() {
-    dropZone.classList.remove('drag-over');
-}
-
-
-function handleDrop(e) {
-    unhighlight();
-    const dt = e.dataTransfer;
-    
-    const files = Array.from(dt.files).filter(file => file.name.endsWith('.txt') || file.name.endsWith('.pdf'));
-    
-    if (files.length > 0) {
-        uploadFiles(files); 
-    }
-}
-
-dropZone.addEventListener('click', () => {
-    fileInput.click();
-});
-
-fileInput.addEventListener('change', (e) => {
-    
-    const files = Array.from(e.target.files).filter(file => file.name.endsWith('.txt') || file.name.endsWith('.pdf'));
-    if (files.length > 0) {
-        uploadFiles(files); 
-    }
-    e.target.value = ''; 
-});
-
-
-
-
-async function initializeApp() {
-    
-    try {
-        const response = await fetch('/get_input_files');
-        const data = await response.json();
-        if (data.current_files) {
-            selectedFiles = data.current_files;
-        }
-    } catch (error) {
-        console.error("No se pudo sincronizar la lista de archivos con el servidor.", error);
-    }
-    
-    
-    outputFileList.dataset.filenames = JSON.stringify([]); 
-    
-    
-    updateInputFileList(selectedFiles); 
-    toggleView('icon'); 
-}
-
-document.addEventListener('DOMContentLoaded', () => {
-    
-    const textarea = document.getElementById('code-editor');
-    if (typeof CodeMirror !== 'undefined') {
-        editor = CodeMirror.fromTextArea(textarea, {
-            lineNumbers: true, 
-            mode: "arkscript", 
-            theme: "dracula" 
-        });
-        
-        console.log("CodeMirror transformado con modo de estado 'arkscript'.");
-        
-    } else {
-         console.error("ERROR: CodeMirror no está definido.");
-    }
-    
-    
-    initializeApp(); 
-});
+
+let editor; 
+const dropZone = document.getElementById('drop-zone');
+const fileInput = document.getElementById('files');
+const inputFileList = document.getElementById('input-file-list');
+const outputFileList = document.getElementById('output-file-list');
+const outputElement = document.getElementById('output');
+const diagnosticsElement = document.getElementById('diagnostics');
+
+let selectedFiles = []; 
+let currentView = 'icon'; 
+
+const LARGE_FILE_THRESHOLD = 64 * 1024 * 1024;
+const CHUNK_SIZE = 8 * 1024 * 1024;
+const PARALLEL_CHUNKS = 4;
+const CHUNK_RETRIES = 3;
+
+const VALIDATE_DELAY_MS = 150;
+
+// Estado de la validación incremental: el servidor guarda el documento y solo recibe los cambios.
+const validation = {
+    documentId: null,
+    version: null,
+    pendingChanges: [],
+    needsFullText: true,
+    inFlight: false,
+    timer: null,
+    marks: []
+};
+
+
+
+
+
+
+if (typeof CodeMirror !== 'undefined') {
+    CodeMirror.defineMode("arkscript", function() {
+        console.log("¡Tokenizador de modo arkscript cargado con éxito! (Usando bucle manual de compatibilidad)"); 
+        
+        
+        const tokenMap = {
+            
+            "var": "keyword",
+            "buscar": "keyword",
+            "fusionar": "keyword",
+            "reemplazar": "keyword",
+            "sobreescribir": "keyword",
+            "enumerar": "keyword",
+            "extraer": "keyword",
+            "invertir": "keyword",
+            "fragmentar": "keyword",
+            
+            
+            "separado_por": "builtin",
+            "todo": "builtin",
+            "con": "builtin",
+            "sin": "builtin",
+            "desde": "builtin",
+            "hasta": "builtin",
+            "de": "builtin",
+            "en": "builtin",
+            "por": "builtin"
+        };
+
+        
+        const wordRegex = /^[a-zA-Z_][a-zA-Z0-9_]*/;
+
+
+        return {
+            startState: function() {return {inString: false};},
+            
+            token: function(stream, state) {
+                
+                
+                while (stream.peek() && /\s/.test(stream.peek())) {
+                    stream.next();
+                }
+                if (!stream.peek()) return null; 
+
+
+                
+                if (stream.match("//")) {
+                    stream.skipToEnd();
+                    return "comment";
+                }
+                
+                
+                if (stream.peek() === '"') {
+                    stream.next(); 
+                    
+                    stream.skipTo('"') || stream.skipToEnd();
+                    stream.next(); 
+                    return "string";
+                }
+
+                
+                if (stream.match(/^[0-9]+/)) {
+                    return "number";
+                }
+                
+                
+                if (stream.match(wordRegex)) {
+                    const word = stream.current();
+                    const tokenType = tokenMap[word];
+                    
+                    if (tokenType) {
+                        return tokenType; 
+                    }
+                    
+                    return "variable"; 
+                }
+                
+                
+                stream.next();
+                return null;
+            }
+        };
+    });
+}
+
+
+
+
+
+
+
+function getFileIcon(filename) {
+    const extension = filename.split('.').pop().toLowerCase(); 
+    if (extension === 'pdf') {
+        return 'fas fa-file-pdf'; 
+    }
+    return 'fas fa-file-alt'; 
+}
+
+
+function showTab(tabName) {
+    document.querySelectorAll('.tab-content').forEach(content => {
+        content.style.display = 'none';
+    });
+    document.querySelectorAll('.tab-button').forEach(button => {
+        button.classList.remove('active');
+    });
+    
+    document.getElementById(`content-${tabName}`).style.display = 'block';
+    document.getElementById(`tab-${tabName}`).classList.add('active');
+    
+    updateInputFileList(selectedFiles);
+    
+    updateOutputFileList(outputFileList.dataset.filenames ? JSON.parse(outputFileList.dataset.filenames) : [], true); 
+}
+
+function toggleView(viewName) {
+    currentView = viewName;
+    document.querySelectorAll('.view-button').forEach(btn => btn.classList.remove('active'));
+    document.getElementById(`view-${viewName}-btn`).classList.add('active');
+
+    const lists = [inputFileList, outputFileList];
+    lists.forEach(list => {
+        list.classList.remove('icon-view', 'list-view');
+        list.classList.add(`${viewName}-view`);
+    });
+    
+    
+    updateInputFileList(selectedFiles);
+    updateOutputFileList(outputFileList.dataset.filenames ? JSON.parse(outputFileList.dataset.filenames) : [], true); 
+}
+
+function updateInputFileList(filenames) {
+    inputFileList.innerHTML = '';
+    inputFileList.classList.remove('icon-view', 'list-view');
+    inputFileList.classList.add(`${currentView}-view`);
+
+    if (filenames.length === 0) {
+        inputFileList.innerHTML = '<li style="padding: 10px; color: #888;">No hay archivos cargados.</li>';
+        return;
+    }
+
+    filenames.forEach(name => {
+        const li = document.createElement('li');
+        li.className = 'file-item';
+        
+        const iconClass = currentView === 'icon' ? 'file-icon-large' : 'file-icon-small';
+        const fileIcon = getFileIcon(name); 
+        li.innerHTML = `
+            <i class="${fileIcon} ${iconClass}"></i>
+            <span class="file-name">${name}</span>
+        `;
+        inputFileList.appendChild(li);
+    });
+}
+
+function updateOutputFileList(filenames, isRerender = false) {
+    if (!isRerender) {
+        
+        outputFileList.dataset.filenames = JSON.stringify(filenames); 
+    }
+    
+    outputFileList.innerHTML = '';
+    outputFileList.classList.remove('icon-view', 'list-view');
+    outputFileList.classList.add(`${currentView}-view`);
+    
+    if (filenames.length === 0) {
+        outputFileList.innerHTML = '<li style="padding: 10px; color: #888;">No hay archivos generados.</li>';
+        return;
+    }
+
+    filenames.forEach(filename => {
+        const li = document.createElement('li');
+        li.className = 'file-item output'; 
+
+        const iconClass = currentView === 'icon' ? 'file-icon-large' : 'file-icon-small';
+        const fileIcon = getFileIcon(filename); 
+        li.innerHTML = `
+            <i class="${fileIcon} ${iconClass}"></i>
+            <span class="file-name">${filename}</span>
+            <a href="/download/${filename}" class="file-download-link" title="Descargar"><i class="fas fa-download"></i></a>
+        `;
+        outputFileList.appendChild(li);
+    });
+
+    if (filenames.length > 1) {
+        const li = document.createElement('li');
+        li.className = 'file-item output';
+        li.innerHTML = `
+            <i class="fas fa-file-archive ${currentView === 'icon' ? 'file-icon-large' : 'file-icon-small'}"></i>
+            <span class="file-name">Todos (.zip)</span>
+            <a href="#" class="file-download-link" title="Descargar todo" onclick="downloadAllOutputs(); return false;"><i class="fas fa-download"></i></a>
+        `;
+        outputFileList.prepend(li);
+    }
+    
+    
+    if (!isRerender && filenames.length > 0) {
+        showTab('output');
+    }
+}
+
+
+function downloadAllOutputs() {
+    const filenames = outputFileList.dataset.filenames ? JSON.parse(outputFileList.dataset.filenames) : [];
+    if (filenames.length === 0) {
+        return;
+    }
+
+    
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = '/download/bundle';
+    form.style.display = 'none';
+
+    filenames.forEach(filename => {
+        const input = document.createElement('input');
+        input.type = 'hidden';
+        input.name = 'files';
+        input.value = filename;
+        form.appendChild(input);
+    });
+
+    document.body.appendChild(form);
+    form.submit();
+    form.remove();
+}
+
+
+async function sha256Hex(file) {
+    const buffer = await file.arrayBuffer();
+    const digest = await crypto.subtle.digest('SHA-256', buffer);
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+
+async function filterFilesAlreadyOnServer(files) {
+    
+    if (!window.crypto || !crypto.subtle) {
+        return files;
+    }
+
+    try {
+        const entries = [];
+        for (const file of files) {
+            entries.push({ name: file.name, sha256: await sha256Hex(file) });
+        }
+
+        const response = await fetch('/upload/check', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ files: entries })
+        });
+        const data = await response.json();
+
+        if (data.error) {
+            return files;
+        }
+
+        selectedFiles = data.current_files || selectedFiles;
+        const missing = new Set(data.missing || []);
+        return files.filter(file => missing.has(file.name));
+
+    } catch (error) {
+        console.error('No se pudo verificar el contenido existente en el servidor.', error);
+        return files;
+    }
+}
+
+
+async function uploadChunk(uploadId, file, index, chunkSize) {
+    const blob = file.slice(index * chunkSize, Math.min((index + 1) * chunkSize, file.size));
+    const headers = { 'Content-Type': 'application/octet-stream' };
+
+    if (window.crypto && crypto.subtle) {
+        headers['X-Chunk-SHA256'] = await sha256Hex(blob);
+    }
+
+    for (let attempt = 1; attempt <= CHUNK_RETRIES; attempt++) {
+        try {
+            const response = await fetch(`/upload/chunked/${uploadId}/${index}`, {
+                method: 'PUT',
+                headers: headers,
+                body: blob
+            });
+            const data = await response.json();
+            if (!data.error) {
+                return data;
+            }
+            console.error(`Fragmento ${index} rechazado (intento ${attempt}): ${data.output}`);
+        } catch (error) {
+            console.error(`Error de conexión en el fragmento ${index} (intento ${attempt}).`, error);
+        }
+    }
+    throw new Error(`No se pudo subir el fragmento ${index} tras ${CHUNK_RETRIES} intentos.`);
+}
+
+
+async function uploadLargeFile(file) {
+    outputElement.className = '';
+    outputElement.textContent = `Preparando subida por fragmentos de '${file.name}'...`;
+
+    // El servidor emite el identificador de la sesión; se guarda para poder reanudarla.
+    const resumeKey = `arkscript-subida:${file.name}:${file.size}:${file.lastModified}`;
+
+    try {
+        const startResponse = await fetch('/upload/chunked', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                name: file.name,
+                size: file.size,
+                chunk_size: CHUNK_SIZE,
+                upload_id: localStorage.getItem(resumeKey) || ''
+            })
+        });
+        const session = await startResponse.json();
+        if (session.error) {
+            outputElement.textContent = session.output;
+            outputElement.className = 'error';
+            return false;
+        }
+        localStorage.setItem(resumeKey, session.upload_id);
+
+        
+        const pending = [...session.missing];
+        const total = session.total_chunks;
+        let done = total - pending.length;
+
+        const worker = async () => {
+            while (pending.length > 0) {
+                const index = pending.shift();
+                await uploadChunk(session.upload_id, file, index, session.chunk_size);
+                done++;
+                outputElement.textContent = `Subiendo '${file.name}': ${done}/${total} fragmentos (${Math.floor(done * 100 / total)}%)...`;
+            }
+        };
+        await Promise.all(Array.from({ length: PARALLEL_CHUNKS }, worker));
+
+        const completeResponse = await fetch(`/upload/chunked/${session.upload_id}/complete`, { method: 'POST' });
+        const data = await completeResponse.json();
+
+        outputElement.textContent = data.output;
+        outputElement.className = data.error ? 'error' : 'success';
+        if (!data.error) {
+            localStorage.removeItem(resumeKey);
+            selectedFiles = data.current_files || selectedFiles;
+            updateInputFileList(selectedFiles);
+            showTab('input');
+        }
+        return !data.error;
+
+    } catch (error) {
+        outputElement.textContent = `Error al subir '${file.name}': ${error}. Vuelve a seleccionarlo para reanudar la subida.`;
+        outputElement.className = 'error';
+        console.error('Error:', error);
+        return false;
+    }
+}
+
+
+async function uploadFiles(files) {
+    const largeFiles = files.filter(file => file.size >= LARGE_FILE_THRESHOLD);
+    const smallFiles = files.filter(file => file.size < LARGE_FILE_THRESHOLD);
+
+    for (const file of largeFiles) {
+        if (!await uploadLargeFile(file)) {
+            return;
+        }
+    }
+
+    if (smallFiles.length > 0) {
+        await uploadSmallFiles(smallFiles);
+    }
+}
+
+
+async function uploadSmallFiles(files) {
+    outputElement.textContent = `Verificando ${files.length} archivo(s) en el servidor...`;
+    outputElement.className = '';
+
+    const pendingFiles = await filterFilesAlreadyOnServer(files);
+    const skippedCount = files.length - pendingFiles.length;
+
+    if (pendingFiles.length === 0) {
+        outputElement.textContent = `${skippedCount} archivo(s) ya estaban en el servidor. No fue necesario subirlos.`;
+        outputElement.className = 'success';
+        updateInputFileList(selectedFiles);
+        showTab('input');
+        return;
+    }
+
+    const formData = new FormData();
+
+    for (const file of pendingFiles) {
+        formData.append('files', file); 
+    }
+    
+    outputElement.textContent = `Subiendo ${pendingFiles.length} archivo(s) al servidor...`;
+    outputElement.className = '';
+
+    try {
+        const response = await fetch('/upload', {
+            method: 'POST',
+            body: formData 
+        });
+        const data = await response.json();
+
+        if (data.error) {
+            outputElement.textContent = data.output;
+            outputElement.className = 'error';
+        } else {
+            
+            selectedFiles = data.current_files || [];
+
+            outputElement.textContent = data.output;
+            if (skippedCount > 0) {
+                outputElement.textContent += ` ${skippedCount} archivo(s) ya estaban en el servidor.`;
+            }
+            outputElement.className = 'success';
+            
+            updateInputFileList(selectedFiles);
+            showTab('input');
+        }
+
+    } catch (error) {
+        outputElement.textContent = `Error de conexión al subir archivos: ${error}`;
+        outputElement.className = 'error';
+        console.error('Error:', error);
+    }
+}
+
+
+function runCode() {
+    
+    const code = editor.getValue(); 
+    const formData = new FormData();
+    formData.append('code', code); 
+    
+    if (selectedFiles.length === 0) {
+        outputElement.textContent = 'Error: No se han subido archivos de entrada en el servidor.';
+        outputElement.className = 'error';
+        return;
+    }
+    
+    outputElement.textContent = 'Ejecutando intérprete...';
+    outputElement.className = '';
+
+    fetch('/execute', {
+        method: 'POST',
+        body: formData 
+    })
+    .then(response => response.json())
+    .then(data => {
+        outputElement.textContent = data.output;
+        outputElement.className = data.error ? 'error' : 'success';
+
+        const newOutputFiles = data.output_files || [];
+        
+        
+        const oldOutputFiles = outputFileList.dataset.filenames 
+            ? JSON.parse(outputFileList.dataset.filenames) 
+            : [];
+        
+        
+        const combinedFiles = Array.from(new Set([...oldOutputFiles, ...newOutputFiles]));
+        
+        
+        updateOutputFileList(combinedFiles, false); 
+        
+        if (!data.error && newOutputFiles.length > 0) {
+            outputElement.textContent += `\n\n¡${newOutputFiles.length} archivo(s) de resultado gestionados!`;
+        }
+    })
+    .catch(error => {
+        outputElement.textContent = `Error de conexión con el servidor: ${error}`;
+        outputElement.className = 'error';
+        console.error('Error:', error);
+    });
+}
+
+
+function onEditorChange(cm, change) {
+    // Cada cambio se envía como las líneas [from_line, to_line) del documento anterior y su texto nuevo.
+    const firstLine = change.from.line;
+    const lastLine = firstLine + change.text.length - 1;
+    validation.pendingChanges.push({
+        from_line: firstLine,
+        to_line: firstLine + change.removed.length,
+        text: cm.getRange({ line: firstLine, ch: 0 }, { line: lastLine, ch: cm.getLine(lastLine).length })
+    });
+    scheduleValidation();
+}
+
+function scheduleValidation() {
+    clearTimeout(validation.timer);
+    validation.timer = setTimeout(validateCode, VALIDATE_DELAY_MS);
+}
+
+async function validateCode() {
+    if (validation.inFlight) {
+        scheduleValidation();
+        return;
+    }
+
+    const viewport = editor.getViewport();
+    const payload = { document: validation.documentId, token_lines: [viewport.from, viewport.to] };
+    if (validation.needsFullText) {
+        payload.code = editor.getValue();
+    } else {
+        payload.base_version = validation.version;
+        payload.changes = validation.pendingChanges;
+    }
+    validation.pendingChanges = [];
+    validation.inFlight = true;
+
+    try {
+        const response = await fetch('/validate', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(payload)
+        });
+        const data = await response.json();
+        validation.documentId = data.document;
+        if (data.resync) {
+            validation.needsFullText = true;
+            scheduleValidation();
+            return;
+        }
+        validation.version = data.version;
+        validation.needsFullText = false;
+        showDiagnostics(data.diagnostics || []);
+    } catch (error) {
+        validation.needsFullText = true;
+        console.error('No se pudo validar el código:', error);
+    } finally {
+        validation.inFlight = false;
+    }
+}
+
+function showDiagnostics(diagnostics) {
+    validation.marks.forEach(mark => mark.clear());
+    validation.marks = diagnostics.map(diagnostic => {
+        const line = diagnostic.line - 1;
+        const text = editor.getLine(line) || '';
+        const start = Math.min(Math.max(diagnostic.column - 1, 0), text.length);
+        const rest = text.slice(start).search(/\s/);
+        const end = rest > 0 ? start + rest : Math.max(text.length, start + 1);
+        return editor.markText({ line, ch: start }, { line, ch: end },
+                              { className: 'cm-diagnostic-error', title: diagnostic.message });
+    });
+    diagnosticsElement.textContent = diagnostics
+        .map(diagnostic => `Línea ${diagnostic.line}, columna ${diagnostic.column}: ${diagnostic.message}`)
+        .join('\n');
+}
+
+
+function preventDefaults (e) {
+    e.preventDefault();
+    e.stopPropagation();
+}
+
+dropZone.addEventListener('dragenter', highlight, false);
+dropZone.addEventListener('dragover', highlight, false);
+dropZone.addEventListener('dragleave', unhighlight, false);
+dropZone.addEventListener('drop', handleDrop, false);
+
+function highlight() {
+    dropZone.classList.add('drag-over');
+}
+
+function unhighlight() {
+    dropZone.classList.remove('drag-over');
+}
+
+
+function handleDrop(e) {
+    unhighlight();
+    const dt = e.dataTransfer;
+    
+    const files = Array.from(dt.files).filter(file => file.name.endsWith('.txt') || file.name.endsWith('.pdf'));
+    
+    if (files.length > 0) {
+        uploadFiles(files); 
+    }
+}
+
+dropZone.addEventListener('click', () => {
+    fileInput.click();
+});
+
+fileInput.addEventListener('change', (e) => {
+    
+    const files = Array.from(e.target.files).filter(file => file.name.endsWith('.txt') || file.name.endsWith('.pdf'));
+    if (files.length > 0) {
+        uploadFiles(files); 
+    }
+    e.target.value = ''; 
+});
+
+
+
+
+async function initializeApp() {
+    
+    try {
+        const response = await fetch('/get_input_files');
+        const data = await response.json();
+        if (data.current_files) {
+            selectedFiles = data.current_files;
+        }
+    } catch (error) {
+        console.error("No se pudo sincronizar la lista de archivos con el servidor.", error);
+    }
+    
+    
+    outputFileList.dataset.filenames = JSON.stringify([]); 
+    
+    
+    updateInputFileList(selectedFiles); 
+    toggleView('icon'); 
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    
+    const textarea = document.getElementById('code-editor');
+    if (typeof CodeMirror !== 'undefined') {
+        editor = CodeMirror.fromTextArea(textarea, {
+            lineNumbers: true, 
+            mode: "arkscript", 
+            theme: "dracula" 
+        });
+        
+        editor.on('change', onEditorChange);
+        scheduleValidation();
+        console.log("CodeMirror transformado con modo de estado 'arkscript'.");
+        
+    } else {
+         console.error("ERROR: CodeMirror no está definido.");
+    }
+    
+    
+    initializeApp(); 
+});